@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Runs the PyNNLess benchmark suite and stores the results as JSON. If a baseline
+file is given, the results are compared against the baseline and the program
+exits with a non-zero return code if the throughput of one of the benchmarks
+dropped by more than the given tolerance.
+
+Usage: ./benchmark.py [--scale small|medium|large] [--simulator SIMULATOR]
+       [--output FILE] [--baseline FILE] [--tolerance TOLERANCE]
+"""
+
+import argparse
+import json
+import sys
+
+import pynnless.pynnless_benchmark as benchmark
+
+parser = argparse.ArgumentParser(description="PyNNLess benchmark suite")
+parser.add_argument("--scale", default="small",
+        choices=sorted(benchmark.SCALES.keys()))
+parser.add_argument("--simulator", default=None,
+        help="simulator used to run the networks, networks are only "
+            + "generated if omitted. Use \"mock\" to measure the overhead "
+            + "of PyNNLess itself")
+parser.add_argument("--duration", type=float, default=1000.0,
+        help="simulation duration in ms")
+parser.add_argument("--repeat", type=int, default=3,
+        help="number of repetitions, the minimum time is reported")
+parser.add_argument("--output", default=None,
+        help="target JSON file for the benchmark results")
+parser.add_argument("--baseline", default=None,
+        help="JSON file containing baseline results")
+parser.add_argument("--tolerance", type=float, default=0.25,
+        help="tolerated relative throughput drop")
+args = parser.parse_args()
+
+res = benchmark.run_benchmarks(scale=args.scale, simulator=args.simulator,
+        duration=args.duration, repeat=args.repeat)
+
+flat = benchmark.flatten(res)
+for name in sorted(flat.keys()):
+    entry = flat[name]
+    print("benchmark.py: " + name.ljust(48) + ("%10.4f s" % entry["time"])
+            + ("%14.0f " % entry["throughput"]) + entry["unit"] + "/s")
+
+if args.output is not None:
+    with open(args.output, "w") as f:
+        json.dump(res, f, indent=4, sort_keys=True)
+
+if args.baseline is not None:
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = benchmark.compare(res, baseline, args.tolerance)
+    for name, throughput, reference, ratio in regressions:
+        print("benchmark.py: Regression in " + name + ": "
+                + ("%.0f" % throughput) + " vs. " + ("%.0f" % reference)
+                + (" (%.1f%%)" % (ratio * 100.0)))
+    if len(regressions) > 0:
+        sys.exit(1)
@@ -40,7 +40,7 @@ print("")
 print("PyNNLess Example Script")
 print("=======================")
 print("")
-if len(sys.argv) != 2:
+if len(sys.argv) < 2:
     print("Usage: " + __main__.__file__ + " <SIMULATOR>")
     print
     simulators = pynl.PyNNLess.simulators()
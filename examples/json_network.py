@@ -19,7 +19,10 @@
 
 """
 Example of how to run a network specification stored in a JSON file with
-PyNNLess.
+PyNNLess. Optionally, the name of another network file may be passed as second
+argument, files with the extension ".npz" are loaded as binary network files
+(see pynnless.pynnless_storage). JSON networks can be converted to binary files
+using pynnless.pynnless_storage.json_to_binary.
 """
 
 import sys, os
@@ -27,15 +30,19 @@ import json
 import common.setup # Common example code (checks command line parameters)
 import common.params # Parameters for the models which work with all systems
 import pynnless as pynl
+import pynnless.pynnless_storage as storage
 
 # Create a new pl instance with the given backend
 backend = sys.argv[1]
 sim = pynl.PyNNLess(backend)
 
 # Run the network defined in the "json_network.json" file in the data directory
+# or the file given on the command line
+filename = os.path.join(common.setup.datapath, 'json_network.json')
+if len(sys.argv) > 2:
+    filename = sys.argv[2]
 print("Simulating network...")
-res = sim.run(json.load(open(os.path.join(common.setup.datapath,
-        'json_network.json'))))
+res = sim.run(storage.load_network(filename))
 print("Done!")
 
 # Serialize the output as json
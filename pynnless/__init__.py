@@ -31,6 +31,7 @@ from pynnless_constants import *
 
 # Import the exception classes
 from pynnless_exceptions import PyNNLessException
+from pynnless_exceptions import PyNNLessValidationException
 from pynnless_exceptions import PyNNLessVersionException
 
 # Import the "PyNNLessIsolated" class into the top-level package namespace
@@ -42,8 +43,10 @@ __version__ = "1.0.0"
 # Export all classes
 __all__ = [
     'PyNNLess', 'PyNNLessIsolated', 'PyNNLessException',
+    'PyNNLessValidationException',
     'PyNNLessVersionException', 'Population', 'SourcePopulation',
     'IfCondExpPopulation', 'AdExPopulation', 'Network',
     'SIGNALS', 'SIG_SPIKES', 'SIG_GE', 'SIG_GI', 'SIG_V', 'TYPES', 'TYPE_AD_EX',
-    'TYPE_SOURCE', 'TYPE_IF_COND_EXP', 'PARAMETER_LIMITS'
+    'TYPE_SOURCE', 'TYPE_IF_COND_EXP', 'PARAMETER_LIMITS', 'SPIKE_REDUCTIONS',
+    'SIGNAL_REDUCTIONS'
     ]
@@ -22,14 +22,14 @@ to a PyNN 0.7 or 0.8 simulation. Introduces yet another abstraction layer to
 allow the description of a network independent of the actual PyNN version.
 """
 
-# PyNN libraries
-import pyNN
-import pyNN.common
+# Numerical libraries. Note that PyNN itself is only imported once a simulator
+# is loaded, builder-only scripts do not pay for the PyNN import.
 import numpy as np
 
 # Simulator loading and lookup
 import importlib
 import pkgutil
+import hashlib
 
 # Logging
 import logging
@@ -43,7 +43,14 @@ import sys
 # Own classes
 import pynnless_builder as builder
 import pynnless_constants as const
+import pynnless_estimator as estimator
 import pynnless_exceptions as exceptions
+import pynnless_utils as utils
+import pynnless_optimizer as optimizer
+import pynnless_profiling as profiling
+import pynnless_results as results
+import pynnless_storage as storage
+import pynnless_validator as validator
 
 # Local logger, write to stderr
 logger = logging.getLogger("PyNNLess")
@@ -51,14 +58,6 @@ if len(logger.handlers) == 0:
     logger.addHandler(logging.NullHandler())
 logger.setLevel(logging.INFO)
 
-# Temporary file descriptors to the original stdout/stderr
-oldstdout = None
-oldstderr = None
-
-# Currently used file names for logging
-stdout_fn = None
-stderr_fn = None
-
 
 class PyNNLess:
     """
@@ -72,7 +71,18 @@ class PyNNLess:
     # were tested and will be returned by the "backends" method. The simulator
     # names are the normalized simulator names.
     SUPPORTED_SIMULATORS = {
-        "nest", "ess", "nmpm1", "nmmc1", "spikey"
+        "nest", "ess", "nmpm1", "nmmc1", "spikey", "mock",
+        "refsim", "eventsim"
+    }
+
+    # Simulators shipped with PyNNLess, maps the normalized simulator name onto
+    # the module within the PyNNLess package implementing the PyNN interface.
+    # These modules are imported directly without trying the "pyNN." prefix
+    # first (PyNN 0.8 ships its own, incompatible "pyNN.mock" module).
+    BUILTIN_SIMULATORS = {
+        "mock": "pynnless_mock",
+        "refsim": "pynnless_refsim",
+        "eventsim": "pynnless_eventsim",
     }
 
     # Used to map certain simulator names to a more canonical form. This
@@ -137,124 +147,145 @@ class PyNNLess:
         "spikey": {
             # No default setup parameters needed
         },
+        "mock": {
+            # No default setup parameters needed
+        },
+        "refsim": {
+            # No default setup parameters needed
+        },
+        "eventsim": {
+            # No default setup parameters needed
+        },
     }
 
+    # Environment variables which influence the set of simulators that can be
+    # found, used to invalidate the "probe_simulators" cache
+    PROBE_ENVIRONMENT = ["PYTHONPATH", "PYTHONHOME", "PYTHONUSERBASE",
+                         "LD_LIBRARY_PATH", "VIRTUAL_ENV", "CONDA_PREFIX"]
+
+    # Name of the file in the per-user cache directory storing the simulator
+    # probe results and the maximum number of fingerprints stored in it
+    PROBE_CACHE_FILE = "simulators.json"
+    PROBE_CACHE_SIZE = 16
+
+    # Simulator name which defers loading the simulator until the first call
+    # to "run", where the simulator with the lowest predicted runtime for the
+    # network is chosen, see estimator.select_simulator
+    AUTO_SIMULATOR = "auto"
+
+    # Simulators never chosen by the "auto" simulator
+    AUTO_EXCLUDED_SIMULATORS = ["mock"]
+
+    # Name of the file in the per-user cache directory storing the measured
+    # throughput of the simulators, see calibration.calibrate
+    CALIBRATION_FILE = "calibration.json"
+
+    # In-memory cache of the calibration profile file
+    _calibration_cache = None
+
+    # Timeout in seconds for loading a simulator when probing its capabilities
+    PROBE_TIMEOUT = 120.0
+
+    # In-memory cache of the last simulator probe, tuple containing the
+    # fingerprint and the probe result
+    _probe_cache = None
+
     # Time to wait after the last spike has been issued
     AUTO_DURATION_EXTENSION = 1000.0
 
+    # Maximum depth of the run phases for which the peak memory is recorded,
+    # the top-level phases have depth one, per-population phases depth two
+    MEMORY_PHASE_DEPTH = 2
+
+    # Error message used if the network passed to an open session differs in
+    # its structure from the network the session was created with
+    SESSION_STRUCTURE_ERROR = ("The structure of the network differs from " +
+        "the network of the open session, call \"close\" before running a " +
+        "different network")
+
     #
     # Private methods
     #
 
-    # Redirects a given unix file handle to the given file name, returns a new
-    # file descriptor pointing at the old fd
+    # Prints the last few lines of captured output
     @staticmethod
-    def _redirect_fd_to_file(fd, filename):
+    def _tail(capture, title):
         """
-        Redirects the given Unix file descriptor to a file with the given name.
+        Prints the lines stored in the ring buffer of the given FdCapture
+        instance.
         """
-        newFd = os.dup(fd)
-        os.close(fd)
-        os.open(filename, os.O_WRONLY | os.O_CREAT)
-        return newFd
+        if capture.line_count > 0:
+            logger.info("[" + title + "]")
+            if capture.line_count > len(capture.lines):
+                logger.info("[...]")
+            for line in capture.lines:
+                logger.info(line.strip('\n\r'))
+            if capture.spill_file is not None:
+                logger.info("[full output in " + capture.spill_file + "]")
+            logger.info("[end]")
 
-    # Redirects a given fd to another fd
-    @staticmethod
-    def _redirect_fd_to_fd(fd1, fd2):
+    def _redirect_io(self, do_redirect=True):
         """
-        Redirects the first (old) unix file descriptor to the second file
-        descriptor, the file which was previously known as fd1 will now be known
-        as fd2
+        Redirects both stderr and stdout into pipes, the output is collected in
+        a ring buffer (and optionally spilled into a file).
         """
-        os.close(fd2)
-        os.dup2(fd1, fd2)
-        os.close(fd1)
-
-    # Prints the last few lines of a file to stdout
-    @staticmethod
-    def _tail(filename, title):
-        """
-        Prints the last 100 lines of the file with the given name.
-        """
-        try:
-            with open(filename, 'r') as fd:
-                lines = fd.readlines()
-                if (len(lines) > 0):
-                    logger.info("[" + title + "]")
-                    if (len(lines) > 100):
-                        logger.info("[...]")
-                    for line in lines[-100:]:
-                        logger.info(line.strip('\n\r'))
-                    logger.info("[end]")
-        except:
-            pass
-
-    @classmethod
-    def _redirect_io(cls, do_redirect=True):
-        """
-        Redirects both stderr and stdout to some temporary files.
-        """
-        global oldstdout, oldstderr, stdout_fn, stderr_fn
 
         # Abort if redirection is disabled
         if not do_redirect:
             return
 
-        r = str(np.random.randint(1 << 16))
-        if (oldstdout is None):
-            stdout_fn = "stdout." + r + ".tmp"
-            oldstdout = cls._redirect_fd_to_file(1, stdout_fn)
-        if (oldstderr is None):
-            stderr_fn = "stderr." + r + ".tmp"
-            oldstderr = cls._redirect_fd_to_file(2, stderr_fn)
+        with self._phase("redirect_io"):
+            if self.io_capture is None:
+                self.io_capture = tuple(utils.FdCapture(fd,
+                    self.io_tail_lines, self.io_spill, self.io_spill_keep)
+                    for fd in [1, 2])
+            for capture in self.io_capture:
+                capture.start()
 
-    @classmethod
-    def _unredirect_io(cls, tail=True):
+    def _unredirect_io(self, tail=True):
         """
         Reverts the redirection performed by _redirect_io and prints the last
-        few lines of both files (if the "tail" parameter is set ot true).
+        few lines of both captured streams (if the "tail" parameter is set to
+        true).
         """
-        global oldstdout, oldstderr, stdout_fn, stderr_fn
-
-        try:
-            if oldstderr is not None and stderr_fn is not None:
-                sys.stderr.flush()
+        if self.io_capture is None:
+            return
+        stdout_capture, stderr_capture = self.io_capture
+        if not (stdout_capture.is_active() or stderr_capture.is_active()):
+            return
+        with self._phase("unredirect_io"):
+            for capture, title in [(stderr_capture, "stderr"),
+                                   (stdout_capture, "stdout")]:
                 try:
-                    cls._redirect_fd_to_fd(oldstderr, 2)
+                    if capture.is_active():
+                        capture.stop()
+                        if (tail):
+                            self._tail(capture, title)
                 except:
                     pass
-                if (tail):
-                    cls._tail(stderr_fn, "stderr")
-                os.remove(stderr_fn)
-        except:
-            pass
-        finally:
-            oldstderr = None
-            stderr_fn = None
 
-        try:
-            if oldstdout is not None and stdout_fn is not None:
-                sys.stdout.flush()
-                cls._redirect_fd_to_fd(oldstdout, 1)
-                if (tail):
-                    cls._tail(stdout_fn, "stdout")
-                os.remove(stdout_fn)
-        except:
-            pass
-        finally:
-            oldstdout = None
-            stdout_fn = None
+    def _phase(self, name):
+        """
+        Returns a context manager measuring the time spent in the phase with
+        the given name, see the "get_time_info" method.
+        """
+        if (self.profiler is None) or (not self.profiler.is_active()):
+            return profiling.null_phase()
+        return self.profiler.phase(name)
 
     @staticmethod
-    def _check_version(version=pyNN.__version__):
+    def _check_version(version=None):
         """
         Internally used to check the current PyNN version. Sets the "version"
         variable to the correct API version and raises an exception if the PyNN
         version is not supported.
 
-        :param version: the PyNN version string to be checked, should be the
-        value of pyNN.__version__
+        :param version: the PyNN version string to be checked, if None, PyNN is
+        imported and the value of pyNN.__version__ is used.
         """
+        if version is None:
+            import pyNN
+            version = pyNN.__version__
         if (version[0:3] == '0.6'):
             return 6
         elif (version[0:3] == '0.7'):
@@ -290,6 +321,10 @@ class PyNNLess:
             imports.append("pyNN." + normalized)
         if (normalized in cls.SIMULATOR_IMPORT_MAP):
             imports.extend(cls.SIMULATOR_IMPORT_MAP[normalized])
+        if (normalized in cls.BUILTIN_SIMULATORS):
+            package = __name__.rpartition(".")[0]
+            imports = [(package + "." if package else "") +
+                       cls.BUILTIN_SIMULATORS[normalized]]
 
         return (normalized, unique(imports))
 
@@ -307,9 +342,11 @@ class PyNNLess:
         # Try to load the simulator module
         sim = None
         normalized, imports = PyNNLess._lookup_simulator(simulator)
+        captures = [utils.FdCapture(1), utils.FdCapture(2)]
         for i in xrange(len(imports)):
             try:
-                cls._redirect_io()
+                for capture in captures:
+                    capture.start()
                 sim = importlib.import_module(imports[i])
                 break
             except ImportError:
@@ -320,8 +357,9 @@ class PyNNLess:
                         "which seem to bee supported on this machine are: " +
                         str(PyNNLess.simulators()))
             finally:
-                # Set tail=False, do not print ANY clutter from the loader
-                cls._unredirect_io(False)
+                # Do not print ANY clutter from the loader
+                for capture in captures:
+                    capture.stop()
         return (sim, normalized)
 
     @staticmethod
@@ -441,6 +479,41 @@ class PyNNLess:
         if "summarise_io" in setup:
             self.summarise_io = bool(setup["summarise_io"])
             del setup["summarise_io"]
+        if "io_tail_lines" in setup:
+            self.io_tail_lines = int(setup["io_tail_lines"])
+            del setup["io_tail_lines"]
+        if "io_spill" in setup:
+            self.io_spill = setup["io_spill"]
+            del setup["io_spill"]
+        if "io_spill_keep" in setup:
+            self.io_spill_keep = bool(setup["io_spill_keep"])
+            del setup["io_spill_keep"]
+        if "timing_callback" in setup:
+            self.timing_callback = setup["timing_callback"]
+            del setup["timing_callback"]
+        if "track_memory" in setup:
+            self.track_memory = bool(setup["track_memory"])
+            del setup["track_memory"]
+        if "validate" in setup:
+            self.validate = bool(setup["validate"])
+            del setup["validate"]
+        if "prune" in setup:
+            self.prune = bool(setup["prune"])
+            del setup["prune"]
+        if "prune_threshold" in setup:
+            self.prune_threshold = float(setup["prune_threshold"])
+            del setup["prune_threshold"]
+        if "merge_populations" in setup:
+            self.merge_populations = bool(setup["merge_populations"])
+            del setup["merge_populations"]
+        if "lock_wait" in setup:
+            # Only used by estimator.select_simulator for the "auto" simulator
+            del setup["lock_wait"]
+        if "trace_heap" in setup:
+            if setup["trace_heap"] and not profiling.start_tracing_heap():
+                logger.warning("Tracing the Python heap requires tracemalloc, " +
+                               "which is not available in this Python version")
+            del setup["trace_heap"]
 
         # PyNN 0.7 compatibility hack: Update min_delay/timestep if only one
         # of the values is set
@@ -564,23 +637,19 @@ class PyNNLess:
                                   "initialization failed")
                 pass
 
-    def _build_population(self, population, min_delay=0):
+    def _population_params(self, population, min_delay=0):
         """
-        Used internally to creates a PyNN neuron population according to the
-        parameters specified in the "population" object.
+        Assembles the list of neuron parameters for the given (canonicalized)
+        population descriptor. Merges the user-supplied parameters with the
+        default parameters, performs the backend specific parameter adaptations
+        and fixes the spike times.
 
-        :param population: is the population descriptor, containing the count of
-        neurons within the population, the neuron type, the neuron parameters
-        and whether the parameters should be recorded or not.
+        :param population: builder.Population instance.
+        :return: a tuple containing the PyNN type name, the PyNN type, a flag
+        indicating whether the population is a spike source and the list of
+        parameters.
         """
 
-        # Convert the given population dictionary into a managed Population
-        # object
-        population = builder.Population(population)
-
-        # Fetch the neuron count
-        count = population["count"]
-
         # Translate the neuron types to the PyNN neuron type
         type_name = self._remap_neuron_type(population["type"])
         if (not hasattr(self.sim, type_name)):
@@ -609,20 +678,17 @@ class PyNNLess:
                                       "exist for neuron type '" + type_name + "'. Value " +
                                       "will be ignored!")
 
-        # Fetch the parameter dimensions that should be recorded for this
-        # population, make sure the elements in "record" are sorted
-        record = population["record"]
-        for signal in record:
-            if (not signal in const.SIGNALS):
-                self.warnings.add("Unknown signal \"" + signal
-                                  + "\". May be ignored by the backend.")
-
         # Make sure the spike times are larger or equal to one -- this
         # otherwise causes a problem with the spikes simply discarded when
-        # using NEST
+        # using NEST. Spike times given as (possibly memory-mapped, read-only)
+        # arrays are copied.
         for i in xrange(len(params)):
             if "spike_times" in params[i]:
                 min_t = max(min_delay, 1.0)
+                if isinstance(params[i]["spike_times"], np.ndarray):
+                    params[i]["spike_times"] = np.sort(np.maximum(
+                        params[i]["spike_times"], min_t))
+                    continue
                 for j, t in enumerate(params[i]["spike_times"]):
                     if t < min_t:
                         params[i]["spike_times"][j] = min_t
@@ -632,78 +698,161 @@ class PyNNLess:
         if ("spike_times" in params) and (len(params["spike_times"]) == 0):
             del params["spike_times"]
 
-        # Create the output population, in case this is not a source population,
-        # also force the neuron membrane potential to be initialized with the
-        # neuron membrane potential.
-        try:
-            self._redirect_io(do_redirect=self.do_redirect)
-            # Use global parameters if the length of the parameter list is
-            # exactly one -- otherwise we'll override the parameters given here
-            # in a later step.
-            # Note: deepcopy is needed because of spyNNaker bug #161
-            res = self.sim.Population(count, type_, copy.deepcopy(params[0]))
-            if len(params) == 1:
-                self._init_cells(is_source, res, params[0])
+        return type_name, type_, is_source, params
+
+    def _set_population_params(self, res, count, params, is_source,
+                               indices=None):
+        """
+        Sets the parameters of the given PyNN population. If "params" contains
+        exactly one entry, the parameters are shared by all neurons, otherwise
+        the parameters are set for each neuron individually.
+
+        :param res: PyNN population the parameters should be applied to.
+        :param count: number of neurons in the population.
+        :param params: list of parameter dictionaries.
+        :param is_source: True if the population is a spike source population.
+        :param indices: indices of the neurons whose parameters should be
+        updated. If None, all neuron parameters are set.
+        """
+        if len(params) == 1:
+            self._init_cells(is_source, res, params[0])
+            if self.version <= 7:
+                res.set(params[0])
             else:
-                for i in xrange(count):
-                    if hasattr(self.sim, "PopulationView"):
-                        # The PopulationView class is the best way to set
-                        # individual neuron parameters in a population, however
-                        # it is not available on NM-MC1 and Spikey
-                        view = self.sim.PopulationView(res, [i])
-                        self._init_cells(is_source, view, params[i])
-                        if self.version <= 7:
-                            view.set(params[i])
-                        else:
-                            view.set(**params[i])
-#                    # Only for reference: This works nowhere (except Spikey)
-#                    elif hasattr(res, "__getitem__"):
-#                        if not is_source:
-#                            try:
-#                                self.sim.initialize(res[i], params[i]["v_rest"])
-#                            except:
-#                                pass # Does not work with Spikey and NMPM1
-#                        if self.simulator == "spikey":
-#                            for key in params[i].keys():
-#                                self.sim.set(res[i], res[i].cellclass, key, params[i][key])
-#                        elif self.version <= 7:
-#                            self.sim.set(res[i], params[i])
-#                        else:
-#                            self.sim.set(res[i], **params[i])
-                    else:
-                        # Use the tset method which has a less convenient
-                        # interface and requires an array for each parameter,
-                        # containing the values for each neuron.
-
-                        # First assemble a list of parameter values for each
-                        # parameter key. Note that the available parameter keys
-                        # were unified in the merge_default_parameters method
-                        keys = params[0].keys()
-                        tvals = dict([(key, [[]] * count) for key in keys])
-                        uni = dict([(key, True) for key in keys])
-                        for i in xrange(count):
-                            for k in keys:
-                                tvals[k][i] = params[i][k]
-                                uni[k] = uni[k] and tvals[k][0] == tvals[k][i]
-
-                        # Actually call tset for all keys for which there is a
-                        # difference
-                        for k in tvals.keys():
-                            if not uni[k]:
-                                res.tset(k, tvals[k])
-        finally:
-            self._unredirect_io(False)
+                res.set(**params[0])
+            return
 
-        # Increment the neuron counter needed to work around a bug in spikey,
-        # store the neuron index in the created population
-        if not is_source:
-            if self.simulator == "spikey":
-                setattr(res, "__offs", self.neuron_count)
-            self.neuron_count += count
+        if indices is None:
+            indices = xrange(count)
+        for i in indices:
+            if hasattr(self.sim, "PopulationView"):
+                # The PopulationView class is the best way to set
+                # individual neuron parameters in a population, however
+                # it is not available on NM-MC1 and Spikey
+                view = self.sim.PopulationView(res, [i])
+                self._init_cells(is_source, view, params[i])
+                if self.version <= 7:
+                    view.set(params[i])
+                else:
+                    view.set(**params[i])
+#            # Only for reference: This works nowhere (except Spikey)
+#            elif hasattr(res, "__getitem__"):
+#                if not is_source:
+#                    try:
+#                        self.sim.initialize(res[i], params[i]["v_rest"])
+#                    except:
+#                        pass # Does not work with Spikey and NMPM1
+#                if self.simulator == "spikey":
+#                    for key in params[i].keys():
+#                        self.sim.set(res[i], res[i].cellclass, key, params[i][key])
+#                elif self.version <= 7:
+#                    self.sim.set(res[i], params[i])
+#                else:
+#                    self.sim.set(res[i], **params[i])
+            else:
+                # Use the tset method which has a less convenient
+                # interface and requires an array for each parameter,
+                # containing the values for each neuron.
+
+                # First assemble a list of parameter values for each
+                # parameter key. Note that the available parameter keys
+                # were unified in the merge_default_parameters method
+                keys = params[0].keys()
+                tvals = dict([(key, [[]] * count) for key in keys])
+                uni = dict([(key, True) for key in keys])
+                for j in xrange(count):
+                    for k in keys:
+                        tvals[k][j] = params[j][k]
+                        uni[k] = uni[k] and tvals[k][0] == tvals[k][j]
+
+                # Actually call tset for all keys for which there is a
+                # difference
+                for k in tvals.keys():
+                    if not uni[k]:
+                        res.tset(k, tvals[k])
+                break
 
-        # Setup recording
+    def _record_population(self, res, count, record):
+        """
+        Sets up the recording of the given signals for the given PyNN
+        population. Signals restricted to a subset of neurons are recorded from
+        a PopulationView if the backend supports this, otherwise the entire
+        population is recorded and the data is sliced once it is fetched. The
+        selection is stored in the "__record_neurons" attribute of the
+        population, the recording options in the "__record_options" attribute.
+        """
+        signals = []
+        selections = {}
+        options = builder.Population.record_options(record)
+        sampling_interval = self._sampling_interval(options)
+        for signal in sorted(options.keys()):
+            neurons = builder.Population.record_neurons(options[signal], count)
+            if neurons is None:
+                signals.append(signal)
+                continue
+            is_view = len(neurons) > 0 and self._record_view(res, neurons,
+                signal, sampling_interval)
+            if (not is_view) and (len(neurons) > 0):
+                signals.append(signal)
+            selections[signal] = (neurons, is_view)
+        self._record_signals(res, count, signals, sampling_interval)
+        setattr(res, "__record_neurons", selections)
+        setattr(res, "__record_options", options)
+
+    def _sampling_interval(self, options):
+        """
+        Returns the sampling interval which should be passed to the PyNN 0.8
+        "record" method or None if the backend should sample at the timestep.
+        The interval is only passed if all analog signals of the population
+        request the same interval, it is rounded down to a multiple of the
+        timestep. Signals are decimated to the requested interval after they
+        have been fetched.
+        """
+        if self.version != 8:
+            return None
+        intervals = set(opts.get("sampling_interval")
+                        for signal, opts in options.items()
+                        if signal != const.SIG_SPIKES)
+        if (len(intervals) != 1) or (None in intervals):
+            return None
+        timestep = self.get_time_step()
+        steps = int(intervals.pop() / timestep + 1e-6)
+        return steps * timestep if steps > 1 else None
+
+    def _record_view(self, res, neurons, signal, sampling_interval=None):
+        """
+        Records the given signal from the neurons with the given indices using
+        a PopulationView. Returns False if the backend does not support this.
+        """
+        if self.simulator == "spikey":
+            return False
+        try:
+            view = res[neurons]
+            if (self.version <= 7):
+                if (signal == const.SIG_SPIKES):
+                    view.record()
+                elif (signal == const.SIG_V):
+                    view.record_v()
+                else:
+                    view.record_gsyn()
+            elif sampling_interval is not None:
+                view.record([signal], sampling_interval=sampling_interval)
+            else:
+                view.record([signal])
+        except Exception:
+            self.warnings.add("Recording from a subset of neurons is not " +
+                              "supported by the backend, recording the " +
+                              "entire population instead")
+            return False
+        return True
+
+    def _record_signals(self, res, count, record, sampling_interval=None):
+        """
+        Records the given signals from all neurons of the given PyNN population.
+        """
+        if len(record) == 0:
+            return
         if (self.version <= 7):
-            # Setup recording
             if (const.SIG_SPIKES in record):
                 res.record()
             if (const.SIG_V in record):
@@ -726,8 +875,72 @@ class PyNNLess:
             if ((const.SIG_GE in record) or (const.SIG_GI in record)):
                 res.record_gsyn()
         elif (self.version == 8):
-            # Setup recording
-            res.record(record)
+            if sampling_interval is not None:
+                res.record(record, sampling_interval=sampling_interval)
+            else:
+                res.record(record)
+
+    def _build_population(self, population, min_delay=0):
+        """
+        Used internally to creates a PyNN neuron population according to the
+        parameters specified in the "population" object.
+
+        :param population: is the population descriptor, containing the count of
+        neurons within the population, the neuron type, the neuron parameters
+        and whether the parameters should be recorded or not.
+        :return: a tuple containing the PyNN population and the list of
+        parameters that were applied to the population.
+        """
+
+        # Convert the given population dictionary into a managed Population
+        # object
+        population = builder.Population(population)
+
+        # Fetch the neuron count
+        count = population["count"]
+
+        # Assemble the neuron parameters
+        with self._phase("params"):
+            type_name, type_, is_source, params = self._population_params(
+                population, min_delay)
+
+        # Fetch the parameter dimensions that should be recorded for this
+        # population, make sure the elements in "record" are sorted
+        record = population["record"]
+        for signal in record:
+            if (not signal in const.SIGNALS):
+                self.warnings.add("Unknown signal \"" + signal
+                                  + "\". May be ignored by the backend.")
+
+        # Create the output population, in case this is not a source population,
+        # also force the neuron membrane potential to be initialized with the
+        # neuron membrane potential.
+        try:
+            self._redirect_io(do_redirect=self.do_redirect)
+            with self._phase("create"):
+                # Use global parameters if the length of the parameter list is
+                # exactly one -- otherwise we'll override the parameters given
+                # here in a later step.
+                # Note: deepcopy is needed because of spyNNaker bug #161
+                res = self.sim.Population(count, type_,
+                                          copy.deepcopy(params[0]))
+                if len(params) == 1:
+                    self._init_cells(is_source, res, params[0])
+                else:
+                    self._set_population_params(res, count, params, is_source)
+        finally:
+            self._unredirect_io(False)
+
+        # Increment the neuron counter needed to work around a bug in spikey,
+        # store the neuron index in the created population
+        if not is_source:
+            if self.simulator == "spikey":
+                setattr(res, "__offs", self.neuron_count)
+            self.neuron_count += count
+
+        # Setup recording
+        with self._phase("record"):
+            self._record_population(res, count, record)
 
         # Workaround bug in NMPM1, "size" attribute does not exist
         if (not hasattr(res, "size")):
@@ -742,14 +955,20 @@ class PyNNLess:
             finally:
                 self._unredirect_io(False)
 
-        return res
+        return res, params
 
     @staticmethod
     def _build_connections(connections, min_delay=0, separate=False):
         """
         Gets an array of [[pid_src, nid_src], [pid_tar, nid_tar], weight, delay]
-        tuples an builds a dictionary of all (pid_src, pid_tar) mappings.
-        """
+        tuples an builds a dictionary of all (pid_src, pid_tar) mappings. The
+        connections may alternatively be given as a matrix with the columns
+        pid_src, nid_src, pid_tar, nid_tar, weight and delay, see the
+        pynnless_storage module.
+        """
+        if isinstance(connections, np.ndarray):
+            return PyNNLess._build_connections_matrix(connections, min_delay,
+                                                      separate)
         res_exc = {}
         res_inh = {}
         for connection in connections:
@@ -765,6 +984,174 @@ class PyNNLess:
                 res_tar[pids] = [descrs]
         return res_exc, res_inh
 
+    @staticmethod
+    def _build_connections_matrix(connections, min_delay=0, separate=False):
+        """
+        Vectorized version of "_build_connections" for connection matrices.
+        """
+        res_exc = {}
+        res_inh = {}
+        if connections.shape[0] == 0:
+            return res_exc, res_inh
+        pids = connections[:, [0, 2]].astype(np.int64)
+        nids = connections[:, [1, 3]].astype(np.int64)
+        weights = np.asarray(connections[:, 4], dtype=np.float64)
+        delays = np.maximum(min_delay, connections[:, 5]).astype(np.float64)
+        inh = (weights <= 0) if separate else np.zeros(len(weights), dtype=bool)
+        if separate:
+            weights = np.abs(weights)
+
+        # Sort the connections by population pair, keep the original order
+        # within each pair
+        order = np.lexsort((pids[:, 1], pids[:, 0], inh))
+        keys = np.column_stack((inh[order], pids[order]))
+        bounds = np.nonzero(np.any(keys[1:] != keys[:-1], axis=1))[0] + 1
+        bounds = [0] + bounds.tolist() + [len(order)]
+        for i in xrange(len(bounds) - 1):
+            idx = order[bounds[i]:bounds[i + 1]]
+            res_tar = res_inh if inh[idx[0]] else res_exc
+            res_tar[(int(pids[idx[0], 0]), int(pids[idx[0], 1]))] = zip(
+                nids[idx, 0].tolist(), nids[idx, 1].tolist(),
+                weights[idx].tolist(), delays[idx].tolist())
+        return res_exc, res_inh
+
+    @staticmethod
+    def _connection_matrices(descrs, n_src, n_tar):
+        """
+        Converts a list of (nid_src, nid_tar, weight, delay) tuples into a
+        weight and a delay matrix of shape (n_src, n_tar) as accepted by the
+        PyNN projection weight and delay setters. Entries for which no
+        connection exists are set to NaN.
+        """
+        weights = np.empty((n_src, n_tar))
+        delays = np.empty((n_src, n_tar))
+        weights.fill(np.nan)
+        delays.fill(np.nan)
+        for nid_src, nid_tar, weight, delay in descrs:
+            if not np.isnan(weights[nid_src, nid_tar]):
+                raise exceptions.PyNNLessException("Cannot update the " +
+                    "weights of a projection with multiple connections " +
+                    "between the same pair of neurons")
+            weights[nid_src, nid_tar] = weight
+            delays[nid_src, nid_tar] = delay
+        return weights, delays
+
+    @staticmethod
+    def _params_equal(p1, p2):
+        """
+        Returns True if the two given parameter dictionaries are equal.
+        """
+        if set(p1.keys()) != set(p2.keys()):
+            return False
+        for key in p1.keys():
+            if not np.array_equal(p1[key], p2[key]):
+                return False
+        return True
+
+    def _build_projections(self, populations, connections_exc,
+                           connections_inh):
+        """
+        Creates the PyNN projections for the connections grouped by the
+        "_build_connections" method.
+
+        :return: a dictionary mapping from ("exc" or "inh", pids) tuples onto
+        the list of PyNN projections created for this population pair.
+        """
+        res = {}
+        for pids, descrs in connections_exc.items():
+            with self._phase("projection[" + str(pids[0]) + "->" +
+                             str(pids[1]) + "]"):
+                res[("exc", pids)] = [
+                    self.sim.Projection(
+                        populations[pids[0]], populations[pids[1]],
+                        self.sim.FromListConnector(descrs))
+                    for _ in xrange(self.repeat_projections)]
+        for pids, descrs in connections_inh.items():
+            with self._phase("projection[" + str(pids[0]) + "->" +
+                             str(pids[1]) + ",inh]"):
+                res[("inh", pids)] = [
+                    self.sim.Projection(
+                        populations[pids[0]], populations[pids[1]],
+                        self.sim.FromListConnector(descrs),
+                        target="inhibitory")
+                    for _ in xrange(self.repeat_projections)]
+        return res
+
+    def _update_session(self, network, timestep):
+        """
+        Applies the differences between the given network and the network of
+        the currently open session to the PyNN populations of the session.
+        Raises an exception if the structure of the network changed.
+
+        :return: the list of PyNN populations.
+        """
+        session = self.session
+        populations = session["populations"]
+        if len(network["populations"]) != len(populations):
+            raise exceptions.PyNNLessException(self.SESSION_STRUCTURE_ERROR)
+
+        for i in xrange(len(populations)):
+            population = builder.Population(network["populations"][i])
+            descr = session["descrs"][i]
+            if ((population["count"] != descr["count"]) or
+                    (population["type"] != descr["type"]) or
+                    (builder.Population.record_options(population["record"]) !=
+                     builder.Population.record_options(descr["record"]))):
+                raise exceptions.PyNNLessException(
+                    self.SESSION_STRUCTURE_ERROR)
+
+            # Only update the parameters of the neurons that actually changed
+            _, _, is_source, params = self._population_params(
+                population, timestep)
+            old_params = session["params"][i]
+            if len(params) == len(old_params):
+                indices = [j for j in xrange(len(params))
+                           if not self._params_equal(params[j], old_params[j])]
+            else:
+                indices = range(len(params))
+            if len(indices) > 0:
+                try:
+                    self._redirect_io(do_redirect=self.do_redirect)
+                    self._set_population_params(populations[i],
+                                                population["count"], params,
+                                                is_source, indices)
+                finally:
+                    self._unredirect_io(False)
+                session["params"][i] = params
+        return populations
+
+    def _update_projections(self, connections_exc, connections_inh):
+        """
+        Updates the weights and delays of the projections of the currently
+        open session. Raises an exception if the connected neuron pairs
+        changed.
+        """
+        session = self.session
+        populations = session["populations"]
+        for target, connections, old_connections in [
+                ("exc", connections_exc, session["connections"][0]),
+                ("inh", connections_inh, session["connections"][1])]:
+            if set(connections.keys()) != set(old_connections.keys()):
+                raise exceptions.PyNNLessException(
+                    self.SESSION_STRUCTURE_ERROR)
+            for pids, descrs in connections.items():
+                old_descrs = old_connections[pids]
+                if descrs == old_descrs:
+                    continue
+                if (sorted([d[0:2] for d in descrs]) !=
+                        sorted([d[0:2] for d in old_descrs])):
+                    raise exceptions.PyNNLessException(
+                        self.SESSION_STRUCTURE_ERROR)
+                weights, delays = self._connection_matrices(descrs,
+                    populations[pids[0]].size, populations[pids[1]].size)
+                for projection in session["projections"][(target, pids)]:
+                    if self.version <= 7:
+                        projection.setWeights(weights)
+                        projection.setDelays(delays)
+                    else:
+                        projection.set(weight=weights, delay=delays)
+        session["connections"] = (connections_exc, connections_inh)
+
     @staticmethod
     def _convert_pyNN7_spikes(spikes, n, idx_offs=0, t_scale=1.0):
         """
@@ -846,15 +1233,24 @@ class PyNNLess:
             # instead of per-neuron
             idx_offs = (getattr(population, "__offs")
                         if hasattr(population, "__offs") else 0)
+            t_scale = 1.0
             if self.simulator == "nmpm1":
-                return self._convert_pyNN7_spikes(population.getSpikes(),
-                                                  population.size, idx_offs=idx_offs + 1, t_scale=1000.0)
-            else:
-                return self._convert_pyNN7_spikes(population.getSpikes(),
-                                                  population.size, idx_offs=idx_offs)
+                idx_offs = idx_offs + 1
+                t_scale = 1000.0
+            with self._phase("get"):
+                spikes = population.getSpikes()
+            with self._phase("convert"):
+                return self._convert_pyNN7_spikes(spikes, population.size,
+                                                  idx_offs=idx_offs,
+                                                  t_scale=t_scale)
         elif (self.version == 8):
-            return self._convert_pyNN8_spikes(
-                population.get_data().segments[0].spiketrains)
+            # Use the last segment, previous segments contain the data of
+            # earlier runs in an open session
+            with self._phase("get"):
+                spiketrains = population.get_data(
+                    const.SIG_SPIKES).segments[-1].spiketrains
+            with self._phase("convert"):
+                return self._convert_pyNN8_spikes(spiketrains)
         return []
 
     def _fetch_signal(self, population, signal):
@@ -873,38 +1269,430 @@ class PyNNLess:
             return {"data": np.zeros((population.size, 0), dtype=np.float32),
                     "time": np.zeros((0), dtype=np.float32)}
         if (self.version <= 7):
-            if (signal == const.SIG_V):
-                # Special handling for the spikey simulator
-                if (self.simulator == "spikey"):
-                    if (hasattr(population, "__spikey_record_v")):
-                        return self._fetch_spikey_voltage(population)
-                else:
-                    return self._convert_pyNN7_signal(population.get_v(), 2,
-                                                      population.size)
-            elif (signal == const.SIG_GE):
-                return self._convert_pyNN7_signal(population.get_gsyn(), 2,
-                                                  population.size)
-            elif (signal == const.SIG_GI):
-                # Workaround in bug #124 in sPyNNaker, see
-                # https://github.com/SpiNNakerManchester/sPyNNaker/issues/124
-                if (self.simulator != "nmmc1"):
-                    return self._convert_pyNN7_signal(population.get_gsyn(), 3,
+            data = None
+            with self._phase("get"):
+                if (signal == const.SIG_V):
+                    # Special handling for the spikey simulator
+                    if (self.simulator == "spikey"):
+                        if (hasattr(population, "__spikey_record_v")):
+                            return self._fetch_spikey_voltage(population)
+                    else:
+                        data, idx = population.get_v(), 2
+                elif (signal == const.SIG_GE):
+                    data, idx = population.get_gsyn(), 2
+                elif (signal == const.SIG_GI):
+                    # Workaround in bug #124 in sPyNNaker, see
+                    # https://github.com/SpiNNakerManchester/sPyNNaker/issues/124
+                    if (self.simulator != "nmmc1"):
+                        data, idx = population.get_gsyn(), 3
+            if data is not None:
+                with self._phase("convert"):
+                    return self._convert_pyNN7_signal(data, idx,
                                                       population.size)
         elif (self.version == 8):
-            for array in population.get_data().segments[0].analogsignalarrays:
+            with self._phase("get"):
+                arrays = population.get_data(
+                    signal).segments[-1].analogsignalarrays
+            for array in arrays:
                 if (array.name == signal):
-                    return {
-                        "data": np.asarray(array, dtype=np.float32).transpose(),
-                        "time": np.asarray(array.times, dtype=np.float32)}
+                    with self._phase("convert"):
+                        return {
+                            "data": np.asarray(array,
+                                               dtype=np.float32).transpose(),
+                            "time": np.asarray(array.times, dtype=np.float32)}
         return {"data": np.zeros((population.size, 0), dtype=np.float32),
                 "time": np.zeros((0), dtype=np.float32)}
 
+    def _fetch_population_signal(self, population, signal, duration=0,
+                                 window=None):
+        """
+        Fetches a single signal recorded from the given PyNN population and
+        returns the corresponding entries of the result dictionary. If the
+        signal was only recorded from a subset of neurons, only the data of
+        those neurons is returned. If reductions were requested in the
+        recording options, they replace the data.
+
+        :param duration: simulation duration, used to calculate rates.
+        :param window: optional [t_start, t_stop] interval the data is cropped
+        to in addition to the "window" given in the recording options.
+        """
+        neurons, is_view = getattr(population, "__record_neurons", {}).get(
+            signal, (None, False))
+        source = population
+        if (neurons is not None) and is_view and (self.version == 8):
+            source = population[neurons]
+        if (neurons is not None) and (len(neurons) == 0):
+            if (signal == const.SIG_SPIKES):
+                return {signal: []}
+            return {signal: np.zeros((0, 0), dtype=np.float32),
+                    signal + "_t": np.zeros((0), dtype=np.float32)}
+
+        if (signal == const.SIG_SPIKES):
+            res = {signal: self._fetch_spikes(source)}
+        else:
+            data = self._fetch_signal(source, signal)
+            res = {signal: data["data"], signal + "_t": data["time"]}
+
+        # Select the requested neurons if the entire population was recorded
+        if (neurons is not None) and (source is population):
+            if (signal == const.SIG_SPIKES):
+                res[signal] = [res[signal][i] for i in neurons]
+            else:
+                res[signal] = res[signal][neurons]
+
+        # Crop and decimate the data according to the recording options
+        options = getattr(population, "__record_options", {}).get(signal, {})
+        if window is not None:
+            options = dict(options)
+            t_start, t_stop = options.get("window", window)
+            options["window"] = [max(t_start, window[0]),
+                                 min(t_stop, window[1])]
+        if (signal == const.SIG_SPIKES):
+            res[signal] = self._crop_spikes(res[signal], options)
+        else:
+            res[signal], res[signal + "_t"] = self._crop_signal(
+                res[signal], res[signal + "_t"], options)
+
+        # Replace the data with the requested reductions
+        if options.get("reduce"):
+            with self._phase("reduce"):
+                if (signal == const.SIG_SPIKES):
+                    t_start, t_stop = options.get("window", [0.0, duration])
+                    t_stop = min(t_stop, duration)
+                    return {signal: results.reduce_spikes(res[signal],
+                        options["reduce"], t_start, t_stop)}
+                return {signal: results.reduce_signal(res[signal],
+                                                      options["reduce"])}
+        return res
+
+    @staticmethod
+    def _crop_spikes(spikes, options):
+        """
+        Removes all spikes outside the "window" given in the recording options.
+        """
+        window = options.get("window")
+        if window is None:
+            return spikes
+        return [[t for t in train if (t >= window[0]) and (t < window[1])]
+                for train in spikes]
+
+    @staticmethod
+    def _crop_signal(data, times, options):
+        """
+        Removes all samples outside the "window" given in the recording options
+        and decimates the signal to the "sampling_interval" given in the
+        recording options. Returns the new data matrix and timescale.
+        """
+        window = options.get("window")
+        if window is not None:
+            i0 = np.searchsorted(times, window[0], side="left")
+            i1 = np.searchsorted(times, window[1], side="left")
+            data, times = data[:, i0:i1], times[i0:i1]
+        interval = options.get("sampling_interval")
+        if (interval is not None) and (len(times) > 1):
+            step = int(interval / float(times[1] - times[0]) + 1e-3)
+            if step > 1:
+                data, times = data[:, ::step], times[::step]
+        return data, times
+
+    def _lazy_results(self, network, populations, duration=0):
+        """
+        Creates the result structure returned by "run" in lazy mode. The data is
+        fetched from the populations of the current session on first access.
+        """
+        session = self.session
+        run_count = session["run_count"]
+
+        def is_valid():
+            return (self.session is session) and (
+                session["run_count"] == run_count)
+
+        def fetch(population):
+            def fetch_signal(signal):
+                try:
+                    self._redirect_io(do_redirect=self.do_redirect)
+                    return self._fetch_population_signal(population, signal,
+                                                         duration)
+                finally:
+                    self._unredirect_io(False)
+            return fetch_signal
+
+        return [results.LazyResult(fetch(populations[i]), is_valid,
+                                   network["populations"][i].get("record", []))
+                for i in xrange(len(populations))]
+
+    def _fetch_results(self, network, populations, writer=None, duration=0,
+                       window=None, clear=False):
+        """
+        Gathers the recorded data of all populations and stores it in the
+        result structure returned by "run".
+
+        :param writer: optional storage.ResultWriter instance, the data of each
+        population is written to disk right after it has been fetched and
+        replaced with handles.
+        :param duration: simulation duration, used to calculate rates.
+        :param window: optional [t_start, t_stop] interval the data is cropped
+        to.
+        :param clear: if True, the data recorded by the backend is discarded
+        after it has been fetched.
+        """
+        population_count = len(populations)
+        res = [{} for _ in xrange(population_count)]
+        for i in xrange(population_count):
+            if "record" in network["populations"][i]:
+                signals = builder.Population.canonicalize_record(
+                    network["populations"][i]["record"])
+                if len(signals) == 0:
+                    continue
+                with self._phase("population[" + str(i) + "]"):
+                    for signal in signals:
+                        with self._phase(signal):
+                            res[i].update(self._fetch_population_signal(
+                                populations[i], signal, duration, window))
+                    if clear:
+                        self._clear_recording(populations[i])
+                    if writer is not None:
+                        with self._phase("write"):
+                            res[i] = writer.store(i, res[i])
+        return res
+
+    def _clear_recording(self, population):
+        """
+        Discards the data recorded so far by the given PyNN population. Only
+        supported by PyNN 0.8, PyNN 0.7 backends keep the data.
+        """
+        if (self.version == 8):
+            with self._phase("clear"):
+                population.get_data([], clear=True)
+
+    @staticmethod
+    def _last_spike(network, res):
+        """
+        Returns the time of the last spike of the neurons (excluding spike
+        sources) recorded in the given segment result, -inf if no neuron spiked
+        and None if the spikes of no neuron population are recorded.
+        """
+        t_last = None
+        for i, population in enumerate(network["populations"]):
+            if (population.get("type") == const.TYPE_SOURCE) or (
+                    not const.SIG_SPIKES in res[i]):
+                continue
+            spikes = res[i][const.SIG_SPIKES]
+            if t_last is None:
+                t_last = -np.inf
+            if isinstance(spikes, dict):
+                if "last" in spikes:
+                    t_last = np.fmax(t_last, np.nanmax(
+                        np.append(spikes["last"], -np.inf)))
+                elif ("count" in spikes) or ("rate" in spikes):
+                    counts = spikes.get("count", spikes.get("rate"))
+                    if np.sum(counts) > 0:
+                        t_last = np.inf
+                else:
+                    return None
+            else:
+                for train in spikes:
+                    if len(train) > 0:
+                        t_last = max(t_last, train[-1])
+        return t_last
+
+    def _optimize_network(self, network, optimize=True, keep_open=False):
+        """
+        Applies the optimization passes enabled by the "prune" and
+        "merge_populations" setup flags to the given network if "optimize" is
+        True. Returns the network to be built and the list of transformations
+        to be passed to "_restore_results". If "keep_open" is True, connections
+        are not pruned by weight, as a weight updated to zero must not change
+        the structure of the open session.
+        """
+        transforms = []
+        if optimize and self.prune:
+            threshold = None if keep_open else self.prune_threshold
+            with self._phase("prune"):
+                pruned, info = optimizer.prune_network(network, threshold)
+            transforms.append((optimizer.unprune_results, info))
+            network = pruned
+        if optimize and self.merge_populations:
+            with self._phase("merge_populations"):
+                merged, info = optimizer.merge_populations(network)
+            if len(merged["populations"]) != len(network["populations"]):
+                transforms.append((optimizer.split_results, info))
+                network = merged
+        return network, transforms
+
+    @staticmethod
+    def _restore_results(res, transforms):
+        """
+        Maps the results of an optimized network back to the original network.
+        """
+        for restore, info in reversed(transforms):
+            res = restore(res, info)
+        return res
+
+    def _check_network(self, network, keep_open=False, duration=0):
+        """
+        Makes sure both the "populations" and "connections" arrays have been
+        supplied and that the simulator supports keeping the network open if
+        requested. Loads the simulator if it has been deferred by the "auto"
+        simulator, the given duration is used to estimate the runtime.
+        """
+        if (not "populations" in network):
+            raise exceptions.PyNNLessException("\"populations\" key must be " +
+                                               "present in network description")
+        if (not "connections" in network):
+            raise exceptions.PyNNLessException("\"connections\" key must be " +
+                                               "present in network description")
+        if self.sim is None:
+            # Deferred "auto" simulator, the setup flags have not been parsed
+            # yet. Validate the network before estimating its runtime.
+            if self.setup.get("validate", True):
+                self._validate_network(network, keep_open)
+            with self._phase("select_simulator"):
+                self._select_simulator(network, duration)
+        elif self.validate:
+            self._validate_network(network, keep_open)
+        if keep_open and (self.simulator in self.PREMATURE_END_SIMULATORS):
+            raise exceptions.PyNNLessException("Simulator \"" +
+                self.simulator + "\" does not support keeping the network " +
+                "open between runs")
+
+    def _validate_network(self, network, keep_open=False):
+        """
+        Validates the network. The connected neuron pairs are only checked
+        once per open session, unless the structure of the network changed.
+        """
+        structure = None
+        if self.session is not None:
+            structure = self.validated_structure
+        with self._phase("validate"):
+            structure = validator.check_network(network, logger, structure)
+        self.validated_structure = structure if keep_open else None
+
+    def _select_simulator(self, network, duration=0):
+        """
+        Loads the simulator with the lowest predicted runtime for the given
+        network, used by the "auto" simulator.
+        """
+        simulator = estimator.select_simulator(network, duration, self.setup,
+            exclude=self.AUTO_EXCLUDED_SIMULATORS)
+        logger.info("Automatically selected simulator \"" + simulator + "\"")
+        self._load(simulator, self.setup)
+
+    def _prepare_network(self, network, duration, keep_open=False):
+        """
+        Generates the neuron populations (or updates the populations of the
+        currently open session) and groups the connections.
+
+        :return: a tuple containing the list of PyNN populations, the list of
+        parameters applied to each population, the tuple of excitatory and
+        inhibitory connection matrices and the simulation duration rounded to
+        the timestep.
+        """
+
+        # Reset some state variables
+        self.parameter_warnings = set()
+        self.warnings = set()
+        if self.session is None:
+            self.record_v_count = 0
+            self.neuron_count = 0
+        else:
+            # Invalidates lazy results of the previous run
+            self.session["run_count"] += 1
+
+        # Fetch the timestep
+        timestep = self.get_time_step()
+
+        # Automatically fetch the runtime of the network if none is given
+        if duration <= 0:
+            duration = self._auto_duration(network)
+
+        # Round up the duration to the timestep -- fixes a problem with
+        # SpiNNaker
+        duration = int((duration + timestep) / timestep) * timestep
+
+        # Generate the neuron populations or update the populations of the
+        # currently open session
+        population_count = len(network["populations"])
+        params = [None for _ in xrange(population_count)]
+        if self.session is None:
+            populations = [None for _ in xrange(population_count)]
+            with self._phase("build_populations"):
+                for i in xrange(population_count):
+                    with self._phase("population[" + str(i) + "]"):
+                        populations[i], params[i] = self._build_population(
+                            network["populations"][i], timestep)
+        else:
+            with self._phase("update_populations"):
+                populations = self._update_session(network, timestep)
+
+        # Build the connection matrices
+        with self._phase("group_connections"):
+            separate_connections = self.simulator == "nmmc1"
+            connections_exc, connections_inh = self._build_connections(
+                network["connections"], timestep,
+                separate=separate_connections)
+
+        # Inform the user about the parameter adaptations and other warnings
+        for warning in self.warnings:
+            logger.warning(warning)
+        for warning in self.parameter_warnings:
+            logger.warning("Adapted neuron parameters: " + warning)
+        if len(self.parameter_warnings) != 0:
+            logger.warning("Parameter adaptations have been performed. Set " +
+                           "the setup flag \"fix_parameters\" to False to suppress this " +
+                           "behaviour.")
+        self.warnings = set()
+
+        return (populations, params, (connections_exc, connections_inh),
+                duration)
+
+    def _prepare_projections(self, network, populations, params, connections,
+                             keep_open=False):
+        """
+        Performs the actual connections or updates the weights of the existing
+        projections. Opens a new session if "keep_open" is set, resets the
+        simulator if the network has already been executed in this session.
+        """
+        connections_exc, connections_inh = connections
+        if self.session is None:
+            with self._phase("build_projections"):
+                projections = self._build_projections(populations,
+                    connections_exc, connections_inh)
+            if keep_open:
+                self.session = {
+                    "descrs": [builder.Population(p)
+                               for p in network["populations"]],
+                    "populations": populations,
+                    "projections": projections,
+                    "connections": (connections_exc, connections_inh),
+                    "params": params,
+                    "has_run": False,
+                    "run_count": 0
+                }
+        else:
+            with self._phase("update_projections"):
+                self._update_projections(connections_exc, connections_inh)
+            if self.session["has_run"]:
+                with self._phase("reset"):
+                    self.sim.reset()
+
+    def _end_run(self):
+        """
+        Closes the session and ends the simulation if this has not been done
+        yet.
+        """
+        self.session = None
+        if (not (self.simulator in self.PREMATURE_END_SIMULATORS)):
+            with self._phase("end"):
+                self.sim.end()
+
     @staticmethod
     def _get_default_timestep():
         """
         Returns the value of the "DEFAULT_TIMESTEP" attribute, which is stored
         in different places for multiple PyNN versions.
         """
+        import pyNN.common
         if hasattr(pyNN.common, "DEFAULT_TIMESTEP"):
             return pyNN.common.DEFAULT_TIMESTEP
         elif (hasattr(pyNN.common, "control")
@@ -912,6 +1700,99 @@ class PyNNLess:
             return pyNN.common.control.DEFAULT_TIMESTEP
         return 0.1  # Above values are not defined in PyNN 0.6
 
+    @classmethod
+    def _probe_fingerprint(cls):
+        """
+        Computes a hash over the Python interpreter, sys.path, the modification
+        times of the sys.path entries and the environment variables listed in
+        PROBE_ENVIRONMENT. Used to invalidate the simulator probe cache.
+        """
+        h = hashlib.sha1()
+        h.update(sys.executable + "\0" + sys.version + "\0")
+        for path in sys.path:
+            h.update(path + "\0")
+            try:
+                h.update(repr(os.stat(path if path else ".").st_mtime) + "\0")
+            except OSError:
+                pass
+        for key in cls.PROBE_ENVIRONMENT:
+            h.update(key + "=" + os.environ.get(key, "") + "\0")
+        return h.hexdigest()
+
+    @classmethod
+    def _simulator_capabilities(cls, sim, simulator, version):
+        """
+        Returns the PyNN version, the neuron types and the recordable signals
+        supported by the given simulator module.
+        """
+        if hasattr(sim, "__pynn_version__"):
+            pynn_version = sim.__pynn_version__
+        else:
+            import pyNN
+            pynn_version = pyNN.__version__
+
+        types = []
+        remap = cls.NEURON_TYPE_REMAP.get(simulator, {})
+        for type_name in const.TYPES:
+            if hasattr(sim, remap.get(type_name, type_name)):
+                types.append(type_name)
+
+        # Mirrors the restrictions implemented in "_fetch_signal"
+        if simulator in ["nmpm1", "eventsim"]:
+            signals = [const.SIG_SPIKES]
+        elif simulator == "spikey":
+            signals = [const.SIG_SPIKES, const.SIG_V]
+        elif simulator == "nmmc1" and version <= 7:
+            signals = [const.SIG_SPIKES, const.SIG_V, const.SIG_GE]
+        else:
+            signals = list(const.SIGNALS)
+
+        return {
+            "pynn_version": pynn_version,
+            "backend_version": getattr(sim, "__version__", None),
+            "types": types,
+            "signals": signals
+        }
+
+    @classmethod
+    def _probe_capabilities_isolated(cls, simulator):
+        """
+        Loads the given simulator in a separate process and returns its
+        capabilities.
+        """
+        import multiprocessing
+        q = multiprocessing.Queue()
+        p = multiprocessing.Process(target=_probe_capabilities_main,
+                                    args=(q, simulator))
+        p.start()
+        res = None
+        try:
+            res = q.get(timeout=cls.PROBE_TIMEOUT)
+        except:
+            pass
+        p.join(cls.PROBE_TIMEOUT)
+        if p.is_alive():
+            p.terminate()
+        if res is None:
+            res = {"pynn_version": None, "backend_version": None,
+                   "types": None, "signals": None}
+        return res
+
+    @classmethod
+    def _calibration(cls, simulator):
+        """
+        Returns the measured costs of the given normalized simulator stored in
+        the calibration profile file or None if it has not been calibrated.
+        """
+        if cls._calibration_cache is None:
+            profile = utils.read_json_file(
+                utils.local_data_file(cls.CALIBRATION_FILE), {})
+            if not isinstance(profile, dict):
+                profile = {}
+            cls._calibration_cache = profile
+        res = cls._calibration_cache.get(simulator)
+        return copy.deepcopy(res) if res is not None else None
+
     @classmethod
     def _auto_duration(cls, network):
         """
@@ -920,6 +1801,8 @@ class PyNNLess:
         """
 
         def _max_recursive(v, vs):
+            if isinstance(vs, np.ndarray):
+                return max(v, vs.max()) if vs.size > 0 else v
             for v2 in vs:
                 if isinstance(v2, list):
                     v = _max_recursive(v, v2)
@@ -999,12 +1882,67 @@ class PyNNLess:
     # Initialization time (time before sim.run)
     time_initialize = 0.0
 
+    # Profiler recording the phases of the last run
+    profiler = None
+
+    # Optional function called with the path and the node of each phase of a
+    # run once the phase has ended, set using the "timing_callback" setup flag
+    timing_callback = None
+
+    # Flag indicating whether the peak memory of the run phases should be
+    # recorded. Can be deactivated by setting the "track_memory" setup flag.
+    # The Python heap is only tracked if tracemalloc is tracing, which can be
+    # enabled using the "trace_heap" setup flag.
+    track_memory = True
+
+    # Flag indicating whether populations of the same type should be merged
+    # into a single backend population, see optimizer.merge_populations. Set
+    # using the "merge_populations" setup flag.
+    merge_populations = False
+
+    # Flag indicating whether populations and connections which cannot
+    # influence any recorded population should be removed, see
+    # optimizer.prune_network. Set using the "prune" setup flag, connections
+    # with an absolute weight smaller or equal to the "prune_threshold" setup
+    # flag are removed unless the network is kept open.
+    prune = False
+    prune_threshold = 0.0
+
+    # Flag indicating whether the network description should be validated
+    # before it is passed to the simulator, see validator.validate_network.
+    # Can be deactivated by setting the "validate" setup flag.
+    validate = True
+
+    # Structure of the last network validated with "keep_open" set, see
+    # validator.check_network. Within an open session a network with the same
+    # structure only has its parameters, weights and delays checked.
+    validated_structure = None
+
     # Flag indicating whether the I/O should be redirected
     do_redirect = True
 
     # Flag indicating whether the I/O should be summarised
     summarise_io = True
 
+    # Number of lines of the captured stdout/stderr output kept in memory and
+    # printed in the summary
+    io_tail_lines = 100
+
+    # If True, the complete captured output is additionally written to a file
+    # on a tmpfs, if a string is given, to a file in the directory with that
+    # name. The file is removed by "close" unless the "io_spill_keep" setup
+    # flag is set.
+    io_spill = False
+    io_spill_keep = False
+
+    # Tuple containing the FdCapture instances for stdout and stderr, created
+    # on first use
+    io_capture = None
+
+    # Network description, PyNN populations and projections kept alive between
+    # two calls to "run" if the "keep_open" flag is set, None otherwise
+    session = None
+
     def __init__(self, simulator, setup={}):
         """
         Tries to load the PyNN simulator with the given name. Throws an
@@ -1015,17 +1953,35 @@ class PyNNLess:
         :param simulator: name of the PyNN backend that should be used. Has to
         be the python module name stripped from the leading "pyNN.".
         Additionally handles some of the (wrong) simulator names passed by the
-        HBP Neuromorphic Compute Platform and adds support for NMPM1.
+        HBP Neuromorphic Compute Platform and adds support for NMPM1. If
+        AUTO_SIMULATOR ("auto") is given, loading the simulator is deferred
+        until the first call to "run" or "run_segments", where the simulator
+        with the lowest predicted runtime for the network is chosen. The
+        choice is kept for subsequent runs.
         :param setup: structure containing additional setup parameters to be
         passed to the "setup" method. Special PyNNLess specific setup parameters
         include the "fix_parameters" flag which indicates whether backend
         specific parameter adaptations should be performed.
         """
+        if simulator == self.AUTO_SIMULATOR:
+            self.simulator = simulator
+            self.setup = dict(setup)
+            return
+        self._load(simulator, setup)
 
-        self.version = self._check_version()
-        self.sim, self.simulator = self._load_simulator(simulator)
-        self.setup = self._setup_simulator(setup, self.sim, self.simulator,
-                                           self.version)
+    def _load(self, simulator, setup):
+        """
+        Loads the simulator with the given name and sets it up.
+        """
+        with profiling.span("load_simulator", "simulator",
+                            {"simulator": simulator}):
+            self.sim, self.simulator = self._load_simulator(simulator)
+            self.version = self._check_version(
+                getattr(self.sim, "__pynn_version__", None))
+        with profiling.span("setup_simulator", "simulator",
+                            {"simulator": self.simulator}):
+            self.setup = self._setup_simulator(setup, self.sim,
+                                               self.simulator, self.version)
 
         logger.info("Loaded and successfully set up simulator \""
                     + self.simulator + "\"")
@@ -1034,19 +1990,76 @@ class PyNNLess:
     def simulators(cls):
         """
         Returns a list of simulators that seem to be supported on this machine.
+        The result is cached, see "probe_simulators".
         """
-        res = []
-        for simulator in cls.SUPPORTED_SIMULATORS:
-            _, imports = PyNNLess._lookup_simulator(simulator)
-            for _import in imports:
-                try:
-                    loader = pkgutil.find_loader(_import)
-                    if (isinstance(loader, pkgutil.ImpLoader)):
-                        res.append(simulator)
-                        break
-                except ImportError:
-                    pass
-        return res
+        return sorted(cls.probe_simulators().keys())
+
+    @classmethod
+    def probe_simulators(cls, capabilities=False, refresh=False):
+        """
+        Returns a dictionary mapping from the normalized name of each simulator
+        that seems to be supported on this machine onto a dictionary containing
+        the name of the module which will be imported ("module"). The result is
+        cached in memory and in a per-user cache file, the cache is invalidated
+        whenever sys.path, the content of the sys.path directories or one of the
+        environment variables in PROBE_ENVIRONMENT change.
+
+        :param capabilities: if True, each simulator is additionally loaded in
+        a separate process and the PyNN version ("pynn_version"), the version of
+        the backend module ("backend_version"), the supported neuron types
+        ("types") and the recordable signals ("signals") are recorded. The
+        entries are None if the simulator failed to load.
+        :param refresh: if True, the cache is ignored.
+        """
+
+        # Try to read the probe result from the in-memory and file cache
+        fingerprint = cls._probe_fingerprint()
+        res = None
+        if not refresh:
+            if ((cls._probe_cache is not None) and
+                    (cls._probe_cache[0] == fingerprint)):
+                res = cls._probe_cache[1]
+            else:
+                cache = utils.read_json_file(
+                    utils.local_data_file(cls.PROBE_CACHE_FILE), {})
+                if isinstance(cache, dict) and (fingerprint in cache):
+                    res = cache[fingerprint]
+
+        # Look for the simulator modules
+        dirty = False
+        if res is None:
+            res = {}
+            for simulator in cls.SUPPORTED_SIMULATORS:
+                _, imports = PyNNLess._lookup_simulator(simulator)
+                for _import in imports:
+                    try:
+                        loader = pkgutil.find_loader(_import)
+                        if (isinstance(loader, pkgutil.ImpLoader)):
+                            res[simulator] = {"module": _import}
+                            break
+                    except ImportError:
+                        pass
+            dirty = True
+
+        # Load the simulators in order to probe their capabilities
+        if capabilities:
+            for simulator in res.keys():
+                if not "types" in res[simulator]:
+                    res[simulator].update(
+                        cls._probe_capabilities_isolated(simulator))
+                    dirty = True
+
+        # Update the cache
+        cls._probe_cache = (fingerprint, res)
+        if dirty:
+            filename = utils.local_data_file(cls.PROBE_CACHE_FILE)
+            cache = utils.read_json_file(filename, {})
+            if (not isinstance(cache, dict)) or (
+                    len(cache) >= cls.PROBE_CACHE_SIZE):
+                cache = {}
+            cache[fingerprint] = res
+            utils.write_json_file(filename, cache)
+        return copy.deepcopy(res)
 
     @classmethod
     def normalized_simulator_name(cls, simulator):
@@ -1130,14 +2143,13 @@ class PyNNLess:
         # sPyNNaker.
         # Do not call get_time_step() on the analogue hardware systems as this
         # will result in an exception.
-        timestep = self._get_default_timestep()
         if (hasattr(self.sim, "get_time_step") and not (
                 (self.simulator in self.ANALOGUE_SYSTEMS) or
                 (self.simulator == "nmmc1"))):
-            timestep = self.sim.get_time_step()
+            return self.sim.get_time_step()
         elif ("timestep" in self.setup):
-            timestep = self.setup["timestep"]
-        return timestep
+            return self.setup["timestep"]
+        return self._get_default_timestep()
 
     @classmethod
     def get_simulator_info_static(cls, simulator, inst=None):
@@ -1187,28 +2199,72 @@ class PyNNLess:
             res["shared_parameters"] = ["v_rest", "v_reset", "v_thresh",
                                         "e_rev_I"]
 
+        # Measured throughput of the simulator on this machine, see
+        # calibration.calibrate. The limits of the software simulators are
+        # replaced by the ones derived from the measured memory usage.
+        res["calibration"] = cls._calibration(simulator)
+        if res["is_software"] and (res["calibration"] is not None):
+            for key in ["max_neuron_count", "concurrency"]:
+                if key in res["calibration"]:
+                    res[key] = res["calibration"][key]
+
         return res
 
     def get_simulator_info(self):
         """
         Returns information about the currently selected simulator -- the
-        maximum number of neurons and how many simulations can run in parallel
-        on a single machine.
+        maximum number of neurons, how many simulations can run in parallel
+        on a single machine and the measured throughput ("calibration", None
+        if the simulator has not been calibrated, see calibration.calibrate).
         """
         return self.get_simulator_info_static(self.simulator, self)
 
     def get_time_info(self):
         """
         Returns timing information about the last run. All times are in seconds.
-        """
+        The "phases" entry contains the time spent in the individual phases of
+        the run as a tree, where each node is a dictionary with the entries
+        "name", "time" and "children". If memory tracking is active, the
+        top-level and per-population phases additionally contain the peak
+        resident set size ("rss_peak") and the peak traced Python heap size
+        ("heap_peak") in bytes. The "memory" entry contains the peaks over the
+        entire run.
+        """
+        root = self.profiler.root if self.profiler is not None else {}
         return {
             "total": self.time_total,
             "sim": self.time_sim,
             "initialize": self.time_initialize,
-            "finalize": self.time_finalize
+            "finalize": self.time_finalize,
+            "phases": copy.deepcopy(root) if len(root) > 0 else None,
+            "memory": {
+                "rss_peak": root.get("rss_peak"),
+                "heap_peak": root.get("heap_peak")
+            }
         }
 
-    def run(self, network, duration=0):
+    def close(self):
+        """
+        Ends the session opened by calling "run" with the "keep_open" flag set
+        to True and removes the files the captured output was spilled into
+        (see the "io_spill" setup flag).
+        """
+        try:
+            if self.session is not None:
+                self.session = None
+                try:
+                    self._redirect_io(do_redirect=self.do_redirect)
+                    self.sim.end()
+                finally:
+                    self._unredirect_io(self.summarise_io)
+        finally:
+            if self.io_capture is not None:
+                for capture in self.io_capture:
+                    capture.close()
+                self.io_capture = None
+
+    def run(self, network, duration=0, keep_open=False, output=None,
+            lazy=False):
         """
         Builds and runs the network described in the "network" structure.
 
@@ -1219,103 +2275,91 @@ class PyNNLess:
         :param duration: Simulation duration. If smaller than or equal to zero,
         the simulation duration is automatically determined depending on the
         last input spike time.
+        :param keep_open: if True, the PyNN populations and projections are kept
+        alive after the simulation. Subsequent calls to "run" with a network of
+        the same structure only apply the changed neuron parameters (such as
+        spike times) and connection weights and delays, reset the simulator and
+        run the network again. Call "close" or "run" with keep_open set to False
+        to end the session.
+        :param output: optional name of an NPZ file the recorded data is written
+        to while it is fetched. The returned structure then contains
+        storage.StoredArray and storage.StoredSpikeTrains handles instead of
+        the data, only the data of a single population is held in memory.
+        :param lazy: if True, the recorded data is only fetched and converted
+        once it is accessed. Requires keep_open to be set. The returned
+        results.LazyResult instances raise an exception when data that has not
+        been accessed yet is requested after the session has been run again or
+        closed.
         :return: the recorded signals for each population, signal type and
         neuron
         """
 
-        # First time measurement point
+        # First time measurement point, start a new phase tree
         t1 = time.time()
-
-        # Make sure both the "populations" and "connections" arrays have been
-        # supplied
-        if (not "populations" in network):
-            raise exceptions.PyNNLessException("\"populations\" key must be " +
-                                               "present in network description")
-        if (not "connections" in network):
-            raise exceptions.PyNNLessException("\"connections\" key must be " +
-                                               "present in network description")
-
-        # Reset some state variables
-        self.parameter_warnings = set()
-        self.warnings = set()
-        self.record_v_count = 0
-        self.neuron_count = 0
-
-        # Fetch the timestep
-        timestep = self.get_time_step()
-
-        # Automatically fetch the runtime of the network if none is given
+        self.profiler = profiling.Profiler("run", self.timing_callback,
+            self.MEMORY_PHASE_DEPTH if self.track_memory else None)
+
+        # Make sure the network description is valid
+        self._check_network(network, keep_open, duration)
+        if lazy and (not keep_open):
+            raise exceptions.PyNNLessException("Lazy results require the " +
+                "network to be kept open, set \"keep_open\" to True")
+        if lazy and (output is not None):
+            raise exceptions.PyNNLessException("Lazy results cannot be " +
+                "combined with an output file")
+
+        # Prune and merge populations, results are mapped back after fetching.
+        # The duration is determined from the original network.
         if duration <= 0:
             duration = self._auto_duration(network)
+        network, transforms = self._optimize_network(network,
+            (not lazy) and (output is None), keep_open)
 
-        # Round up the duration to the timestep -- fixes a problem with
-        # SpiNNaker
-        duration = int((duration + timestep) / timestep) * timestep
-
-        # Generate the neuron populations
-        population_count = len(network["populations"])
-        populations = [None for _ in xrange(population_count)]
-        for i in xrange(population_count):
-            populations[i] = self._build_population(
-                network["populations"][i], timestep)
-
-        # Build the connection matrices, and perform the actual connections
-        separate_connections = self.simulator == "nmmc1"
-        connections_exc, connections_inh = self._build_connections(
-            network["connections"], timestep, separate=separate_connections)
-
-        # Inform the user about the parameter adaptations and other warnings
-        for warning in self.warnings:
-            logger.warning(warning)
-        for warning in self.parameter_warnings:
-            logger.warning("Adapted neuron parameters: " + warning)
-        if len(self.parameter_warnings) != 0:
-            logger.warning("Parameter adaptations have been performed. Set " +
-                           "the setup flag \"fix_parameters\" to False to suppress this " +
-                           "behaviour.")
-        self.warnings = set()
+        # Build or update the populations and the connection matrices
+        populations, params, connections, duration = self._prepare_network(
+            network, duration, keep_open)
 
         try:
             self._redirect_io(do_redirect=self.do_redirect)
 
-            # Perform the actual connections
-            for pids, descrs in connections_exc.items():
-                for _ in xrange(self.repeat_projections):
-                    self.sim.Projection(
-                        populations[pids[0]], populations[pids[1]],
-                        self.sim.FromListConnector(descrs))
-            for pids, descrs in connections_inh.items():
-                for _ in xrange(self.repeat_projections):
-                    self.sim.Projection(
-                        populations[pids[0]], populations[pids[1]],
-                        self.sim.FromListConnector(descrs), target="inhibitory")
+            # Perform the actual connections or update the weights of the
+            # existing projections
+            self._prepare_projections(network, populations, params,
+                                      connections, keep_open)
 
             # Run the simulation, measure time
             t2 = time.time()
-            self.sim.run(duration)
+            with self._phase("sim"):
+                self.sim.run(duration)
             t3 = time.time()
 
             # End the simulation to fetch the results on nmpm1
             if (self.simulator in self.PREMATURE_END_SIMULATORS):
-                self.sim.end()
+                with self._phase("end"):
+                    self.sim.end()
 
             # Gather the recorded data and store it in the result structure
-            res = [{} for _ in xrange(population_count)]
-            for i in xrange(population_count):
-                if "record" in network["populations"][i]:
-                    signals = builder.Population.canonicalize_record(
-                        network["populations"][i]["record"])
-                    for signal in signals:
-                        if (signal == const.SIG_SPIKES):
-                            res[i][signal] = self._fetch_spikes(populations[i])
-                        else:
-                            data = self._fetch_signal(populations[i], signal)
-                            res[i][signal] = data["data"]
-                            res[i][signal + "_t"] = data["time"]
-
-            # End the simulation if this has not been done yet
-            if (not (self.simulator in self.PREMATURE_END_SIMULATORS)):
-                self.sim.end()
+            if self.session is not None:
+                self.session["has_run"] = True
+            writer = None
+            try:
+                if lazy:
+                    res = self._lazy_results(network, populations, duration)
+                else:
+                    if output is not None:
+                        writer = storage.ResultWriter(output)
+                    with self._phase("fetch"):
+                        res = self._fetch_results(network, populations,
+                                                  writer, duration)
+                    res = self._restore_results(res, transforms)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            # End the simulation if this has not been done yet and the network
+            # should not be kept open
+            if not keep_open:
+                self._end_run()
         finally:
             self._unredirect_io(self.summarise_io)
 
@@ -1326,6 +2370,7 @@ class PyNNLess:
         # Store the time measurements, can be retrieved using the
         # "get_time_info" method
         t4 = time.time()
+        self.profiler.finish()
         self.time_total = t4 - t1
         self.time_sim = t3 - t2
         self.time_initialize = t2 - t1
@@ -1333,3 +2378,174 @@ class PyNNLess:
 
         return res
 
+    def run_segments(self, network, segment_duration, duration=0,
+                     keep_open=False):
+        """
+        Builds the network described in the "network" structure and simulates
+        it in segments of the given duration. The data recorded in each segment
+        is fetched and cleared after the segment has been simulated, so the
+        memory consumption does not grow with the simulation duration. Note
+        that with PyNN 0.7 the backend still keeps the recorded data, the
+        returned data is cropped to the segment.
+
+        This method is a generator, the simulation only advances while the
+        generator is being consumed. The network is ended once the generator is
+        exhausted or closed.
+
+        :param network: network description, see "run".
+        :param segment_duration: duration of a single segment in ms.
+        :param duration: total simulation duration. If smaller than or equal to
+        zero, the duration is automatically determined, see "run".
+        :param keep_open: if True, the network is kept open after the last
+        segment, see "run".
+        :return: yields a tuple (t_start, t_stop, res) for each segment, where
+        "res" has the same structure as the result of "run" and contains the
+        data recorded in the interval [t_start, t_stop).
+        """
+
+        # First time measurement point, start a new phase tree
+        t1 = time.time()
+        self.profiler = profiling.Profiler("run_segments",
+            self.timing_callback,
+            self.MEMORY_PHASE_DEPTH if self.track_memory else None)
+
+        # Make sure the network description is valid
+        self._check_network(network, keep_open, duration)
+        if (self.simulator in self.PREMATURE_END_SIMULATORS):
+            raise exceptions.PyNNLessException("Simulator \"" +
+                self.simulator + "\" does not support segmented runs")
+        if segment_duration <= 0:
+            raise exceptions.PyNNLessException("Segment duration must be " +
+                "positive")
+        if duration <= 0:
+            duration = self._auto_duration(network)
+        network, transforms = self._optimize_network(network,
+                                                     keep_open=keep_open)
+
+        # Build or update the populations and the connection matrices
+        populations, params, connections, duration = self._prepare_network(
+            network, duration, keep_open)
+        timestep = self.get_time_step()
+        steps = int(round(duration / timestep))
+        segment_steps = max(1, int(round(segment_duration / timestep)))
+
+        self.time_sim = 0.0
+        t2 = time.time()
+        try:
+            try:
+                self._redirect_io(do_redirect=self.do_redirect)
+                self._prepare_projections(network, populations, params,
+                                          connections, keep_open)
+            finally:
+                self._unredirect_io(False)
+            t2 = time.time()
+
+            for step in xrange(0, steps, segment_steps):
+                t_start = step * timestep
+                t_stop = min(steps, step + segment_steps) * timestep
+                try:
+                    self._redirect_io(do_redirect=self.do_redirect)
+                    t_sim = time.time()
+                    with self._phase("sim"):
+                        self.sim.run(t_stop - t_start)
+                    self.time_sim += time.time() - t_sim
+                    if self.session is not None:
+                        self.session["has_run"] = True
+                    with self._phase("fetch"):
+                        res = self._fetch_results(network, populations,
+                            duration=t_stop, window=[t_start, t_stop],
+                            clear=True)
+                    res = self._restore_results(res, transforms)
+                finally:
+                    self._unredirect_io(False)
+                yield t_start, t_stop, res
+        finally:
+            # End the simulation if the network should not be kept open, this
+            # is also executed if the generator is closed early
+            t3 = time.time()
+            try:
+                self._redirect_io(do_redirect=self.do_redirect)
+                if not keep_open:
+                    self._end_run()
+            finally:
+                self._unredirect_io(self.summarise_io)
+
+            for warning in self.warnings:
+                logger.warning(warning)
+
+            t4 = time.time()
+            self.profiler.finish()
+            self.time_total = t4 - t1
+            self.time_initialize = t2 - t1
+            self.time_finalize = t4 - t3
+
+    def run_adaptive(self, network, max_duration=0, quiet_window=100.0,
+                     predicate=None, segment_duration=None):
+        """
+        Simulates the network in segments (see "run_segments") and stops early
+        once no neuron spiked for "quiet_window" milliseconds after the last
+        input spike, or once the given predicate returns True.
+
+        :param network: network description, see "run".
+        :param max_duration: maximum simulation duration. If smaller than or
+        equal to zero, the duration "run" would use is taken.
+        :param quiet_window: length of the interval without any spikes after
+        which the simulation is stopped. Requires the spikes of at least one
+        neuron population to be recorded (either as spike trains or reduced to
+        "last", "count" or "rate"). None disables the quiescence check.
+        :param predicate: optional function called with (t_start, t_stop, res)
+        for each segment, where "res" contains the data recorded in that
+        segment. The simulation stops once it returns True.
+        :param segment_duration: duration of the individual segments, defaults
+        to "quiet_window".
+        :return: a tuple containing the merged results of all simulated
+        segments (see "run") and the simulated duration.
+        """
+        if segment_duration is None:
+            segment_duration = (quiet_window if quiet_window is not None
+                                else self.AUTO_DURATION_EXTENSION)
+
+        # Do not stop before the last input spike
+        t_active = self._auto_duration(network) - self.AUTO_DURATION_EXTENSION
+
+        # The mean of each segment is needed to merge variances
+        network, added = results.add_mean_reductions(network)
+
+        segments = []
+        t_stop = 0.0
+        generator = self.run_segments(network, segment_duration, max_duration)
+        try:
+            for t_start, t_stop, res in generator:
+                segments.append((t_start, t_stop, res))
+                if (predicate is not None) and predicate(t_start, t_stop, res):
+                    break
+                if quiet_window is None:
+                    continue
+                t_last = self._last_spike(network, res)
+                if t_last is None:
+                    raise exceptions.PyNNLessException("Quiescence detection "
+                        + "requires recording the spikes of at least one "
+                        + "neuron population")
+                t_active = max(t_active, min(t_last, t_stop))
+                if t_stop - t_active >= quiet_window:
+                    break
+        finally:
+            generator.close()
+        return results.remove_mean_reductions(
+            results.merge_segments(segments, network), added), t_stop
+
+
+def _probe_capabilities_main(q, simulator):
+    """
+    Loads the given simulator and puts its capabilities into the given queue.
+    Executed in its own process by PyNNLess.probe_simulators.
+    """
+    res = None
+    try:
+        sim, normalized = PyNNLess._load_simulator(simulator)
+        version = PyNNLess._check_version(
+            getattr(sim, "__pynn_version__", None))
+        res = PyNNLess._simulator_capabilities(sim, normalized, version)
+    except:
+        pass
+    q.put(res)
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Benchmark suite measuring the overhead of PyNNLess itself. Contains generators
+for scalable synthetic networks and functions which measure the throughput of
+network construction, connection grouping, running a network and result
+conversion. Results are stored as JSON and can be compared against a baseline
+to detect performance regressions.
+"""
+
+import numpy as np
+import platform
+import time
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+from pynnless import PyNNLess
+
+#
+# Network generators
+#
+
+# Neuron parameters used by the generated networks
+DEFAULT_PARAMS = {
+    "cm": 0.2,
+    "e_rev_E": -40.0,
+    "e_rev_I": -60.0,
+    "v_rest": -50.0,
+    "v_reset": -70.0,
+    "v_thresh": -47.0,
+    "tau_m": 10.0,
+    "tau_refrac": 1.0
+}
+
+def _connections(src_pid, src_nids, tar_pid, tar_nids, weights, delays):
+    """
+    Converts columns of neuron indices, weights and delays into the PyNNLess
+    connection list format.
+    """
+    return [((src_pid, int(s)), (tar_pid, int(t)), float(w), float(d))
+            for s, t, w, d in zip(src_nids, tar_nids, weights, delays)]
+
+def synfire_chain(length=100, width=1, w_syn=0.024, delay=1.0,
+                  record=[const.SIG_SPIKES]):
+    """
+    Generates a synfire chain consisting of "length" groups of "width" neurons
+    each. Each neuron is connected to all neurons of the next group, the last
+    group is connected to the first group. The first group is stimulated by a
+    single spike source. Contains length * width^2 synapses.
+    """
+    count = length * width
+    connections = [((0, 0), (1, i), w_syn, delay) for i in xrange(width)]
+    for g in xrange(length):
+        src = np.arange(g * width, (g + 1) * width)
+        tar = np.arange(((g + 1) % length) * width,
+                        ((g + 1) % length + 1) * width)
+        srcs, tars = np.meshgrid(src, tar, indexing="ij")
+        n = width * width
+        connections += _connections(1, srcs.flatten(), 1, tars.flatten(),
+                                    np.repeat(w_syn, n), np.repeat(delay, n))
+    return builder.Network(
+        populations=[
+            builder.SourcePopulation(spike_times=[10.0]),
+            builder.IfCondExpPopulation(count=count, params=DEFAULT_PARAMS,
+                                        record=record)],
+        connections=connections)
+
+def random_balanced(n_exc=800, n_inh=200, n_input=100, p_connect=0.1,
+                    w_exc=0.005, w_inh=-0.02, w_input=0.01, rate=10.0,
+                    duration=1000.0, delay=1.0, record=[const.SIG_SPIKES],
+                    seed=4318):
+    """
+    Generates a random balanced network with an excitatory and an inhibitory
+    population, which are randomly connected with connection probability
+    "p_connect", and a population of Poisson spike sources projecting onto
+    both populations. Contains about p_connect * (n_exc + n_inh) *
+    (n_exc + n_inh + n_input) synapses.
+    """
+    rng = np.random.RandomState(seed)
+    sizes = [n_input, n_exc, n_inh]
+    weights = [w_input, w_exc, w_inh]
+
+    # Poisson spike trains for the input neurons
+    spike_times = []
+    for _ in xrange(n_input):
+        n = rng.poisson(rate * duration * 1e-3)
+        spike_times.append(sorted(rng.uniform(0.0, duration, n).tolist()))
+
+    connections = []
+    for src_pid in xrange(3):
+        for tar_pid in [1, 2]:
+            mask = rng.uniform(size=(sizes[src_pid], sizes[tar_pid])) < p_connect
+            src, tar = np.nonzero(mask)
+            connections += _connections(src_pid, src, tar_pid, tar,
+                                        np.repeat(weights[src_pid], len(src)),
+                                        np.repeat(delay, len(src)))
+
+    return builder.Network(
+        populations=[
+            builder.SourcePopulation(count=n_input, spike_times=spike_times),
+            builder.IfCondExpPopulation(count=n_exc, params=DEFAULT_PARAMS,
+                                        record=record),
+            builder.IfCondExpPopulation(count=n_inh, params=DEFAULT_PARAMS,
+                                        record=record)],
+        connections=connections)
+
+def heterogeneous_populations(population_count=100, count=10, jitter=0.1,
+                              fan_in=10, w_syn=0.01, duration=1000.0,
+                              record=[const.SIG_SPIKES], seed=1783):
+    """
+    Generates many populations with individual parameters for each neuron
+    (the default parameters with multiplicative noise of relative magnitude
+    "jitter"), alternating between IF_cond_exp and AdEx neurons. Each neuron
+    receives "fan_in" connections from a shared spike source population.
+    """
+    rng = np.random.RandomState(seed)
+    n_sources = max(1, fan_in)
+    spike_times = [sorted(rng.uniform(0.0, duration, 10).tolist())
+                   for _ in xrange(n_sources)]
+    populations = [builder.SourcePopulation(count=n_sources,
+                                            spike_times=spike_times)]
+    connections = []
+    for i in xrange(population_count):
+        params = []
+        for _ in xrange(count):
+            p = dict((k, v * (1.0 + jitter * rng.normal()))
+                     for k, v in DEFAULT_PARAMS.items())
+            params.append(PyNNLess.clamp_parameters(p))
+        _type = const.TYPE_IF_COND_EXP if i % 2 == 0 else const.TYPE_AD_EX
+        populations.append(builder.Population(count=count, _type=_type,
+                                              params=params, record=record))
+        src = rng.randint(0, n_sources, count * fan_in)
+        tar = np.repeat(np.arange(count), fan_in)
+        connections += _connections(0, src, i + 1, tar,
+                                    np.repeat(w_syn, len(src)),
+                                    np.repeat(1.0, len(src)))
+    return builder.Network(populations=populations, connections=connections)
+
+# Parameters of the generated networks for the individual benchmark scales
+SCALES = {
+    "small": {
+        "synfire_chain": {"length": 100, "width": 4},
+        "random_balanced": {"n_exc": 800, "n_inh": 200, "n_input": 100},
+        "heterogeneous_populations": {"population_count": 50, "count": 10},
+    },
+    "medium": {
+        "synfire_chain": {"length": 500, "width": 10},
+        "random_balanced": {"n_exc": 4000, "n_inh": 1000, "n_input": 500},
+        "heterogeneous_populations": {"population_count": 200, "count": 50},
+    },
+    "large": {
+        "synfire_chain": {"length": 1000, "width": 30},
+        "random_balanced": {"n_exc": 8000, "n_inh": 2000, "n_input": 1000,
+                            "p_connect": 0.05},
+        "heterogeneous_populations": {"population_count": 1000,
+                                      "count": 100},
+    },
+}
+
+# Map from the network names used in SCALES to the generator functions
+GENERATORS = {
+    "synfire_chain": synfire_chain,
+    "random_balanced": random_balanced,
+    "heterogeneous_populations": heterogeneous_populations,
+}
+
+#
+# Benchmarks
+#
+
+def _measure(f, repeat=1):
+    """
+    Calls f "repeat" times, returns the minimum time in seconds and the last
+    result.
+    """
+    best = None
+    res = None
+    for _ in xrange(repeat):
+        t = time.time()
+        res = f()
+        t = time.time() - t
+        best = t if best is None else min(best, t)
+    return best, res
+
+def _entry(t, items, unit):
+    return {"time": t, "items": items, "unit": unit,
+            "throughput": (items / t) if t > 0 else float("inf")}
+
+def _network_size(network):
+    neurons = sum(p["count"] for p in network["populations"])
+    return neurons, len(network["connections"])
+
+def benchmark_conversion(n_neurons=1000, n_spikes=100, n_samples=1000,
+                         repeat=3, seed=5120):
+    """
+    Measures the throughput of the spike and signal conversion functions.
+    """
+    rng = np.random.RandomState(seed)
+    res = {}
+
+    # PyNN 0.7 style (nid, time) spike list
+    nids = rng.randint(0, n_neurons, n_neurons * n_spikes)
+    times = rng.uniform(0.0, 1000.0, n_neurons * n_spikes)
+    spikes7 = np.column_stack((nids, times))
+    t, _ = _measure(lambda: PyNNLess._convert_pyNN7_spikes(spikes7, n_neurons),
+                    repeat)
+    res["convert_spikes_pyNN7"] = _entry(t, len(spikes7), "spikes")
+
+    # PyNN 0.8 style list of spike trains
+    spikes8 = [np.sort(rng.uniform(0.0, 1000.0, n_spikes))
+               for _ in xrange(n_neurons)]
+    t, _ = _measure(lambda: PyNNLess._convert_pyNN8_spikes(spikes8), repeat)
+    res["convert_spikes_pyNN8"] = _entry(t, n_neurons * n_spikes, "spikes")
+
+    # PyNN 0.7 style (nid, time, value) signal list
+    n_signal_neurons = max(1, n_neurons // 10)
+    signal = np.column_stack((
+        np.repeat(np.arange(n_signal_neurons), n_samples),
+        np.tile(np.arange(n_samples) * 0.1, n_signal_neurons),
+        rng.normal(size=n_signal_neurons * n_samples)))
+    t, _ = _measure(lambda: PyNNLess._convert_pyNN7_signal(signal, 2,
+                    n_signal_neurons), repeat)
+    res["convert_signal_pyNN7"] = _entry(t, len(signal), "samples")
+    return res
+
+def benchmark_network(name, params={}, simulator=None, setup={}, duration=0,
+                      repeat=1):
+    """
+    Benchmarks the network generated by the generator with the given name.
+    Measures the time needed to generate the network description ("generate")
+    and to group the connections. If a simulator is given, the network is
+    additionally run and the times of the individual run phases are recorded,
+    "build" contains the time PyNNLess spent building the populations and
+    projections.
+    """
+    generator = GENERATORS[name]
+    res = {}
+
+    t, network = _measure(lambda: generator(**params), repeat)
+    neurons, synapses = _network_size(network)
+    res["generate"] = _entry(t, neurons + synapses, "neurons+synapses")
+
+    t, _ = _measure(lambda: PyNNLess._build_connections(
+        network["connections"]), repeat)
+    res["group_connections"] = _entry(t, synapses, "synapses")
+
+    if simulator is not None:
+        sim = PyNNLess(simulator, setup)
+        t, _ = _measure(lambda: sim.run(network, duration), 1)
+        info = sim.get_time_info()
+        res["run"] = _entry(t, neurons + synapses, "neurons+synapses")
+        for phase in info["phases"]["children"]:
+            if phase["name"] in ["build_populations", "build_projections",
+                                 "sim", "fetch"]:
+                res["run_" + phase["name"]] = _entry(phase["time"],
+                    neurons + synapses, "neurons+synapses")
+        res["build"] = _entry(sum(phase["time"]
+            for phase in info["phases"]["children"]
+            if phase["name"] in ["build_populations", "build_projections"]),
+            neurons + synapses, "neurons+synapses")
+        res["run"]["rss_peak"] = info["memory"]["rss_peak"]
+    return {"neurons": neurons, "synapses": synapses, "benchmarks": res}
+
+def run_benchmarks(scale="small", simulator=None, setup={}, duration=0,
+                   repeat=1, networks=None):
+    """
+    Runs the complete benchmark suite at the given scale and returns a
+    dictionary which can be stored as JSON.
+
+    :param scale: one of the keys in SCALES.
+    :param simulator: simulator used to run the networks, if None, the networks
+    are not run.
+    :param networks: list of network names to benchmark, if None, all networks
+    are benchmarked.
+    """
+    if not scale in SCALES:
+        raise exceptions.PyNNLessException("Unknown benchmark scale \"" +
+            str(scale) + "\", supported are " + str(sorted(SCALES.keys())))
+
+    res = {
+        "scale": scale,
+        "simulator": simulator,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "networks": {},
+        "conversion": benchmark_conversion(repeat=repeat)
+    }
+    for name, params in sorted(SCALES[scale].items()):
+        if (networks is None) or (name in networks):
+            res["networks"][name] = benchmark_network(name, params, simulator,
+                                                      setup, duration, repeat)
+    return res
+
+def flatten(results):
+    """
+    Returns a dictionary mapping from "network/benchmark" names onto the
+    benchmark entries.
+    """
+    res = {}
+    for name, entry in results.get("conversion", {}).items():
+        res["conversion/" + name] = entry
+    for network, data in results.get("networks", {}).items():
+        for name, entry in data["benchmarks"].items():
+            res[network + "/" + name] = entry
+    return res
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares the throughput of the given benchmark results with the baseline
+    results. Returns a list of (name, throughput, baseline throughput, ratio)
+    tuples for all benchmarks whose throughput dropped by more than the given
+    relative tolerance.
+    """
+    current = flatten(results)
+    reference = flatten(baseline)
+    res = []
+    for name in sorted(current.keys()):
+        if not name in reference:
+            continue
+        throughput = current[name]["throughput"]
+        reference_throughput = reference[name]["throughput"]
+        if reference_throughput <= 0:
+            continue
+        ratio = throughput / reference_throughput
+        if ratio < 1.0 - tolerance:
+            res.append((name, throughput, reference_throughput, ratio))
+    return res
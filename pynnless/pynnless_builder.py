@@ -40,7 +40,9 @@ class Population(dict):
         :param data: dictionary the data may be copied from.
         :param count: Number of neurons in the population
         :param _type: Type of the neuron
-        :param record: Variables to be recorded
+        :param record: Variables to be recorded. Either a list of signal names
+        or a dictionary mapping signal names to recording options, see
+        "record_options".
         :param params: Neuron population parameters
         """
         utils.init_key(self, data, "count", count, int)
@@ -65,13 +67,19 @@ class Population(dict):
             raise exceptions.PyNNLessException("Population parameter list " +
                 "must either have exactly one entry (shared by all neurons " +
                 "in the population) or exactly \"count\" entries.")
+        for options in self.record_options(self["record"]).values():
+            self.record_neurons(options, self["count"])
 
     @staticmethod
     def canonicalize_record(record):
         """
         Makes sure the "record" signal list is indeed a list, is sorted and
-        contains no double entries.
+        contains no double entries. Dictionaries mapping signals to recording
+        options are kept as dictionary with canonicalized options.
         """
+        if isinstance(record, dict):
+            return dict((signal, Population.canonicalize_record_options(
+                options, signal)) for signal, options in record.items())
         if isinstance(record, str):
             record = [record]
         else:
@@ -79,6 +87,96 @@ class Population(dict):
         record = list(set(record))
         return record
 
+    @staticmethod
+    def canonicalize_record_options(options, signal=None):
+        """
+        Converts the recording options of a single signal into a dictionary.
+        None and True stand for the default options. A "neurons" slice is
+        converted into a dictionary with the keys "start", "stop" and "step",
+        a single "reduce" entry into a list.
+        """
+        if (options is None) or (options is True):
+            return {}
+        if not isinstance(options, dict):
+            raise exceptions.PyNNLessException("Invalid recording options: "
+                + str(options))
+        options = dict(options)
+        neurons = options.get("neurons")
+        if isinstance(neurons, slice):
+            options["neurons"] = {"start": neurons.start, "stop": neurons.stop,
+                                  "step": neurons.step}
+        elif (neurons is not None) and (not isinstance(neurons, dict)):
+            options["neurons"] = [int(i) for i in neurons]
+        if options.get("sampling_interval") is not None:
+            options["sampling_interval"] = float(options["sampling_interval"])
+            if options["sampling_interval"] <= 0:
+                raise exceptions.PyNNLessException("Sampling interval must " +
+                    "be positive")
+        if options.get("window") is not None:
+            window = [float(t) for t in options["window"]]
+            if (len(window) != 2) or (window[0] > window[1]):
+                raise exceptions.PyNNLessException("Recording window must " +
+                    "be given as [t_start, t_stop]")
+            options["window"] = window
+        if options.get("reduce") is not None:
+            reduce = options["reduce"]
+            reduce = [reduce] if isinstance(reduce, basestring) else \
+                [str(r) for r in reduce]
+            valid = (const.SPIKE_REDUCTIONS if signal == const.SIG_SPIKES
+                     else const.SIGNAL_REDUCTIONS)
+            for r in reduce:
+                if not r in valid:
+                    raise exceptions.PyNNLessException("Invalid reduction \""
+                        + r + "\" for signal \"" + str(signal) +
+                        "\", supported are " + str(valid))
+            options["reduce"] = reduce
+        return options
+
+    @staticmethod
+    def record_options(record):
+        """
+        Returns a dictionary mapping each signal in the given "record" entry to
+        its recording options. The following options are supported:
+
+            "neurons": indices of the neurons the signal is recorded from,
+                either a list or a dictionary with the (optional) "start",
+                "stop" and "step" entries of a slice. All neurons are recorded
+                if not given.
+            "sampling_interval": interval in ms at which analog signals are
+                sampled. Passed to the backend if possible, otherwise the
+                signal is decimated after it has been fetched.
+            "window": [t_start, t_stop] interval in ms, samples and spikes
+                outside this interval are discarded.
+            "reduce": list of reductions in const.SPIKE_REDUCTIONS or
+                const.SIGNAL_REDUCTIONS. If given, a dictionary containing one
+                array with a value per neuron for each reduction is returned
+                instead of the recorded data.
+        """
+        record = Population.canonicalize_record(record)
+        if isinstance(record, dict):
+            return record
+        return dict((signal, {}) for signal in record)
+
+    @staticmethod
+    def record_neurons(options, count):
+        """
+        Returns the sorted list of neuron indices selected by the "neurons"
+        entry of the given recording options or None if all neurons of the
+        population with "count" neurons are recorded.
+        """
+        neurons = options.get("neurons")
+        if neurons is None:
+            return None
+        if isinstance(neurons, dict):
+            return range(*slice(neurons.get("start"), neurons.get("stop"),
+                                neurons.get("step")).indices(count))
+        for i in neurons:
+            if (i < 0) or (i >= count):
+                raise exceptions.PyNNLessException("Recorded neuron index "
+                    + str(i) + " out of range for population of size "
+                    + str(count))
+        return sorted(set(neurons))
+
     def _canonicalize(self):
         """
         Internal function, makes sure the "record" list is indeed a list, is
@@ -95,7 +193,10 @@ class Population(dict):
         Adds the given signal to the list of recorded signals.
         """
         self._canonicalize()
-        self["record"].append(signal)
+        if isinstance(self["record"], dict):
+            self["record"].setdefault(signal, {})
+        else:
+            self["record"].append(signal)
         return self._canonicalize()
 
     def record_spikes(self):
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Measures the throughput of the installed simulator backends. A standard set of
+small networks is run on each backend and the time spent in the individual run
+phases is converted into the per-operation costs used by the estimator (see
+estimator.DEFAULT_CALIBRATION). The results are stored in a per-user profile
+file, which is reported by PyNNLess.get_simulator_info. The peak memory of the
+benchmarks additionally determines how many neurons and concurrent simulations
+fit into the memory of this machine.
+"""
+
+import multiprocessing
+import platform
+import Queue
+import time
+import traceback
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+import pynnless_utils as utils
+from pynnless import PyNNLess
+
+# Size of the micro-benchmark networks: number of neurons, number of spike
+# sources, number of spikes emitted by each source and simulation duration in
+# ms. The sources are connected to all neurons.
+CALIBRATION_NETWORK = {
+    "neurons": 100,
+    "sources": 10,
+    "spikes": 100,
+    "duration": 1000.0
+}
+
+# Weight of the connections in the micro-benchmark networks, small enough not
+# to cause any output spikes
+CALIBRATION_WEIGHT = 1e-6
+
+# Maximum time in seconds a single micro-benchmark process may take and the
+# interval in which the process is checked for having died
+CALIBRATION_TIMEOUT = 600.0
+CALIBRATION_POLL_INTERVAL = 1.0
+
+# Fraction of the physical memory a single simulation may use, determines the
+# "max_neuron_count" reported for calibrated software simulators
+MEMORY_FRACTION = 0.5
+
+def _networks(neurons, sources, spikes, duration):
+    """
+    Returns the micro-benchmark networks: a single neuron ("base"), "neurons"
+    unconnected neurons ("neurons"), the neurons connected to all spike sources
+    ("synapses") and the neurons and spike sources with all signals recorded
+    ("samples"). The "record" entry of the last network is set in "_measure"
+    once the recordable signals are known.
+    """
+    spike_times = [[duration * (j + 0.5) / spikes for j in xrange(spikes)]
+                   for _ in xrange(sources)]
+    connections = [((0, i), (1, j), CALIBRATION_WEIGHT, 1.0)
+                   for i in xrange(sources) for j in xrange(neurons)]
+    return {
+        "base": builder.Network(populations=[
+            builder.IfCondExpPopulation(count=1)]),
+        "neurons": builder.Network(populations=[
+            builder.IfCondExpPopulation(count=neurons)]),
+        "synapses": builder.Network(populations=[
+            builder.SourcePopulation(count=sources, spike_times=spike_times),
+            builder.IfCondExpPopulation(count=neurons)],
+            connections=connections),
+        "samples": builder.Network(populations=[
+            builder.SourcePopulation(count=sources, spike_times=spike_times,
+                                     record=[const.SIG_SPIKES]),
+            builder.IfCondExpPopulation(count=neurons)]),
+    }
+
+def _phase_time(info, name):
+    """
+    Returns the time in seconds spent in the top-level run phase with the given
+    name.
+    """
+    phases = info["phases"]
+    if phases is None:
+        return 0.0
+    return sum(phase["time"] for phase in phases["children"]
+               if phase["name"] == name)
+
+def _run(simulator, setup, name, neurons, sources, spikes, duration):
+    """
+    Sets up the simulator and runs the micro-benchmark network with the given
+    name. Returns a dictionary containing the setup time in seconds, the time
+    information of the run, the timestep and the number of recorded values.
+    """
+    t = time.time()
+    inst = PyNNLess(simulator, setup)
+    t_setup = time.time() - t
+
+    network = _networks(neurons, sources, spikes, duration)[name]
+    samples = 0
+    if name == "samples":
+        samples = sources * spikes
+        signals = PyNNLess._simulator_capabilities(
+            inst.sim, inst.simulator, inst.version)["signals"]
+        if const.SIG_V in signals:
+            network["populations"][1].record(const.SIG_V)
+            steps = int(duration / inst.get_time_step())
+            samples += (neurons + 1) * steps
+    inst.run(network, duration)
+    return {
+        "setup": t_setup,
+        "info": inst.get_time_info(),
+        "samples": samples
+    }
+
+def _run_main(q, *args):
+    """
+    Executes "_run" in its own process and puts the result and the formatted
+    exception into the given queue.
+    """
+    res = None
+    exception = None
+    try:
+        res = _run(*args)
+    except:
+        exception = traceback.format_exc()
+    q.put((res, exception))
+
+def _run_isolated(*args):
+    """
+    Executes "_run" in a separate process, so that each micro-benchmark starts
+    with a freshly loaded simulator. Raises an exception if the process dies
+    without sending a result or exceeds CALIBRATION_TIMEOUT.
+    """
+    q = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_run_main, args=(q,) + args)
+    p.start()
+    t_end = time.time() + CALIBRATION_TIMEOUT
+    msg = None
+    try:
+        while msg is None:
+            try:
+                msg = q.get(timeout=CALIBRATION_POLL_INTERVAL)
+            except Queue.Empty:
+                if not p.is_alive():
+                    # The result may have arrived just before the process ended
+                    try:
+                        msg = q.get(timeout=CALIBRATION_POLL_INTERVAL)
+                    except Queue.Empty:
+                        raise exceptions.PyNNLessException("Calibration " +
+                            "process exited with code " + str(p.exitcode))
+                elif time.time() > t_end:
+                    raise exceptions.PyNNLessException("Calibration process " +
+                        "exceeded the timeout of " + str(CALIBRATION_TIMEOUT) +
+                        " seconds")
+    finally:
+        if p.is_alive():
+            p.terminate()
+        p.join()
+    res, exception = msg
+    if exception is not None:
+        raise exceptions.PyNNLessException(exception)
+    return res
+
+def _limits(profile):
+    """
+    Derives the "max_neuron_count" and "concurrency" entries from the measured
+    memory usage: the number of neurons fitting into MEMORY_FRACTION of the
+    physical memory and the number of simulator instances fitting into the
+    physical memory, at most one per CPU.
+    """
+    memory = utils.physical_memory()
+    if (memory is None) or (not "bytes_per_neuron" in profile):
+        return {}
+    return {
+        "max_neuron_count": max(1, int((MEMORY_FRACTION * memory -
+                                        profile["bytes_base"]) /
+                                       max(1.0, profile["bytes_per_neuron"]))),
+        "concurrency": max(1, min(multiprocessing.cpu_count(),
+                                  int(memory / max(1.0,
+                                                   profile["bytes_base"]))))
+    }
+
+def measure(simulator, setup={}, isolated=True, **kwargs):
+    """
+    Runs the micro-benchmark networks on the given simulator and returns the
+    measured costs in the format of the estimator.DEFAULT_CALIBRATION entries.
+
+    :param isolated: if True, each network is run in its own process.
+    :param kwargs: overrides the entries of CALIBRATION_NETWORK.
+    """
+    params = dict(CALIBRATION_NETWORK)
+    params.update(kwargs)
+    neurons, sources = params["neurons"], params["sources"]
+    spikes, duration = params["spikes"], params["duration"]
+    run = _run_isolated if isolated else _run
+    runs = dict((name, run(simulator, setup, name, neurons, sources, spikes,
+                           duration))
+                for name in ["base", "neurons", "synapses", "samples"])
+
+    def sim(name):
+        return _phase_time(runs[name]["info"], "sim") * 1e3
+
+    def rss(name):
+        return runs[name]["info"]["memory"]["rss_peak"]
+
+    # Split the simulation time of the neurons into a constant per second and
+    # a per neuron second part, the remaining time of the connected network is
+    # caused by the synaptic events
+    seconds = duration * 1e-3
+    synapse_count = neurons * sources
+    ms_per_neuron_second = max(0.0, (sim("neurons") - sim("base")) /
+                                    ((neurons - 1) * seconds))
+    res = {
+        "ms_setup": min(r["setup"] for r in runs.values()) * 1e3,
+        "ms_per_neuron": _phase_time(runs["neurons"]["info"],
+                                     "build_populations") * 1e3 / neurons,
+        "ms_per_synapse": _phase_time(runs["synapses"]["info"],
+                                      "build_projections") * 1e3 /
+                          synapse_count,
+        "ms_per_second": max(0.0, sim("base") / seconds -
+                                  ms_per_neuron_second),
+        "ms_per_neuron_second": ms_per_neuron_second,
+        "ms_per_event": max(0.0, (sim("synapses") - sim("neurons")) /
+                                 (synapse_count * spikes)),
+        "ms_per_sample": _phase_time(runs["samples"]["info"], "fetch") *
+                         1e3 / max(1, runs["samples"]["samples"])
+    }
+
+    # The peak memory is only meaningful if each network ran in a fresh process
+    if isolated and not None in [rss(name) for name in runs.keys()]:
+        res["bytes_base"] = rss("base")
+        res["bytes_per_neuron"] = max(0.0, float(rss("neurons") - rss("base"))
+                                           / (neurons - 1))
+        res["bytes_per_synapse"] = max(0.0, float(rss("synapses") -
+                                                  rss("neurons")) /
+                                            synapse_count)
+    return res
+
+def calibrate(simulators=None, setup={}, isolated=True, store=True,
+              **kwargs):
+    """
+    Measures the throughput of the given simulators and stores the results in
+    the calibration profile file (see PyNNLess.CALIBRATION_FILE).
+
+    :param simulators: list of simulator names. If None, all installed
+    software simulators are calibrated. Hardware systems must be given
+    explicitly, as the benchmarks block them for other users.
+    :param setup: setup parameters passed to each simulator.
+    :param isolated: if True, each network is run in its own process.
+    :param store: if True, the results are merged into the profile file.
+    :param kwargs: overrides the entries of CALIBRATION_NETWORK.
+    :return: a dictionary mapping the normalized simulator names onto the
+    measured costs. If the memory was measured (see "measure"), the entries
+    additionally contain the "max_neuron_count" and "concurrency" derived from
+    it, which replace the nominal values reported by
+    PyNNLess.get_simulator_info for software simulators. Simulators which
+    could not be run are reported with an "error" entry and are not stored.
+    """
+    if simulators is None:
+        simulators = [simulator for simulator in PyNNLess.simulators()
+                      if not simulator in PyNNLess.HARDWARE_SYSTEMS]
+    res = {}
+    for simulator in simulators:
+        normalized = PyNNLess.normalized_simulator_name(simulator)
+        try:
+            res[normalized] = measure(simulator, setup, isolated, **kwargs)
+            res[normalized].update(_limits(res[normalized]))
+            res[normalized]["timestamp"] = time.time()
+            res[normalized]["host"] = platform.node()
+        except Exception as e:
+            res[normalized] = {"error": str(e)}
+
+    if store:
+        filename = utils.local_data_file(PyNNLess.CALIBRATION_FILE)
+        profile = utils.read_json_file(filename, {})
+        if not isinstance(profile, dict):
+            profile = {}
+        for simulator, entry in res.items():
+            if not "error" in entry:
+                profile[simulator] = entry
+        utils.write_json_file(filename, profile)
+        PyNNLess._calibration_cache = None
+    return res
@@ -29,6 +29,11 @@ SIG_GE = "gsyn_exc"
 SIG_GI = "gsyn_inh"
 SIGNALS = [SIG_SPIKES, SIG_V, SIG_GE, SIG_GI]
 
+# Per-neuron reductions which can be computed from the recorded spikes and
+# analog signals instead of returning the raw data
+SPIKE_REDUCTIONS = ["count", "rate", "first", "last"]
+SIGNAL_REDUCTIONS = ["mean", "var", "std", "min", "max"]
+
 PARAMETER_LIMITS = {
     "a": {"min": 0.0},
     "b": {"min": 0.0},
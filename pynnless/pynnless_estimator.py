@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Estimates the resources and the runtime a network needs on a given simulator
+before the simulator is loaded, so that jobs which do not fit the target
+platform can be rejected and jobs which do can be sized. All estimates are
+derived from the network description and a calibration table containing the
+cost of the individual operations on each backend. The estimates are also used
+to automatically select the fastest simulator for a network.
+"""
+
+import numpy as np
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+import pynnless_storage as storage
+import pynnless_utils as utils
+
+# Rate in Hz assumed for the neurons (not the spike sources) when estimating the
+# number of spikes and synaptic events
+ESTIMATED_RATE = 10.0
+
+# Number of bytes used to store a single spike time, sample, sample time or
+# reduced value
+BYTES_PER_VALUE = 8
+
+# Default time in seconds added to the predicted runtime of a hardware system if
+# its lock file (see PyNNLessIsolated) is currently held by another process,
+# can be overridden using the "lock_wait" setup flag
+LOCK_WAIT = 300.0
+
+# Rough per-backend cost of the operations performed during a run, replaced by
+# the costs measured by calibration.calibrate if available. The times are in
+# milliseconds:
+#
+#     "ms_setup": loading and setting up the simulator.
+#     "ms_per_neuron": creating a neuron or spike source.
+#     "ms_per_synapse": creating a single connection.
+#     "ms_per_second": simulating one second of biological time, independent of
+#         the network size (hardware systems running at a fixed speed-up).
+#     "ms_per_neuron_second": simulating one neuron for one second of
+#         biological time.
+#     "ms_per_event": delivering a single spike to a synapse.
+#     "ms_per_sample": fetching a single recorded spike or sample.
+#
+# The memory is given in bytes:
+#
+#     "bytes_base": memory used by the loaded simulator.
+#     "bytes_per_neuron": memory used by a single neuron or spike source.
+#     "bytes_per_synapse": memory used by a single connection.
+#
+# Simulators not listed here use the "default" entry.
+DEFAULT_CALIBRATION = {
+    "default": {
+        "ms_setup": 1000.0,
+        "ms_per_neuron": 0.05,
+        "ms_per_synapse": 0.01,
+        "ms_per_second": 0.0,
+        "ms_per_neuron_second": 2.0,
+        "ms_per_event": 0.001,
+        "ms_per_sample": 0.001,
+        "bytes_base": 100e6,
+        "bytes_per_neuron": 2000,
+        "bytes_per_synapse": 100,
+    },
+    "nest": {
+        "ms_setup": 500.0,
+        "ms_per_neuron": 0.02,
+        "ms_per_synapse": 0.005,
+        "ms_per_second": 0.0,
+        "ms_per_neuron_second": 1.0,
+        "ms_per_event": 0.0005,
+        "ms_per_sample": 0.0005,
+        "bytes_base": 100e6,
+        "bytes_per_neuron": 1500,
+        "bytes_per_synapse": 50,
+    },
+    "refsim": {
+        "ms_setup": 1.0,
+        "ms_per_neuron": 0.001,
+        "ms_per_synapse": 0.0005,
+        "ms_per_second": 100.0,
+        "ms_per_neuron_second": 0.05,
+        "ms_per_event": 0.0005,
+        "ms_per_sample": 0.0002,
+        "bytes_base": 30e6,
+        "bytes_per_neuron": 200,
+        "bytes_per_synapse": 40,
+    },
+    "eventsim": {
+        "ms_setup": 1.0,
+        "ms_per_neuron": 0.001,
+        "ms_per_synapse": 0.0005,
+        "ms_per_second": 0.0,
+        "ms_per_neuron_second": 0.02,
+        "ms_per_event": 0.005,
+        "ms_per_sample": 0.0002,
+        "bytes_base": 30e6,
+        "bytes_per_neuron": 200,
+        "bytes_per_synapse": 40,
+    },
+    "mock": {
+        "ms_setup": 1.0,
+        "ms_per_neuron": 0.0001,
+        "ms_per_synapse": 0.0001,
+        "ms_per_second": 0.0,
+        "ms_per_neuron_second": 0.0,
+        "ms_per_event": 0.0,
+        "ms_per_sample": 0.0001,
+        "bytes_base": 30e6,
+        "bytes_per_neuron": 100,
+        "bytes_per_synapse": 40,
+    },
+    "ess": {
+        "ms_setup": 30000.0,
+        "ms_per_neuron": 1.0,
+        "ms_per_synapse": 0.1,
+        "ms_per_second": 1e6,
+        "ms_per_neuron_second": 0.0,
+        "ms_per_event": 0.01,
+        "ms_per_sample": 0.01,
+        "bytes_base": 2e9,
+        "bytes_per_neuron": 1e6,
+        "bytes_per_synapse": 1000,
+    },
+    "nmpm1": {
+        "ms_setup": 60000.0,
+        "ms_per_neuron": 1.0,
+        "ms_per_synapse": 0.1,
+        "ms_per_second": 0.1,
+        "ms_per_neuron_second": 0.0,
+        "ms_per_event": 0.0,
+        "ms_per_sample": 0.01,
+        "bytes_base": 1e9,
+        "bytes_per_neuron": 1e5,
+        "bytes_per_synapse": 1000,
+    },
+    "nmmc1": {
+        "ms_setup": 30000.0,
+        "ms_per_neuron": 0.5,
+        "ms_per_synapse": 0.05,
+        "ms_per_second": 1000.0,
+        "ms_per_neuron_second": 0.0,
+        "ms_per_event": 0.0,
+        "ms_per_sample": 0.01,
+        "bytes_base": 200e6,
+        "bytes_per_neuron": 5000,
+        "bytes_per_synapse": 100,
+    },
+    "spikey": {
+        "ms_setup": 10000.0,
+        "ms_per_neuron": 0.1,
+        "ms_per_synapse": 0.01,
+        "ms_per_second": 0.1,
+        "ms_per_neuron_second": 0.0,
+        "ms_per_event": 0.0,
+        "ms_per_sample": 0.01,
+        "bytes_base": 200e6,
+        "bytes_per_neuron": 1000,
+        "bytes_per_synapse": 100,
+    },
+}
+
+def calibration_for(simulator, calibration=None):
+    """
+    Returns the calibration table entry for the given (normalized) simulator
+    name, updated with the costs measured on this machine (see
+    calibration.calibrate) and the entries of the given calibration dictionary.
+    """
+    from pynnless import PyNNLess
+
+    res = dict(DEFAULT_CALIBRATION.get(simulator,
+                                       DEFAULT_CALIBRATION["default"]))
+    measured = PyNNLess._calibration(simulator)
+    if measured is not None:
+        res.update((key, value) for key, value in measured.items()
+                   if key in res)
+    if calibration is not None:
+        res.update(calibration)
+    return res
+
+def _spike_counts(population, duration):
+    """
+    Returns an array containing the number of spikes expected from each neuron
+    of the given population within the given duration. Spike sources emit
+    exactly the spikes given in their "spike_times" parameter.
+    """
+    count = population["count"]
+    if population["type"] != const.TYPE_SOURCE:
+        return np.full(count, ESTIMATED_RATE * duration / 1000.0)
+    counts = np.array([np.sum(np.asarray(params.get("spike_times", []),
+                                         dtype=np.float64) < duration)
+                       for params in population["params"]], dtype=np.float64)
+    if len(counts) == 1:
+        return np.repeat(counts, count)
+    return counts
+
+def _window_duration(options, duration):
+    """
+    Returns the length of the part of the simulation covered by the "window"
+    recording option.
+    """
+    window = options.get("window")
+    if window is None:
+        return duration
+    return max(0.0, min(window[1], duration) - max(window[0], 0.0))
+
+def _recording_bytes(population, spikes, duration, timestep):
+    """
+    Returns a dictionary containing the number of bytes and the number of
+    values recorded for each signal of the given population.
+
+    :param spikes: expected number of spikes for each neuron.
+    """
+    res = {}
+    count = population["count"]
+    for signal, options in builder.Population.record_options(
+            population["record"]).items():
+        neurons = builder.Population.record_neurons(options, count)
+        n = count if neurons is None else len(neurons)
+        length = _window_duration(options, duration)
+        if options.get("reduce"):
+            values = n * len(options["reduce"])
+        elif signal == const.SIG_SPIKES:
+            selected = spikes if neurons is None else spikes[neurons]
+            values = (np.sum(selected) * length / duration
+                      if duration > 0 else 0.0)
+        else:
+            interval = max(options.get("sampling_interval", timestep),
+                           timestep)
+            samples = int(np.ceil(length / interval))
+            values = (n + 1) * samples
+        res[signal] = (int(values * BYTES_PER_VALUE), values)
+    return res
+
+def _shared_parameter_violations(populations, shared_parameters):
+    """
+    Returns a list of violations for each of the shared parameters which is set
+    to different values in the neuron populations.
+    """
+    res = []
+    for key in shared_parameters:
+        values = set()
+        for population in populations:
+            if population["type"] == const.TYPE_SOURCE:
+                continue
+            for params in population["params"]:
+                if key in params:
+                    values.add(params[key])
+        if len(values) > 1:
+            res.append("Parameter \"" + key + "\" is shared by all neurons " +
+                       "but set to " + str(len(values)) + " different values")
+    return res
+
+def estimate(network, simulator, duration=0, setup={}, calibration=None):
+    """
+    Estimates the resources required to simulate the given network on the given
+    simulator without loading the simulator.
+
+    :param network: network description as passed to PyNNLess.run.
+    :param simulator: name of the simulator as passed to the PyNNLess
+    constructor.
+    :param duration: simulation duration in ms, automatically calculated from
+    the spike source spike times if zero.
+    :param setup: setup parameters as passed to the PyNNLess constructor, used
+    to lookup the timestep.
+    :param calibration: dictionary overriding the entries of the calibration
+    table (see DEFAULT_CALIBRATION) and the measured costs.
+    :return: a dictionary containing the neuron, spike source and synapse
+    counts, the "max_neuron_count" of the simulator, a "fits" flag and the list
+    of "violations" of the simulator limits (the neuron count for hardware
+    systems, the physical memory for software simulators), the recording
+    volume in bytes per signal ("recording") and in total ("recording_bytes"),
+    the expected number of synaptic events, the estimated time in seconds
+    spent in the "setup", "build", "sim" and "fetch" phases and in "total" and
+    the estimated peak "memory" in bytes.
+    """
+    from pynnless import PyNNLess
+
+    simulator, _ = PyNNLess._lookup_simulator(simulator)
+    info = PyNNLess.get_simulator_info_static(simulator)
+    cal = calibration_for(simulator, calibration)
+    if duration <= 0:
+        duration = PyNNLess._auto_duration(network)
+    timestep = setup.get("timestep", PyNNLess.DEFAULT_SETUPS.get(
+        simulator, {}).get("timestep", 0.1))
+
+    # Count the neurons and the spikes they are expected to emit
+    populations = [builder.Population(p) for p in network["populations"]]
+    counts = np.array([p["count"] for p in populations], dtype=np.int64)
+    is_source = np.array([p["type"] == const.TYPE_SOURCE
+                          for p in populations], dtype=bool)
+    source_count = int(np.sum(counts[is_source]))
+    neuron_count = int(np.sum(counts[~is_source]))
+    spikes = [_spike_counts(p, duration) for p in populations]
+    input_spikes = sum(float(np.sum(s)) for s, src in zip(spikes, is_source)
+                       if src)
+
+    # Each connection delivers all spikes of its source neuron
+    matrix = np.asarray(storage.connection_matrix(network["connections"]),
+                        dtype=np.float64)
+    synapse_count = len(matrix)
+    events = 0.0
+    if synapse_count > 0:
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        flat = np.concatenate(spikes)
+        idx = offsets[matrix[:, 0].astype(np.int64)] + matrix[:, 1].astype(
+            np.int64)
+        events = float(np.sum(flat[idx]))
+
+    # Sum the recording volume of each signal
+    recording = {}
+    samples = 0.0
+    for population, population_spikes in zip(populations, spikes):
+        for signal, (size, values) in _recording_bytes(
+                population, population_spikes, duration, timestep).items():
+            recording[signal] = recording.get(signal, 0) + size
+            samples += values
+    recording_bytes = sum(recording.values())
+
+    # Apply the calibration table
+    seconds = duration / 1000.0
+    time = {
+        "setup": cal["ms_setup"],
+        "build": (cal["ms_per_neuron"] * (neuron_count + source_count) +
+                  cal["ms_per_synapse"] * synapse_count),
+        "sim": (cal["ms_per_second"] * seconds +
+                cal["ms_per_neuron_second"] * neuron_count * seconds +
+                cal["ms_per_event"] * events),
+        "fetch": cal["ms_per_sample"] * samples
+    }
+    time = dict((key, value * 1e-3) for key, value in time.items())
+    time["total"] = sum(time.values())
+    memory = (cal["bytes_base"] +
+              cal["bytes_per_neuron"] * (neuron_count + source_count) +
+              cal["bytes_per_synapse"] * synapse_count +
+              BYTES_PER_VALUE * input_spikes + recording_bytes)
+
+    # Check the simulator limits. The neuron count of the software simulators
+    # is only limited by the available memory.
+    violations = []
+    if info["is_hardware"]:
+        used = neuron_count + (source_count if info["sources_are_neurons"]
+                               else 0)
+        if used > info["max_neuron_count"]:
+            violations.append("Network requires " + str(used) + " neurons, " +
+                              "but " + simulator + " supports at most " +
+                              str(info["max_neuron_count"]))
+    else:
+        available = utils.physical_memory()
+        if (available is not None) and (memory > available):
+            violations.append("Network requires an estimated " +
+                              str(int(memory)) + " bytes of memory, but " +
+                              "only " + str(available) + " are available")
+    violations.extend(_shared_parameter_violations(populations,
+                                                   info["shared_parameters"]))
+
+    return {
+        "simulator": simulator,
+        "duration": duration,
+        "neuron_count": neuron_count,
+        "source_count": source_count,
+        "synapse_count": synapse_count,
+        "event_count": events,
+        "max_neuron_count": info["max_neuron_count"],
+        "fits": len(violations) == 0,
+        "violations": violations,
+        "recording": recording,
+        "recording_bytes": recording_bytes,
+        "time": time,
+        "memory": int(memory)
+    }
+
+def _unsupported(network, capabilities):
+    """
+    Returns the reason why a simulator with the given capabilities (see
+    PyNNLess.probe_simulators) cannot run the given network or None if it can.
+    """
+    if capabilities.get("types") is None:
+        return "simulator could not be loaded"
+    for population in network["populations"]:
+        population = builder.Population(population)
+        if not population["type"] in capabilities["types"]:
+            return "neuron type " + population["type"] + " not supported"
+        for signal in builder.Population.record_options(
+                population["record"]).keys():
+            if not signal in capabilities["signals"]:
+                return "recording " + signal + " not supported"
+    return None
+
+def rank_simulators(network, duration=0, setup={}, simulators=None,
+                    exclude=[]):
+    """
+    Predicts the wall-clock time needed to run the given network on each of the
+    given simulators.
+
+    :param simulators: list of simulator names. If None, all simulators
+    installed on this machine are considered.
+    :param exclude: list of normalized simulator names which are not
+    considered.
+    :return: a tuple containing the list of (time, simulator) tuples for the
+    simulators which can run the network, sorted by the predicted time in
+    seconds, and a dictionary mapping the other simulators to the reason why
+    they were rejected. For hardware systems whose lock file is currently held
+    the "lock_wait" setup flag (LOCK_WAIT seconds by default) is added to the
+    time.
+    """
+    from pynnless import PyNNLess
+    from pynnless_isolated import PyNNLessIsolated
+
+    probe = PyNNLess.probe_simulators(capabilities=True)
+    if simulators is None:
+        simulators = sorted(probe.keys())
+    lock_wait = float(setup.get("lock_wait", LOCK_WAIT))
+    ranking = []
+    rejected = {}
+    for simulator in simulators:
+        simulator = PyNNLess.normalized_simulator_name(simulator)
+        if simulator in exclude:
+            continue
+        reason = _unsupported(network, probe.get(simulator, {}))
+        if reason is None:
+            res = estimate(network, simulator, duration, setup)
+            if not res["fits"]:
+                reason = "; ".join(res["violations"])
+        if reason is not None:
+            rejected[simulator] = reason
+            continue
+        t = res["time"]["total"]
+        if simulator in PyNNLess.HARDWARE_SYSTEMS and utils.FileLock.is_locked(
+                PyNNLessIsolated._lockfile_name(simulator)):
+            t += lock_wait
+        ranking.append((t, simulator))
+    return sorted(ranking), rejected
+
+def select_simulator(network, duration=0, setup={}, simulators=None,
+                     exclude=[]):
+    """
+    Returns the normalized name of the simulator with the lowest predicted
+    wall-clock time for the given network, see "rank_simulators". Raises a
+    PyNNLessSimulatorException if no simulator can run the network.
+
+    A hardware system currently locked by another process is penalized by the
+    number of seconds given in the "lock_wait" setup flag, which defaults to
+    LOCK_WAIT (five minutes). Set it to the expected duration of the runs of
+    the other processes, or to zero to ignore the lock.
+    """
+    ranking, rejected = rank_simulators(network, duration, setup, simulators,
+                                        exclude)
+    if len(ranking) == 0:
+        raise exceptions.PyNNLessSimulatorException("No simulator can run " +
+            "the network: " + ", ".join(simulator + " (" + reason + ")"
+                for simulator, reason in sorted(rejected.items())))
+    return ranking[0][1]
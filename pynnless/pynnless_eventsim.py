@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Event-driven simulator backend for sparsely active networks of IF_cond_exp
+neurons. Spikes are delivered through a priority queue of delayed events and
+each neuron is only updated when it receives an event. While the synaptic
+conductances of a neuron are non-negligible its membrane is integrated locally
+with an exponential Euler scheme, whose step size grows with the decay of the
+conductances and is controlled by step doubling. Once the conductances have
+decayed the membrane potential is advanced in a single exact step. The
+conductance-based membrane equation with decaying conductances has no
+closed-form solution. Threshold crossings are predicted whenever
+a neuron receives input, predictions are invalidated by later inputs. The run
+time thus scales with the number of spikes instead of the number of neurons
+times the number of timesteps. Only spikes can be recorded. Use it by passing
+"eventsim" as simulator name to PyNNLess.
+"""
+
+import collections
+import heapq
+import math
+import numpy as np
+
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+import pynnless_native as native
+
+# Event types, events with the same time are processed in this order
+EVENT_ARRIVAL = 0
+EVENT_SPIKE = 1
+EVENT_SOURCE = 2
+
+class IF_cond_exp(native.IF_cond_exp):
+    recordable = [const.SIG_SPIKES]
+
+# Parameters of a single neuron, "g_leak" is the leak conductance and "v_inf"
+# the equilibrium potential without synaptic input
+NeuronParameters = collections.namedtuple("NeuronParameters", [
+    "g_leak", "cm", "tau_m", "v_rest", "i_offset", "e_rev_E", "e_rev_I",
+    "tau_syn_E", "tau_syn_I", "v_thresh", "v_reset", "tau_refrac", "v_inf"])
+
+class EventSimulator(native.Simulator):
+    """
+    Event-driven simulator for networks of IF_cond_exp neurons. The neuron
+    states, the pending events and the predicted spikes are kept between calls
+    to "run" and discarded by "reset".
+    """
+
+    def configure(self, epsilon=1e-4, tolerance=1e-3):
+        """
+        :param epsilon: synaptic conductances smaller than epsilon times the
+        leak conductance are considered negligible.
+        :param tolerance: maximum estimated error of the membrane potential in
+        mV per integration step. The step size never falls below the timestep.
+        """
+        self.epsilon = float(epsilon)
+        self.tolerance = float(tolerance)
+
+    def _clear(self):
+        native.Simulator._clear(self)
+        self.epsilon = 1e-4
+        self.tolerance = 1e-3
+        self.state = None
+
+    def _add_population(self, population):
+        native.Simulator._add_population(self, population)
+        self.state = None
+
+    def reset(self):
+        native.Simulator.reset(self)
+        self.state = None
+
+    def end(self):
+        native.Simulator.end(self)
+        self.state = None
+
+    def _parameters(self, neurons, n_neurons):
+        """
+        Returns a list containing the NeuronParameters for each neuron.
+        """
+        keys = ["cm", "tau_m", "v_rest", "i_offset", "e_rev_E", "e_rev_I",
+                "tau_syn_E", "tau_syn_I", "v_thresh", "v_reset", "tau_refrac"]
+        columns = dict((key, np.empty(n_neurons)) for key in keys)
+        for population, offs in neurons:
+            for key in keys:
+                columns[key][offs:offs + population.size] = \
+                    population.parameters[key]
+        cm, tau_m = columns["cm"], columns["tau_m"]
+        g_leak = cm / tau_m
+        v_inf = columns["v_rest"] + columns["i_offset"] / g_leak
+        return [NeuronParameters(*values) for values in zip(*(
+            [g_leak.tolist(), cm.tolist(), tau_m.tolist()] +
+            [columns[key].tolist() for key in keys[2:]] + [v_inf.tolist()]))]
+
+    def _synapses(self, offsets):
+        """
+        Groups the synapses by presynaptic neuron and delay. Returns a
+        dictionary mapping from the global index of each presynaptic neuron onto
+        the list of its delays and a dictionary mapping from (pre, delay) onto
+        the list of (target, inhibitory, weight) tuples.
+        """
+        delays = {}
+        groups = {}
+        for projection in self.projections:
+            if projection.post._population.celltype is native.SpikeSourceArray:
+                raise exceptions.PyNNLessException("Spike sources cannot be " +
+                                                   "the target of a projection")
+            inhibitory = projection.receptor_type == "inhibitory"
+            pre = projection.sources + offsets[id(projection.pre._population)]
+            tar = projection.targets + offsets[id(projection.post._population)]
+            weights = np.asarray(projection.weights, dtype=np.float64)
+            for i, j, w, d in zip(pre.tolist(), tar.tolist(), weights.tolist(),
+                                  np.asarray(projection.delays).tolist()):
+                key = (i, d)
+                if not key in groups:
+                    groups[key] = []
+                    delays.setdefault(i, []).append(d)
+                groups[key].append((j, inhibitory or w < 0, abs(w)))
+        return delays, groups
+
+    def _initial_state(self, neurons, n_neurons):
+        v = np.empty(n_neurons)
+        for population, offs in neurons:
+            v[offs:offs + population.size] = population.initial_values["v"]
+        return {
+            "v": v.tolist(),
+            "ge": [0.0] * n_neurons,
+            "gi": [0.0] * n_neurons,
+            "t_last": [0.0] * n_neurons,
+            "refrac_end": [0.0] * n_neurons,
+            "version": [0] * n_neurons,
+            "queue": [],
+            "seq": 0
+        }
+
+    def _step(self, p, v, ge, gi, dt):
+        """
+        Integrates the membrane of a neuron with parameters p over dt, using the
+        conductances at the middle of the step.
+        """
+        (g_leak, cm, tau_m, v_rest, i_offset, e_rev_E, e_rev_I, tau_syn_E,
+            tau_syn_I, v_thresh, v_reset, tau_refrac, v_inf) = p
+        ge_mid = ge * math.exp(-0.5 * dt / tau_syn_E)
+        gi_mid = gi * math.exp(-0.5 * dt / tau_syn_I)
+        g = g_leak + ge_mid + gi_mid
+        v_eq = (g_leak * v_rest + ge_mid * e_rev_E + gi_mid * e_rev_I +
+                i_offset) / g
+        v = v_eq + (v - v_eq) * math.exp(-dt * g / cm)
+        return (v, ge * math.exp(-dt / tau_syn_E),
+                gi * math.exp(-dt / tau_syn_I))
+
+    def _adaptive_step(self, p, v, ge, gi, h):
+        """
+        Integrates the membrane over a step of at most h. The error is estimated
+        by comparing a full step with two half steps and the step is shrunk
+        until the error is smaller than the tolerance or the step equals the
+        timestep. Returns the new state, the step actually taken and the
+        proposed size of the next step.
+        """
+        while True:
+            v1, _, _ = self._step(p, v, ge, gi, h)
+            v2, ge2, gi2 = self._step(p, v, ge, gi, 0.5 * h)
+            v2, ge2, gi2 = self._step(p, v2, ge2, gi2, 0.5 * h)
+            err = abs(v2 - v1)
+            factor = 0.9 * (self.tolerance / max(err, 1e-12)) ** (1.0 / 3.0)
+            if (err <= self.tolerance) or (h <= self.timestep):
+                # Richardson extrapolation of the second order scheme
+                return (v2 + (v2 - v1) / 3.0, ge2, gi2, h,
+                        max(self.timestep, h * min(4.0, factor)))
+            h = max(self.timestep, h * max(0.2, factor))
+
+    def _skip_refractory(self, p, j, v, ge, gi, t0, t1):
+        """
+        Applies the refractory period of neuron j to the state at time t0,
+        returns the state and the time at which the integration continues.
+        """
+        refrac_end = self.state["refrac_end"][j]
+        if t0 >= refrac_end:
+            return v, ge, gi, t0
+        t = min(t1, refrac_end)
+        return (p.v_reset, ge * math.exp(-(t - t0) / p.tau_syn_E),
+                gi * math.exp(-(t - t0) / p.tau_syn_I), t)
+
+    def _advance(self, p, j, t1):
+        """
+        Advances the state of neuron j to time t1.
+        """
+        state = self.state
+        t = state["t_last"][j]
+        v, ge, gi, t = self._skip_refractory(p, j, state["v"][j],
+            state["ge"][j], state["gi"][j], t, t1)
+        eps = self.epsilon * p.g_leak
+        h = self.timestep
+        while t < t1:
+            if ge + gi < eps:
+                dt = t1 - t
+                v = p.v_inf + (v - p.v_inf) * math.exp(-dt / p.tau_m)
+                ge *= math.exp(-dt / p.tau_syn_E)
+                gi *= math.exp(-dt / p.tau_syn_I)
+                break
+            v, ge, gi, dt, h = self._adaptive_step(p, v, ge, gi,
+                                                   min(h, t1 - t))
+            t += dt
+        state["v"][j], state["ge"][j], state["gi"][j] = v, ge, gi
+        state["t_last"][j] = t1
+
+    def _predict(self, p, j, t0):
+        """
+        Predicts the next threshold crossing of neuron j, assuming it receives
+        no further input after time t0. Returns None if the neuron will not
+        spike.
+        """
+        state = self.state
+        v, ge, gi, t = self._skip_refractory(p, j, state["v"][j],
+            state["ge"][j], state["gi"][j], t0, float("inf"))
+        g_leak, v_rest, i_offset, e_rev_E = (p.g_leak, p.v_rest, p.i_offset,
+                                             p.e_rev_E)
+        v_thresh, v_inf = p.v_thresh, p.v_inf
+        eps = self.epsilon * g_leak
+        h = self.timestep
+        while True:
+            if v >= v_thresh:
+                return t
+            if ge + gi < eps:
+                if v_inf <= v_thresh:
+                    return None
+                return t + p.tau_m * math.log((v_inf - v) / (v_inf - v_thresh))
+
+            # The membrane potential cannot exceed the equilibrium potential
+            # without inhibition, which decreases towards v_inf as the
+            # excitatory conductance decays
+            bound = max(v_inf, (g_leak * v_rest + ge * e_rev_E + i_offset) /
+                        (g_leak + ge))
+            if bound < v_thresh:
+                return None
+
+            v_new, ge_new, gi_new, dt, h = self._adaptive_step(p, v, ge, gi, h)
+            if v_new >= v_thresh:
+                return self._crossing(p, v, ge, gi, t, dt)
+            v, ge, gi = v_new, ge_new, gi_new
+            t += dt
+
+    def _crossing(self, p, v, ge, gi, t, dt):
+        """
+        Locates the threshold crossing within the step of size dt starting at
+        time t by integrating with the timestep, the crossing time is linearly
+        interpolated between two timesteps.
+        """
+        t_end = t + dt
+        while t < t_end:
+            step = min(self.timestep, t_end - t)
+            v_new, ge, gi = self._step(p, v, ge, gi, step)
+            if v_new >= p.v_thresh:
+                return t + step * (p.v_thresh - v) / (v_new - v)
+            v = v_new
+            t += step
+        return t_end
+
+    def _push(self, t, kind, j, data):
+        state = self.state
+        heapq.heappush(state["queue"], (t, kind, state["seq"], j, data))
+        state["seq"] += 1
+
+    def _schedule(self, p, j, t):
+        """
+        Invalidates the predicted spike of neuron j and predicts a new one.
+        """
+        state = self.state
+        state["version"][j] += 1
+        t_spike = self._predict(p, j, t)
+        if t_spike is not None:
+            self._push(t_spike, EVENT_SPIKE, j, state["version"][j])
+
+    def simulate(self, t_start, t_stop):
+        neurons, sources, n_neurons, n_sources, offsets = self.layout()
+        params = self._parameters(neurons, n_neurons)
+        delays, groups = self._synapses(offsets)
+        if self.state is None:
+            self.state = self._initial_state(neurons, n_neurons)
+
+            # Neurons with a constant input current may spike without input
+            for j in xrange(n_neurons):
+                if params[j].v_inf > params[j].v_thresh:
+                    self._schedule(params[j], j, t_start)
+        state = self.state
+        queue = state["queue"]
+
+        # Enqueue the spike source events in this interval
+        for population, offs in sources:
+            trains = self.source_spikes(population, t_start, t_stop)
+            for i, times in enumerate(trains):
+                for t in times.tolist():
+                    self._push(t, EVENT_SOURCE, offs + i, None)
+
+        spikes = [[] for _ in xrange(n_neurons)]
+        while len(queue) > 0 and queue[0][0] < t_stop:
+            t, kind, _, j, data = heapq.heappop(queue)
+            if kind == EVENT_ARRIVAL:
+                for k, inhibitory, w in groups.get((j, data), []):
+                    self._advance(params[k], k, t)
+                    if inhibitory:
+                        state["gi"][k] += w
+                    else:
+                        state["ge"][k] += w
+                    self._schedule(params[k], k, t)
+                continue
+            if kind == EVENT_SPIKE:
+                if data != state["version"][j]:
+                    continue
+                p = params[j]
+                self._advance(p, j, t)
+                spikes[j].append(t)
+                state["v"][j] = p.v_reset
+                state["refrac_end"][j] = t + p.tau_refrac
+                self._schedule(p, j, t)
+            for d in delays.get(j, []):
+                self._push(t + d, EVENT_ARRIVAL, j, d)
+
+        for population, offs in sources:
+            index = population._recorded(const.SIG_SPIKES)
+            if len(index) > 0:
+                trains = self.source_spikes(population, t_start, t_stop)
+                population._append_spikes(index, [trains[i] for i in index])
+        for population, offs in neurons:
+            index = population._recorded(const.SIG_SPIKES)
+            population._append_spikes(index,
+                [np.array(spikes[offs + i]) for i in index])
+
+native.export(globals(), EventSimulator(),
+              [IF_cond_exp, native.SpikeSourceArray])
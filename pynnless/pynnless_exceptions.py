@@ -26,6 +26,17 @@ class PyNNLessException(Exception):
     """
     pass
 
+class PyNNLessValidationException(PyNNLessException):
+    """
+    Thrown if a network description is invalid. The "errors" attribute contains
+    the list of all violations which were found.
+    """
+
+    def __init__(self, errors):
+        PyNNLessException.__init__(self, "Invalid network description:\n\t" +
+                                   "\n\t".join(errors))
+        self.errors = errors
+
 class PyNNLessVersionException(Exception):
     """
     Indicates an incompatible PyNN version.
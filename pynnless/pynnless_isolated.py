@@ -30,27 +30,144 @@ the PyNNLess class are implemented to the full extent.
 
 import traceback
 import multiprocessing
+import os
+import Queue
+import time
 
 from pynnless import PyNNLess
 from pynnless_utils import FileLock
+import pynnless_estimator as estimator
+import pynnless_exceptions as exceptions
+import pynnless_profiling as profiling
+import pynnless_validator as validator
 
-def _PyNNLessIsolatedMain(q, lockfile, simulator, setup, network, duration):
+# Interval in seconds in which the parent process checks whether the worker
+# process is still alive while waiting for its next message
+POLL_INTERVAL = 1.0
+
+def _worker_setup(q, setup):
     """
-    Function to be executed in its own isolated process.
+    Returns a copy of the setup parameters with a "timing_callback" sending a
+    ("phase", info) message to the parent process whenever a phase of the run
+    ends. The info dictionary contains the path, the duration and the peak
+    resident set size of the phase. A "timing_callback" given by the user is
+    still called.
     """
-    with FileLock(lockfile, release=False):
-        inst = None
-        res = None
-        times = None
-        exception = None
+    callback = setup.get("timing_callback")
+
+    def report(path, node):
+        q.put(("phase", {
+            "phase": "/".join(path),
+            "time": node["time"],
+            "rss_peak": node.get("rss_peak")
+        }))
+        if callback is not None:
+            callback(path, node)
+
+    setup = dict(setup)
+    setup["timing_callback"] = report
+    return setup
+
+def _receive(q, p, progress):
+    """
+    Waits for the next message of the worker process p which is not a phase
+    report. The phase reports are stored in the "progress" dictionary. Raises a
+    PyNNLessException containing the exit code of the process and the last
+    reported phase if the process ends without sending a message.
+    """
+    while True:
         try:
-            inst = PyNNLess(simulator, setup)
-            res = inst.run(network, duration)
-            times = inst.get_time_info()
-        except:
-            exception = traceback.format_exc()
+            msg = q.get(timeout=POLL_INTERVAL)
+        except Queue.Empty:
+            if p.is_alive():
+                continue
+            # The message may have arrived just before the process ended
+            try:
+                msg = q.get(timeout=POLL_INTERVAL)
+            except Queue.Empty:
+                raise exceptions.PyNNLessException(
+                    _exit_message(p.exitcode, progress))
+        if msg[0] != "phase":
+            return msg
+        progress.update(msg[1])
+
+def _exit_message(exitcode, progress):
+    msg = "Simulator process exited with code " + str(exitcode)
+    if not "phase" in progress:
+        return msg + " before completing any phase"
+    msg += (" after completing phase \"" + progress["phase"] + "\" ("
+            + ("%.3f" % progress["time"]) + " s")
+    if progress["rss_peak"] is not None:
+        msg += ", peak RSS " + str(progress["rss_peak"]) + " bytes"
+    return msg + ")"
 
-        q.put((res, times, exception))
+def _PyNNLessIsolatedMain(q, lockfile, simulator, setup, network, duration,
+                          output=None):
+    """
+    Function to be executed in its own isolated process.
+    """
+    tracer = profiling.get_tracer()
+    if tracer is not None:
+        tracer.set_process_name("worker " + str(os.getpid()))
+    with profiling.span("isolated_run", "isolated",
+                        {"simulator": simulator}):
+        with FileLock(lockfile, release=False):
+            inst = None
+            res = None
+            times = None
+            exception = None
+            try:
+                inst = PyNNLess(simulator, _worker_setup(q, setup))
+                res = inst.run(network, duration, output=output)
+            except:
+                exception = traceback.format_exc()
+            finally:
+                # The process ends without running any destructors
+                if inst is not None:
+                    inst.close()
+
+            # Send the timing and memory information back to the parent
+            # process, even if the run failed
+            if inst is not None:
+                times = inst.get_time_info()
+
+    # Write the trace events before sending the result, the process is ended
+    # without calling the atexit handlers
+    profiling.flush_tracing()
+    q.put(("done", res, times, exception, time.time()))
+
+def _PyNNLessIsolatedSegmentsMain(q, lockfile, simulator, setup, network,
+                                  segment_duration, duration):
+    """
+    Function executing "run_segments" in its own isolated process. Sends a
+    ("segment", segment) message for each segment, ("phase", info) messages
+    for the phases of the run and a final ("done", times, exception, time)
+    message.
+    """
+    tracer = profiling.get_tracer()
+    if tracer is not None:
+        tracer.set_process_name("worker " + str(os.getpid()))
+    with profiling.span("isolated_run_segments", "isolated",
+                        {"simulator": simulator}):
+        with FileLock(lockfile, release=False):
+            inst = None
+            times = None
+            exception = None
+            try:
+                inst = PyNNLess(simulator, _worker_setup(q, setup))
+                for segment in inst.run_segments(network, segment_duration,
+                                                 duration):
+                    q.put(("segment", segment))
+            except:
+                exception = traceback.format_exc()
+            finally:
+                if inst is not None:
+                    inst.close()
+            if inst is not None:
+                times = inst.get_time_info()
+
+    profiling.flush_tracing()
+    q.put(("done", times, exception, time.time()))
 
 class PyNNLessIsolated:
     #
@@ -69,6 +186,14 @@ class PyNNLessIsolated:
     # Time information received from the subprocess
     times = {}
 
+    # Simulator chosen for the last run if the simulator name is "auto", see
+    # PyNNLess.AUTO_SIMULATOR
+    selected_simulator = None
+
+    # Maximum number of segments sent by "run_segments" which have not been
+    # consumed yet, the worker process blocks once this limit is reached
+    segment_queue_size = 2
+
     def __init__(self, simulator, setup = {}, concurrent=False):
         self.simulator = simulator
         self.setup = setup
@@ -78,6 +203,10 @@ class PyNNLessIsolated:
     def simulators():
         return PyNNLess.simulators()
 
+    @staticmethod
+    def probe_simulators(capabilities=False, refresh=False):
+        return PyNNLess.probe_simulators(capabilities, refresh)
+
     @staticmethod
     def normalized_simulator_name(simulator):
         return PyNNLess.normalized_simulator_name(simulator)
@@ -104,25 +233,63 @@ class PyNNLessIsolated:
     def get_time_info(self):
         return self.times
 
-    def run(self, network, duration = 0):
+    def _validate(self, network):
+        # Report invalid networks before spawning the process and acquiring the
+        # hardware lock
+        if self.setup.get("validate", True):
+            validator.check_network(network)
+
+    @staticmethod
+    def _lockfile_name(simulator):
+        return '.~' + simulator
+
+    def _lockfile(self, simulator):
         # Fetch some simulator information -- serialize access to the simulator
         # backend if we're dealing with a hardware system
-        info = self.get_simulator_info()
-        lockfile = None
+        info = self.get_simulator_info_static(simulator)
         if info["is_hardware"]:
-            lockfile = '.~' + self.simulator
+            return self._lockfile_name(simulator)
+        return None
+
+    def _select_simulator(self, network, duration):
+        # Choose the simulator for this run, each run happens in a new process,
+        # so the choice is made anew for each network
+        if self.simulator != PyNNLess.AUTO_SIMULATOR:
+            return self.simulator
+        self.selected_simulator = estimator.select_simulator(network, duration,
+            self.setup, exclude=PyNNLess.AUTO_EXCLUDED_SIMULATORS)
+        return self.selected_simulator
+
+    def run(self, network, duration = 0, output=None):
+        self._validate(network)
+        simulator = self._select_simulator(network, duration)
+        lockfile = self._lockfile(simulator)
 
         # Call the _PyNNLess_Async_Main method in another process and wait for
         # the response
         q = multiprocessing.Queue()
         p = multiprocessing.Process(
                 target=_PyNNLessIsolatedMain,
-                args=(q, lockfile, self.simulator, self.setup, network,
-                    duration)
+                args=(q, lockfile, simulator, self.setup, network,
+                    duration, output)
             )
-        p.start()
-        res, self.times, exception = q.get()
-        p.join()
+        with profiling.span("spawn", "isolated"):
+            p.start()
+        try:
+            with profiling.span("wait", "isolated", {"pid": p.pid}):
+                _, res, self.times, exception, t_send = _receive(q, p, {})
+        except:
+            p.terminate()
+            p.join()
+            raise
+
+        # Record the transfer of the result from the child process
+        tracer = profiling.get_tracer()
+        if tracer is not None:
+            tracer.complete("ipc_transfer", t_send, time.time(), "isolated",
+                            {"pid": p.pid})
+        with profiling.span("join", "isolated", {"pid": p.pid}):
+            p.join()
 
         # Rethrow an exception if one happened in the child process
         if exception != None:
@@ -131,3 +298,41 @@ class PyNNLessIsolated:
         # Return the computation result
         return res
 
+
+    def run_segments(self, network, segment_duration, duration=0):
+        """
+        Runs "PyNNLess.run_segments" in a separate process and yields the
+        (t_start, t_stop, res) tuples of the individual segments as they are
+        received. Closing the generator early terminates the process.
+        """
+        self._validate(network)
+        simulator = self._select_simulator(network, duration)
+        lockfile = self._lockfile(simulator)
+        q = multiprocessing.Queue(self.segment_queue_size)
+        p = multiprocessing.Process(
+                target=_PyNNLessIsolatedSegmentsMain,
+                args=(q, lockfile, simulator, self.setup, network,
+                    segment_duration, duration)
+            )
+        with profiling.span("spawn", "isolated"):
+            p.start()
+        exception = None
+        done = False
+        progress = {}
+        try:
+            while not done:
+                msg = _receive(q, p, progress)
+                if msg[0] == "segment":
+                    yield msg[1]
+                else:
+                    _, self.times, exception, _ = msg
+                    done = True
+        finally:
+            if not done:
+                p.terminate()
+            with profiling.span("join", "isolated", {"pid": p.pid}):
+                p.join()
+
+        # Rethrow an exception if one happened in the child process
+        if exception != None:
+            raise Exception(exception)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Mock PyNN backend which does not simulate the network at all, but produces
+synthetic output: neurons emit Poisson spike trains and the recorded analogue
+signals are filled with random samples, spike sources emit their spike times.
+The amount of data produced is controlled by the "rate" setup parameter (the
+spike rate in Hz) and the "timestep" or the "sampling_interval" passed to
+"record". Since the backend costs next to nothing, it can be used to measure
+the overhead of PyNNLess itself and to test PyNNLess on machines without a
+simulator. Use it by passing "mock" as simulator name to PyNNLess.
+"""
+
+import numpy as np
+
+import pynnless_constants as const
+import pynnless_native as native
+
+class MockSimulator(native.Simulator):
+    """
+    Simulator producing random output for all recorded signals.
+    """
+
+    def configure(self, rate=10.0, seed=None):
+        """
+        :param rate: rate of the Poisson spike trains emitted by the neurons in
+        Hz.
+        :param seed: seed of the random number generator, output is random if
+        None.
+        """
+        self.rate = float(rate)
+        self.rng = np.random.RandomState(seed)
+
+    def _poisson_spikes(self, n, t_start, t_stop):
+        """
+        Returns n sorted Poisson spike trains in the interval [t_start, t_stop).
+        """
+        counts = self.rng.poisson(self.rate * (t_stop - t_start) * 1e-3, n)
+        nids = np.repeat(np.arange(n), counts)
+        times = self.rng.uniform(t_start, t_stop, len(nids))
+        times = times[np.lexsort((times, nids))]
+        return np.split(times, np.cumsum(counts)[:-1])
+
+    def _signal(self, population, signal, n_samples):
+        """
+        Returns random samples for the given signal, one column per recorded
+        neuron.
+        """
+        index = population._recorded(signal)
+        shape = (n_samples, len(index))
+        if signal == const.SIG_V:
+            lo = population.parameters["v_reset"][index]
+            hi = population.parameters["v_thresh"][index]
+            return lo + (hi - lo) * self.rng.uniform(size=shape)
+        return self.rng.exponential(0.01, size=shape)
+
+    def simulate(self, t_start, t_stop):
+        for population in self.populations:
+            index = population._recorded(const.SIG_SPIKES)
+            if len(index) > 0:
+                if population.celltype is native.SpikeSourceArray:
+                    trains = self.source_spikes(population, t_start, t_stop)
+                    trains = [trains[i] for i in index]
+                else:
+                    trains = self._poisson_spikes(len(index), t_start, t_stop)
+                population._append_spikes(index, trains)
+            for signal in population.celltype.recordable:
+                if (signal == const.SIG_SPIKES or
+                        not population.recording[signal].any()):
+                    continue
+                times = self.sample_times(population, t_start, t_stop)
+                population._append_signal(signal, times,
+                    self._signal(population, signal, len(times)))
+
+native.export(globals(), MockSimulator())
@@ -0,0 +1,718 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Common infrastructure for the simulator backends shipped with PyNNLess. Provides
+a minimal, in-process implementation of the subset of the PyNN 0.7 and 0.8 API
+used by PyNNLess: cell types, populations, population views, projections, the
+FromListConnector, recording and the setup/run/reset/end functions. The actual
+neuron dynamics are implemented by subclasses of the "Simulator" class, the
+"export" function populates a backend module with the PyNN interface bound to
+an instance of such a subclass.
+"""
+
+import abc
+
+import numpy as np
+
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+
+# PyNN version whose API is emulated by the built-in backends. The backends
+# additionally accept the PyNN 0.7 calling conventions.
+PYNN_VERSION = "0.8.0"
+
+#
+# Cell types
+#
+
+class CellType(object):
+    """
+    Base class of the cell types, mirrors the "default_parameters" and
+    "recordable" attributes of the PyNN standard cell types.
+    """
+
+    # Default parameters, copied from the PyNN 0.8 standard models
+    default_parameters = {}
+
+    # List of signals which can be recorded
+    recordable = [const.SIG_SPIKES]
+
+    # Initial values of the state variables, may refer to parameter names
+    default_initial_values = {}
+
+class IF_cond_exp(CellType):
+    default_parameters = {
+        "v_rest": -65.0,
+        "cm": 1.0,
+        "tau_m": 20.0,
+        "tau_refrac": 0.1,
+        "tau_syn_E": 5.0,
+        "tau_syn_I": 5.0,
+        "e_rev_E": 0.0,
+        "e_rev_I": -70.0,
+        "v_thresh": -50.0,
+        "v_reset": -65.0,
+        "i_offset": 0.0
+    }
+    recordable = [const.SIG_SPIKES, const.SIG_V, const.SIG_GE, const.SIG_GI]
+    default_initial_values = {"v": "v_rest"}
+
+class EIF_cond_exp_isfa_ista(CellType):
+    default_parameters = {
+        "cm": 0.281,
+        "tau_refrac": 0.1,
+        "v_spike": -40.0,
+        "v_reset": -70.6,
+        "v_rest": -70.6,
+        "tau_m": 9.3667,
+        "i_offset": 0.0,
+        "a": 4.0,
+        "b": 0.0805,
+        "delta_T": 2.0,
+        "tau_w": 144.0,
+        "v_thresh": -50.4,
+        "e_rev_E": 0.0,
+        "tau_syn_E": 5.0,
+        "e_rev_I": -80.0,
+        "tau_syn_I": 5.0
+    }
+    recordable = [const.SIG_SPIKES, const.SIG_V, const.SIG_GE, const.SIG_GI]
+    default_initial_values = {"v": "v_rest", "w": 0.0}
+
+class SpikeSourceArray(CellType):
+    default_parameters = {
+        "spike_times": []
+    }
+
+# Cell types exported by each backend
+CELL_TYPES = [IF_cond_exp, EIF_cond_exp_isfa_ista, SpikeSourceArray]
+
+#
+# Neo-like result data structures
+#
+
+class SpikeTrain(np.ndarray):
+    """
+    Array of spike times in ms, the "annotations" dictionary contains the
+    index of the neuron in its population ("source_index").
+    """
+
+    def __new__(cls, times, source_index):
+        obj = np.asarray(times, dtype=np.float64).view(cls)
+        obj.annotations = {"source_index": source_index}
+        return obj
+
+    def __array_finalize__(self, obj):
+        self.annotations = getattr(obj, "annotations", {})
+
+class AnalogSignalArray(np.ndarray):
+    """
+    Matrix of samples with one column per recorded neuron, "times" contains the
+    sample times in ms, "channel_index" the population indices of the neurons.
+    """
+
+    def __new__(cls, data, times, name, channel_index):
+        obj = np.asarray(data, dtype=np.float64).view(cls)
+        obj.times = np.asarray(times, dtype=np.float64)
+        obj.name = name
+        obj.channel_index = np.asarray(channel_index, dtype=np.int64)
+        return obj
+
+    def __array_finalize__(self, obj):
+        self.times = getattr(obj, "times", None)
+        self.name = getattr(obj, "name", None)
+        self.channel_index = getattr(obj, "channel_index", None)
+
+class Segment(object):
+    """
+    Data recorded between two calls to "reset".
+    """
+
+    def __init__(self, spiketrains=[], analogsignalarrays=[]):
+        self.spiketrains = spiketrains
+        self.analogsignalarrays = analogsignalarrays
+
+    @property
+    def analogsignals(self):
+        return self.analogsignalarrays
+
+class Block(object):
+    """
+    Container for the recorded segments as returned by "get_data".
+    """
+
+    def __init__(self, segments=[]):
+        self.segments = segments
+
+class _Recording(object):
+    """
+    Raw data recorded for an entire population in a single segment. Spikes
+    are stored as a list of arrays for each neuron, signals as a list of
+    (times, data) chunks with data containing one column per recorded neuron.
+    The indices of the recorded neurons are stored in "columns".
+    """
+
+    def __init__(self, size):
+        self.spikes = [[] for _ in xrange(size)]
+        self.signals = {}
+        self.columns = {}
+
+    def spike_train(self, i):
+        if len(self.spikes[i]) == 0:
+            return np.zeros(0)
+        if len(self.spikes[i]) > 1:
+            self.spikes[i] = [np.concatenate(self.spikes[i])]
+        return self.spikes[i][0]
+
+    def signal(self, name, index):
+        """
+        Returns the sample times and the data of the given signal for the
+        neurons with the given indices, which must have been recorded.
+        """
+        chunks = self.signals.get(name, [])
+        if len(chunks) == 0:
+            return np.zeros(0), np.zeros((0, len(index)))
+        if len(chunks) > 1:
+            chunks[:] = [(np.concatenate([c[0] for c in chunks]),
+                          np.concatenate([c[1] for c in chunks]))]
+        times, data = chunks[0]
+        return times, data[:, np.searchsorted(self.columns[name], index)]
+
+#
+# Populations and projections
+#
+
+def _as_indices(size, selector):
+    """
+    Converts a PyNN population view selector (an integer, a slice, a list of
+    indices or a boolean mask) into an array of neuron indices.
+    """
+    indices = np.arange(size)[selector]
+    return np.atleast_1d(indices).astype(np.int64)
+
+class _PopulationBase(object):
+    """
+    Functionality shared by populations and population views. All operations
+    act on the neurons "_index" of the parent population "_population".
+    """
+
+    _population = None
+    _index = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, selector):
+        return PopulationView(self, selector)
+
+    @property
+    def celltype(self):
+        return self._population.celltype
+
+    def set(self, param=None, val=None, **parameters):
+        """
+        Sets the given parameters, accepts both the PyNN 0.7 (dictionary or
+        name/value pair) and the PyNN 0.8 (keyword arguments) conventions.
+        Values may either be scalars (or a list of spike times), which are
+        shared by all neurons, or sequences with one entry per neuron.
+        """
+        if isinstance(param, dict):
+            parameters.update(param)
+        elif param is not None:
+            parameters[param] = val
+        pop = self._population
+        for key, value in parameters.items():
+            if not key in pop.parameters:
+                raise exceptions.PyNNLessException("Unknown parameter \"" +
+                    key + "\" for cell type " + pop.celltype.__name__)
+            if key == "spike_times":
+                values = value if (len(value) == len(self._index) and
+                    len(value) > 0 and np.ndim(value[0]) > 0) else None
+                for j, i in enumerate(self._index):
+                    times = value if values is None else values[j]
+                    pop.parameters[key][i] = np.array(times, dtype=np.float64)
+            else:
+                pop.parameters[key][self._index] = value
+
+    def tset(self, param, values):
+        """
+        PyNN 0.7 method setting one value per neuron.
+        """
+        self.set(**{param: values})
+
+    def get(self, parameter_name, gather=True):
+        """
+        Returns the values of the given parameter for each neuron.
+        """
+        values = self._population.parameters[parameter_name]
+        if parameter_name == "spike_times":
+            return [values[i] for i in self._index]
+        return values[self._index]
+
+    def initialize(self, variable=None, value=None, **initial_values):
+        """
+        Sets the initial value of a state variable, accepts both the PyNN 0.7
+        (name/value pair) and the PyNN 0.8 (keyword arguments) conventions.
+        """
+        if variable is not None:
+            initial_values[variable] = value
+        for key, value in initial_values.items():
+            self._population.initial_values[key][self._index] = value
+
+    def record(self, variables=None, to_file=None, sampling_interval=None):
+        """
+        Enables recording of the given signals. If no signal is given, spikes
+        are recorded (PyNN 0.7 convention).
+        """
+        if variables is None:
+            variables = [const.SIG_SPIKES]
+        elif variables == "all":
+            variables = self.celltype.recordable
+        elif isinstance(variables, str):
+            variables = [variables]
+        pop = self._population
+        for variable in variables:
+            if not variable in pop.celltype.recordable:
+                raise exceptions.PyNNLessException("Cannot record \"" +
+                    variable + "\" from cell type " + pop.celltype.__name__)
+            pop.recording[variable][self._index] = True
+        if sampling_interval is not None:
+            pop.sampling_interval = float(sampling_interval)
+
+    def record_v(self, to_file=None):
+        self.record([const.SIG_V])
+
+    def record_gsyn(self, to_file=None):
+        self.record([const.SIG_GE, const.SIG_GI])
+
+    def _recorded(self, signal):
+        return self._index[self._population.recording[signal][self._index]]
+
+    def _segment(self, recording, variables):
+        pop = self._population
+        spiketrains = []
+        signals = []
+        for variable in variables:
+            index = self._recorded(variable)
+            if variable == const.SIG_SPIKES:
+                spiketrains = [SpikeTrain(recording.spike_train(i), i)
+                               for i in index]
+            elif len(index) > 0:
+                times, data = recording.signal(variable, index)
+                signals.append(AnalogSignalArray(data, times, variable, index))
+        return Segment(spiketrains, signals)
+
+    def get_data(self, variables="all", gather=True, clear=False):
+        """
+        Returns a Block containing one Segment for each run since the last call
+        to "setup", the last segment contains the data of the current run.
+        """
+        if variables == "all":
+            variables = self.celltype.recordable
+        elif isinstance(variables, str):
+            variables = [variables]
+        pop = self._population
+        res = Block([self._segment(recording, variables)
+                     for recording in pop.segments + [pop.recording_data]])
+        if clear:
+            pop.segments = []
+            pop.recording_data = _Recording(pop.size)
+        return res
+
+    def getSpikes(self, gather=True, compatible_output=True):
+        """
+        PyNN 0.7 method returning the spikes of the current segment as a list of
+        (neuron index, time) tuples.
+        """
+        rows = []
+        for i in self._recorded(const.SIG_SPIKES):
+            times = self._population.recording_data.spike_train(i)
+            rows.append(np.column_stack((np.repeat(float(i), len(times)),
+                                         times)))
+        if len(rows) == 0:
+            return np.zeros((0, 2))
+        res = np.concatenate(rows)
+        return res[np.argsort(res[:, 1], kind="mergesort")]
+
+    def _get_signals(self, signals):
+        pop = self._population
+        index = self._recorded(signals[0])
+        if len(index) == 0:
+            return np.zeros((0, 2 + len(signals)))
+        columns = []
+        for signal in signals:
+            times, data = pop.recording_data.signal(signal, index)
+            columns.append(data.T.flatten())
+        return np.column_stack([np.repeat(index, len(times)).astype(float),
+                                np.tile(times, len(index))] + columns)
+
+    def get_v(self, gather=True, compatible_output=True):
+        """
+        PyNN 0.7 method returning a list of (neuron index, time, v) tuples.
+        """
+        return self._get_signals([const.SIG_V])
+
+    def get_gsyn(self, gather=True, compatible_output=True):
+        """
+        PyNN 0.7 method returning a list of (neuron index, time, gsyn_exc,
+        gsyn_inh) tuples.
+        """
+        return self._get_signals([const.SIG_GE, const.SIG_GI])
+
+class Population(_PopulationBase):
+    """
+    Population of neurons of a single cell type. Stores the parameters and the
+    initial values as arrays with one entry per neuron.
+    """
+
+    # Simulator instance the population belongs to, set by "export"
+    _simulator = None
+
+    def __init__(self, size, cellclass, cellparams=None, structure=None,
+                 initial_values={}, label=None):
+        if not isinstance(cellclass, type):
+            cellclass = type(cellclass)
+        self.size = int(size)
+        self._population = self
+        self._index = np.arange(self.size)
+        self._celltype = cellclass
+        self.label = label
+
+        # Parameters and state variables, one entry per neuron
+        self.parameters = {}
+        for key, value in cellclass.default_parameters.items():
+            if key == "spike_times":
+                self.parameters[key] = [np.zeros(0)
+                                        for _ in xrange(self.size)]
+            else:
+                self.parameters[key] = np.empty(self.size)
+                self.parameters[key].fill(value)
+        if cellparams is not None:
+            self.set(cellparams)
+        self.initial_values = {}
+        for key, value in cellclass.default_initial_values.items():
+            if isinstance(value, str):
+                value = self.parameters[value]
+            self.initial_values[key] = np.array(np.broadcast_to(
+                value, (self.size,)), dtype=np.float64)
+        self.initialize(**initial_values)
+
+        # Recording flags for each signal and neuron and the recorded data
+        self.recording = dict((signal, np.zeros(self.size, dtype=bool))
+                              for signal in cellclass.recordable)
+        self.sampling_interval = None
+        self.segments = []
+        self.recording_data = _Recording(self.size)
+
+        self._simulator._add_population(self)
+
+    @property
+    def celltype(self):
+        return self._celltype
+
+    def _new_segment(self):
+        if ((len(self.recording_data.signals) > 0) or
+                any(len(s) > 0 for s in self.recording_data.spikes)):
+            self.segments.append(self.recording_data)
+        else:
+            self.segments.append(_Recording(self.size))
+        self.recording_data = _Recording(self.size)
+
+    def _append_spikes(self, index, trains):
+        """
+        Called by the simulator to store the spike trains of the neurons with
+        the given indices.
+        """
+        for i, train in zip(index, trains):
+            if len(train) > 0:
+                self.recording_data.spikes[i].append(np.asarray(train))
+
+    def _append_signal(self, name, times, data):
+        """
+        Called by the simulator to store the samples of a signal, "data"
+        contains one column per neuron recorded at the beginning of the run, in
+        the order returned by "_recorded".
+        """
+        if name not in self.recording_data.signals:
+            self.recording_data.signals[name] = []
+            self.recording_data.columns[name] = self._recorded(name)
+        self.recording_data.signals[name].append((np.asarray(times),
+                                                  np.asarray(data)))
+
+class PopulationView(_PopulationBase):
+    """
+    Subset of the neurons of a population.
+    """
+
+    def __init__(self, parent, selector, label=None):
+        self._population = parent._population
+        self._index = parent._index[_as_indices(parent.size, selector)]
+        self.size = len(self._index)
+        self.parent = parent
+        self.label = label
+
+class FromListConnector(object):
+    """
+    Connector creating the connections given as list of (source index, target
+    index, weight, delay) tuples.
+    """
+
+    def __init__(self, conn_list, safe=True, column_names=None):
+        self.conn_list = conn_list
+
+    def connect(self, min_delay):
+        n = len(self.conn_list)
+        res = np.zeros((n, 4))
+        res[:, 2] = 0.0
+        res[:, 3] = min_delay
+        for k, conn in enumerate(self.conn_list):
+            res[k, 0:len(conn)] = conn[0:4]
+        return (res[:, 0].astype(np.int64), res[:, 1].astype(np.int64),
+                res[:, 2], res[:, 3])
+
+class Projection(object):
+    """
+    Set of synapses between two populations, stored as arrays of source and
+    target indices, weights and delays.
+    """
+
+    # Simulator instance the projection belongs to, set by "export"
+    _simulator = None
+
+    def __init__(self, presynaptic_population, postsynaptic_population,
+                 connector, synapse_type=None, source=None,
+                 receptor_type=None, target=None, label=None, rng=None,
+                 **kwargs):
+        self.pre = presynaptic_population
+        self.post = postsynaptic_population
+        self.receptor_type = receptor_type or target or "excitatory"
+        self.label = label
+        min_delay = self._simulator.min_delay
+        src, tar, weights, delays = connector.connect(min_delay)
+        if len(src) > 0 and ((src.min() < 0) or (src.max() >= self.pre.size)
+                or (tar.min() < 0) or (tar.max() >= self.post.size)):
+            raise exceptions.PyNNLessException("Connection index out of range")
+
+        # Keep the indices local to the (possibly viewed) populations, map them
+        # onto indices in the parent populations
+        self._src = src
+        self._tar = tar
+        self.sources = self.pre._index[src]
+        self.targets = self.post._index[tar]
+        self.weights = weights
+        self.delays = np.maximum(delays, min_delay)
+        self._simulator._add_projection(self)
+
+    def size(self, gather=True):
+        return len(self.weights)
+
+    def __len__(self):
+        return self.size()
+
+    def _values(self, value):
+        """
+        Converts a scalar, a per-connection list or an (n_pre, n_post) matrix
+        into an array with one value per connection. NaN entries in the matrix
+        are ignored.
+        """
+        value = np.asarray(value, dtype=np.float64)
+        if value.ndim == 2:
+            return value[self._src, self._tar]
+        return np.broadcast_to(value, self.weights.shape)
+
+    def set(self, weight=None, delay=None, **kwargs):
+        if weight is not None:
+            self.setWeights(weight)
+        if delay is not None:
+            self.setDelays(delay)
+
+    def setWeights(self, w):
+        self.weights = np.array(self.weights)
+        values = self._values(w)
+        valid = ~np.isnan(values)
+        self.weights[valid] = values[valid]
+
+    def setDelays(self, d):
+        self.delays = np.array(self.delays)
+        values = np.maximum(self._values(d), self._simulator.min_delay)
+        valid = ~np.isnan(values)
+        self.delays[valid] = values[valid]
+
+    def getWeights(self, format="list", gather=True):
+        return np.array(self.weights)
+
+    def getDelays(self, format="list", gather=True):
+        return np.array(self.delays)
+
+#
+# Simulator
+#
+
+class Simulator(object):
+    """
+    Base class of the built-in simulators. Keeps track of the populations,
+    projections and the simulation time. Subclasses implement "simulate",
+    which advances the network from t_start to t_stop and records the
+    requested signals using the "_append_spikes" and "_append_signal" methods
+    of the populations, and may override "configure" to receive additional
+    setup parameters.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.timestep = 0.1
+        self.min_delay = 0.1
+        self.max_delay = 10.0
+        self.t = 0.0
+        self.populations = []
+        self.projections = []
+
+    def _add_population(self, population):
+        self.populations.append(population)
+
+    def _add_projection(self, projection):
+        self.projections.append(projection)
+
+    def configure(self, **extra_params):
+        """
+        Receives the setup parameters not handled by "setup". Raises an
+        exception for unknown parameters.
+        """
+        if len(extra_params) > 0:
+            raise exceptions.PyNNLessException("Unsupported setup parameters: "
+                + str(sorted(extra_params.keys())))
+
+    @abc.abstractmethod
+    def simulate(self, t_start, t_stop):
+        """
+        Advances the network from t_start to t_stop (in milliseconds).
+        """
+        pass
+
+    def setup(self, timestep=0.1, min_delay=None, max_delay=10.0,
+              **extra_params):
+        self._clear()
+        self.timestep = float(timestep)
+        self.min_delay = float(timestep if min_delay is None else min_delay)
+        self.max_delay = float(max_delay)
+        self.configure(**extra_params)
+        return 0
+
+    def run(self, simtime):
+        t_stop = self.t + float(simtime)
+        self.simulate(self.t, t_stop)
+        self.t = t_stop
+        return self.t
+
+    def reset(self):
+        for population in self.populations:
+            population._new_segment()
+        self.t = 0.0
+
+    def end(self):
+        """
+        Discards the network, keeps the setup parameters.
+        """
+        self.populations = []
+        self.projections = []
+        self.t = 0.0
+
+    def get_time_step(self):
+        return self.timestep
+
+    def get_current_time(self):
+        return self.t
+
+    def get_min_delay(self):
+        return self.min_delay
+
+    def get_max_delay(self):
+        return self.max_delay
+
+    def layout(self):
+        """
+        Assigns a global index to each neuron, neurons come first, followed by
+        the spike sources. Returns the lists of (population, offset) tuples for
+        the neuron and the source populations, the number of neurons and
+        sources and a dictionary mapping from the id of each population onto
+        its global offset.
+        """
+        neurons = []
+        sources = []
+        n_neurons = 0
+        n_sources = 0
+        for population in self.populations:
+            if population.celltype is SpikeSourceArray:
+                sources.append((population, n_sources))
+                n_sources += population.size
+            else:
+                neurons.append((population, n_neurons))
+                n_neurons += population.size
+        offsets = {}
+        for population, offs in neurons:
+            offsets[id(population)] = offs
+        sources = [(population, n_neurons + offs)
+                   for population, offs in sources]
+        for population, offs in sources:
+            offsets[id(population)] = offs
+        return neurons, sources, n_neurons, n_sources, offsets
+
+    def sample_times(self, population, t_start, t_stop):
+        """
+        Returns the times at which analogue signals are sampled in the interval
+        [t_start, t_stop).
+        """
+        interval = population.sampling_interval or self.timestep
+        n = int(np.ceil((t_stop - t_start) / interval - 1e-9))
+        return t_start + np.arange(max(0, n)) * interval
+
+    def source_spikes(self, population, t_start, t_stop):
+        """
+        Returns the spike times of each neuron in a SpikeSourceArray population
+        within the interval [t_start, t_stop).
+        """
+        res = []
+        for times in population.parameters["spike_times"]:
+            times = np.sort(times)
+            res.append(times[(times >= t_start) & (times < t_stop)])
+        return res
+
+def export(namespace, simulator, cell_types=CELL_TYPES):
+    """
+    Populates the given module namespace (the "globals()" of the backend
+    module) with the PyNN interface bound to the given simulator instance.
+
+    :param cell_types: list of cell types supported by the simulator.
+    """
+    namespace["__pynn_version__"] = PYNN_VERSION
+    namespace["simulator"] = simulator
+    for name in ["setup", "run", "reset", "end", "get_time_step",
+                 "get_current_time", "get_min_delay", "get_max_delay"]:
+        namespace[name] = getattr(simulator, name)
+    for cls in [Population, Projection]:
+        namespace[cls.__name__] = type(cls.__name__, (cls,),
+                                       {"_simulator": simulator})
+    namespace["PopulationView"] = PopulationView
+    namespace["FromListConnector"] = FromListConnector
+    for celltype in cell_types:
+        namespace[celltype.__name__] = celltype
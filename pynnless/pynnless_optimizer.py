@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Optimization passes transforming a network description into an equivalent
+network which is cheaper to build on the backend, together with the functions
+mapping the results of the transformed network back to the original network.
+"""
+
+import json
+import numpy as np
+
+import pynnless_builder as builder
+import pynnless_constants as const
+
+def _merge_key(population):
+    """
+    Returns a key which is equal for all populations that can be merged: the
+    neuron type and the recording options apart from the neuron selection.
+    """
+    options = builder.Population.record_options(population["record"])
+    return (population["type"], json.dumps(dict(
+        (signal, dict((k, v) for k, v in opts.items() if k != "neurons"))
+        for signal, opts in options.items()), sort_keys=True))
+
+def _params_equal(p1, p2):
+    """
+    Compares two parameter dictionaries, which may contain spike time arrays.
+    """
+    if sorted(p1.keys()) != sorted(p2.keys()):
+        return False
+    for key in p1.keys():
+        if np.ndim(p1[key]) > 0 or np.ndim(p2[key]) > 0:
+            if not np.array_equal(p1[key], p2[key]):
+                return False
+        elif p1[key] != p2[key]:
+            return False
+    return True
+
+def _merge_params(members):
+    """
+    Concatenates the parameters of the given populations. A single shared
+    parameter set is kept if all populations share the same parameters.
+    """
+    params = [p["params"] for p in members]
+    if all((len(ps) == 1) and _params_equal(ps[0], params[0][0])
+           for ps in params):
+        return [params[0][0]]
+    res = []
+    for population in members:
+        if len(population["params"]) == 1:
+            res += [population["params"][0]] * population["count"]
+        else:
+            res += list(population["params"])
+    return res
+
+def _merge_record(members, offsets):
+    """
+    Merges the recording options of the given populations, the neuron
+    selections are combined into a single selection if not all neurons are
+    recorded.
+    """
+    res = {}
+    options = [builder.Population.record_options(p["record"]) for p in members]
+    for signal in options[0].keys():
+        res[signal] = dict((k, v) for k, v in options[0][signal].items()
+                           if k != "neurons")
+        neurons = []
+        for population, opts, offs in zip(members, options, offsets):
+            selection = builder.Population.record_neurons(opts[signal],
+                                                          population["count"])
+            if selection is None:
+                selection = xrange(population["count"])
+            neurons += [offs + i for i in selection]
+        if len(neurons) < sum(p["count"] for p in members):
+            res[signal]["neurons"] = neurons
+    return res
+
+def merge_populations(network):
+    """
+    Merges all populations of the same neuron type and compatible recording
+    options into a single population. Many small populations (e.g. one
+    population per spike source) otherwise result in one PyNN population per
+    neuron and one projection per population pair.
+
+    :param network: network description.
+    :return: a tuple containing the merged network and the mapping which has to
+    be passed to "split_results".
+    """
+    populations = [builder.Population(p) for p in network["populations"]]
+
+    # Group the populations, the merged population is placed at the position
+    # of the first member of each group
+    groups = []
+    group_index = {}
+    for i, population in enumerate(populations):
+        key = _merge_key(population)
+        if not key in group_index:
+            group_index[key] = len(groups)
+            groups.append([])
+        groups[group_index[key]].append(i)
+
+    merged = []
+    mapping = [None for _ in populations]
+    for m, group in enumerate(groups):
+        members = [populations[i] for i in group]
+        offsets = np.cumsum([0] + [p["count"] for p in members])[:-1]
+        for i, offs in zip(group, offsets):
+            mapping[i] = {"population": m, "offset": int(offs),
+                          "record": populations[i]["record"]}
+        if len(members) == 1:
+            merged.append(members[0])
+            continue
+        merged.append(builder.Population(
+            count=sum(p["count"] for p in members),
+            _type=members[0]["type"],
+            params=_merge_params(members),
+            record=_merge_record(members, offsets)))
+
+    # Translate the connections, connection matrices (see
+    # storage.connection_matrix) are translated vectorized
+    pop_map = np.array([mp["population"] for mp in mapping], dtype=np.int64)
+    offs_map = np.array([mp["offset"] for mp in mapping], dtype=np.int64)
+    connections = network["connections"]
+    if isinstance(connections, np.ndarray):
+        src = connections[:, 0].astype(np.int64)
+        tar = connections[:, 2].astype(np.int64)
+        connections = np.array(connections, dtype=np.float64)
+        connections[:, 0] = pop_map[src]
+        connections[:, 1] += offs_map[src]
+        connections[:, 2] = pop_map[tar]
+        connections[:, 3] += offs_map[tar]
+    else:
+        pop_map, offs_map = pop_map.tolist(), offs_map.tolist()
+        connections = [((pop_map[c[0][0]], offs_map[c[0][0]] + c[0][1]),
+                        (pop_map[c[1][0]], offs_map[c[1][0]] + c[1][1]))
+                       + tuple(c[2:]) for c in connections]
+
+    res = builder.Network()
+    res["populations"] = merged
+    res["connections"] = connections
+    return res, {"mapping": mapping,
+                 "record": [p["record"] for p in merged],
+                 "count": [p["count"] for p in populations],
+                 "merged_count": [p["count"] for p in merged]}
+
+def _rows(mapping, count, merged_options, merged_count, options):
+    """
+    Returns the rows of the data of the merged population belonging to the
+    neurons recorded in the original population.
+    """
+    merged = builder.Population.record_neurons(merged_options, merged_count)
+    selection = builder.Population.record_neurons(options, count)
+    if selection is None:
+        selection = range(count)
+    indices = mapping["offset"] + np.array(selection, dtype=np.int64)
+    if merged is None:
+        return indices
+    return np.searchsorted(merged, indices)
+
+def split_results(res, merge_info):
+    """
+    Maps the results of a network returned by "merge_populations" back to the
+    populations of the original network.
+
+    :param res: results of the merged network as returned by PyNNLess.run.
+    :param merge_info: mapping returned by "merge_populations".
+    """
+    split = []
+    for i, mapping in enumerate(merge_info["mapping"]):
+        m = mapping["population"]
+        source = res[m]
+        if merge_info["merged_count"][m] == merge_info["count"][i]:
+            split.append(source)
+            continue
+        options = builder.Population.record_options(mapping["record"])
+        merged_options = builder.Population.record_options(
+            merge_info["record"][m])
+        split.append({})
+        for signal in options.keys():
+            rows = _rows(mapping, merge_info["count"][i], merged_options[signal],
+                         merge_info["merged_count"][m], options[signal])
+            value = source[signal]
+            if isinstance(value, dict):
+                split[i][signal] = dict((key, np.asarray(v)[rows])
+                                        for key, v in value.items())
+            elif signal == const.SIG_SPIKES:
+                split[i][signal] = [value[j] for j in rows]
+            else:
+                split[i][signal] = np.asarray(value)[rows]
+            if signal + "_t" in source:
+                split[i][signal + "_t"] = source[signal + "_t"]
+    return split
+
+def _connection_columns(connections):
+    """
+    Returns the source population, target population and weight columns of the
+    given connection list or matrix as arrays.
+    """
+    if isinstance(connections, np.ndarray):
+        return (connections[:, 0].astype(np.int64),
+                connections[:, 2].astype(np.int64), connections[:, 4])
+    if len(connections) == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+    return (np.array([c[0][0] for c in connections], dtype=np.int64),
+            np.array([c[1][0] for c in connections], dtype=np.int64),
+            np.array([c[2] for c in connections], dtype=np.float64))
+
+def prune_network(network, threshold=0.0):
+    """
+    Removes all connections with an absolute weight smaller than or equal to
+    the given threshold and all populations which are not recorded and from
+    which no recorded population can be reached.
+
+    :param network: network description.
+    :param threshold: weight threshold, zero only removes zero weights. If
+    None, connections are only removed together with their populations.
+    :return: a tuple containing the pruned network and the mapping which has to
+    be passed to "unprune_results".
+    """
+    populations = network["populations"]
+    n = len(populations)
+    src, tar, weights = _connection_columns(network["connections"])
+    if threshold is None:
+        keep = np.ones(len(weights), dtype=bool)
+    else:
+        keep = np.abs(weights) > threshold
+
+    # Walk the connection graph backwards starting at the recorded populations
+    alive = np.array([len(builder.Population.canonicalize_record(
+        p.get("record", []))) > 0 for p in populations], dtype=bool)
+    edges = set(zip(src[keep].tolist(), tar[keep].tolist()))
+    changed = True
+    while changed:
+        changed = False
+        for s, t in edges:
+            if alive[t] and not alive[s]:
+                alive[s] = True
+                changed = True
+
+    # Remove connections from or to dead populations and reindex
+    keep &= alive[src] & alive[tar]
+    index = np.cumsum(alive) - 1
+    connections = network["connections"]
+    if isinstance(connections, np.ndarray):
+        connections = np.array(connections[keep], dtype=np.float64)
+        connections[:, 0] = index[connections[:, 0].astype(np.int64)]
+        connections[:, 2] = index[connections[:, 2].astype(np.int64)]
+    else:
+        index_list = index.tolist()
+        connections = [((index_list[c[0][0]], c[0][1]),
+                        (index_list[c[1][0]], c[1][1])) + tuple(c[2:])
+                       for c, k in zip(connections, keep.tolist()) if k]
+
+    res = builder.Network()
+    res["populations"] = [populations[i] for i in xrange(n) if alive[i]]
+    res["connections"] = connections
+    return res, {"alive": alive.tolist()}
+
+def unprune_results(res, prune_info):
+    """
+    Maps the results of a network returned by "prune_network" back to the
+    populations of the original network, removed populations are represented
+    by an empty dictionary.
+    """
+    it = iter(res)
+    return [next(it) if alive else {} for alive in prune_info["alive"]]
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Contains the Profiler class which is used to measure the time and the peak
+memory spent in the individual phases of a PyNNLess run.
+"""
+
+import atexit
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+# tracemalloc is only available in Python 3.4 or newer
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def read_rss_peak():
+    """
+    Returns the peak resident set size of the current process in bytes or None
+    if it cannot be determined. On Linux the value can be reset using
+    reset_rss_peak.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except:
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except:
+        return None
+
+def reset_rss_peak():
+    """
+    Resets the peak resident set size of the current process to the current
+    resident set size. Only supported on Linux 4.0 or newer, returns False if
+    the peak could not be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except:
+        return False
+
+def is_tracing_heap():
+    """
+    Returns True if Python heap allocations are traced using tracemalloc.
+    """
+    return (tracemalloc is not None) and tracemalloc.is_tracing()
+
+def start_tracing_heap():
+    """
+    Starts tracing Python heap allocations using tracemalloc. Returns False if
+    tracemalloc is not available.
+    """
+    if tracemalloc is None:
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return True
+
+def _max(a, b):
+    # Maximum of two values which may be None
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+def _read_heap_peak():
+    return tracemalloc.get_traced_memory()[1]
+
+def _reset_heap_peak():
+    # tracemalloc.reset_peak is only available in Python 3.9 or newer
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+class Profiler:
+    """
+    Records the wall clock time spent in nested phases as a tree. Each node of
+    the tree is a dictionary containing the name of the phase ("name"), the
+    time spent in the phase in seconds ("time") and the list of sub-phases
+    ("children"). Phases with the same name in the same parent are recorded as
+    individual nodes.
+
+    If memory tracking is active, nodes up to the given depth additionally
+    contain the peak resident set size ("rss_peak") and, if tracemalloc is
+    tracing, the peak size of the traced Python heap ("heap_peak") during the
+    phase in bytes. The peaks are measured by resetting the peak counters at
+    the beginning of each phase, on systems where the resident set size peak
+    cannot be reset "rss_peak" is the peak since the process started.
+
+    If tracing is enabled (see enable_tracing), each phase is additionally
+    recorded as an event in the trace file of the current process.
+    """
+
+    def __init__(self, name="run", callback=None, memory_depth=None):
+        """
+        Constructor of the Profiler class, starts the root phase.
+
+        :param name: name of the root phase.
+        :param callback: optional function which is called with the path of
+        the phase (a tuple of phase names starting with the root phase) and
+        the node of the phase whenever a phase ends.
+        :param memory_depth: maximum depth of the phases for which the peak
+        memory is recorded, where the root phase has depth zero. If None, no
+        memory information is recorded.
+        """
+        self.callback = callback
+        self.memory_depth = memory_depth
+        self.tracer = get_tracer()
+        self.root = self._node(name)
+        self._stack = []
+        self._push(self.root)
+
+    @staticmethod
+    def _node(name):
+        return {"name": name, "time": 0.0, "children": []}
+
+    def _path(self):
+        return tuple(entry[0]["name"] for entry in self._stack)
+
+    def _tracks_memory(self, depth):
+        return (self.memory_depth is not None) and (depth <= self.memory_depth)
+
+    def _push(self, node):
+        # Fold the memory peak reached so far into the parent phase and reset
+        # the peak counters
+        depth = len(self._stack)
+        rss, heap = None, None
+        if self._tracks_memory(depth):
+            rss = read_rss_peak()
+            if is_tracing_heap():
+                heap = _read_heap_peak()
+            if depth > 0:
+                parent = self._stack[-1]
+                parent[2] = _max(parent[2], rss)
+                parent[3] = _max(parent[3], heap)
+            reset_rss_peak()
+            if is_tracing_heap():
+                _reset_heap_peak()
+            rss, heap = read_rss_peak(), (
+                _read_heap_peak() if is_tracing_heap() else None)
+        self._stack.append([node, time.time(), rss, heap])
+
+    def begin(self, name):
+        """
+        Starts a new phase with the given name as a child of the current phase.
+        """
+        node = self._node(name)
+        self._stack[-1][0]["children"].append(node)
+        self._push(node)
+        return node
+
+    def end(self):
+        """
+        Ends the current phase, returns the corresponding node.
+        """
+        path = self._path()
+        node, t, rss, heap = self._stack.pop()
+        node["time"] = time.time() - t
+        if self._tracks_memory(len(path) - 1):
+            rss = _max(rss, read_rss_peak())
+            if is_tracing_heap():
+                heap = _max(heap, _read_heap_peak())
+            node["rss_peak"] = rss
+            node["heap_peak"] = heap
+            if len(self._stack) > 0:
+                parent = self._stack[-1]
+                parent[2] = _max(parent[2], rss)
+                parent[3] = _max(parent[3], heap)
+        if self.tracer is not None:
+            self.tracer.complete(node["name"], t, t + node["time"], "phase")
+        if self.callback is not None:
+            self.callback(path, node)
+        return node
+
+    def finish(self):
+        """
+        Ends all phases including the root phase, returns the root node.
+        """
+        while len(self._stack) > 0:
+            self.end()
+        if self.tracer is not None:
+            self.tracer.flush()
+        return self.root
+
+    def is_active(self):
+        """
+        Returns True if the root phase has not been finished yet.
+        """
+        return len(self._stack) > 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager measuring the time spent in the enclosed block as a
+        phase with the given name.
+        """
+        node = self.begin(name)
+        try:
+            yield node
+        finally:
+            self.end()
+
+@contextlib.contextmanager
+def null_phase():
+    """
+    Context manager used in place of Profiler.phase if no profiler is active.
+    """
+    yield None
+
+def find_phase(node, *path):
+    """
+    Returns the first node found by following the given phase names starting
+    at the given node, or None if no such node exists.
+    """
+    for name in path:
+        for child in node["children"]:
+            if child["name"] == name:
+                node = child
+                break
+        else:
+            return None
+    return node
+
+
+#
+# Event tracing in the Chrome trace event format
+#
+
+# Name of the environment variable containing the directory trace files are
+# written to. Since the variable is inherited, setting it enables tracing in
+# all processes started from the current process.
+TRACE_ENV = "PYNNLESS_TRACE"
+
+class Tracer:
+    """
+    Collects trace events of the current process and appends them to the file
+    "trace.<pid>.json" in the trace directory. The file uses the JSON array
+    variant of the Chrome trace event format (which does not require a closing
+    bracket) and can be loaded into chrome://tracing or Perfetto directly, use
+    merge_traces to combine the files written by multiple processes. Each
+    process is displayed as its own track.
+    """
+
+    # Number of buffered events after which the buffer is written to disk
+    BUFFER_SIZE = 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pid = os.getpid()
+        self.filename = os.path.join(directory,
+                "trace." + str(self.pid) + ".json")
+        self._events = []
+        self._lock = threading.Lock()
+        self._started = False
+        self.set_process_name("pynnless " + str(self.pid))
+
+    def set_process_name(self, name):
+        """
+        Sets the name of the track the events of this process are shown in.
+        """
+        self.add({"name": "process_name", "ph": "M", "pid": self.pid,
+                  "tid": self.pid, "args": {"name": name}})
+
+    def add(self, event):
+        """
+        Adds a raw trace event dictionary.
+        """
+        with self._lock:
+            self._events.append(event)
+            if len(self._events) >= self.BUFFER_SIZE:
+                self._flush()
+
+    def complete(self, name, t_start, t_end, cat="pynnless", args=None):
+        """
+        Adds a complete event ("X") with the given start and end time in
+        seconds since the epoch.
+        """
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self.pid,
+                 "tid": self.pid, "ts": int(t_start * 1e6),
+                 "dur": max(0, int((t_end - t_start) * 1e6))}
+        if args:
+            event["args"] = args
+        self.add(event)
+
+    @contextlib.contextmanager
+    def span(self, name, cat="pynnless", args=None):
+        """
+        Context manager recording the enclosed block as a complete event.
+        """
+        t = time.time()
+        try:
+            yield
+        finally:
+            self.complete(name, t, time.time(), cat, args)
+
+    def _flush(self):
+        if len(self._events) == 0:
+            return
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with open(self.filename, "a") as f:
+                if not self._started:
+                    f.write("[\n")
+                    self._started = True
+                for event in self._events:
+                    f.write(json.dumps(event) + ",\n")
+        except (IOError, OSError):
+            pass
+        self._events = []
+
+    def flush(self):
+        """
+        Writes all buffered events to the trace file.
+        """
+        with self._lock:
+            self._flush()
+
+# Tracer instance of the current process, recreated in forked processes
+_tracer = None
+
+def get_tracer():
+    """
+    Returns the Tracer instance of the current process or None if tracing is
+    not enabled.
+    """
+    global _tracer
+    directory = os.environ.get(TRACE_ENV, "")
+    if directory == "":
+        return None
+    if ((_tracer is None) or (_tracer.pid != os.getpid()) or
+            (_tracer.directory != directory)):
+        if _tracer is not None and _tracer.pid == os.getpid():
+            _tracer.flush()
+        _tracer = Tracer(directory)
+    return _tracer
+
+def enable_tracing(directory):
+    """
+    Enables tracing in the current process and all processes started from it,
+    trace files are written to the given directory.
+    """
+    os.environ[TRACE_ENV] = os.path.abspath(directory)
+    return get_tracer()
+
+def disable_tracing():
+    """
+    Flushes the tracer of the current process and disables tracing.
+    """
+    flush_tracing()
+    if TRACE_ENV in os.environ:
+        del os.environ[TRACE_ENV]
+
+def flush_tracing():
+    """
+    Writes the buffered events of the current process to disk. Must be called
+    before a process ends without running the atexit handlers.
+    """
+    if (_tracer is not None) and (_tracer.pid == os.getpid()):
+        _tracer.flush()
+
+atexit.register(flush_tracing)
+
+@contextlib.contextmanager
+def span(name, cat="pynnless", args=None):
+    """
+    Records the enclosed block as a complete event if tracing is enabled.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield
+    else:
+        with tracer.span(name, cat, args):
+            yield
+
+def merge_traces(directory, filename):
+    """
+    Combines the trace files written by all processes into the given directory
+    into a single Chrome trace file, returns the number of events.
+    """
+    events = []
+    for trace_file in sorted(glob.glob(os.path.join(directory,
+            "trace.*.json"))):
+        with open(trace_file, "r") as f:
+            for line in f:
+                line = line.strip().rstrip(",")
+                if line.startswith("{"):
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        pass # Ignore partially written events
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
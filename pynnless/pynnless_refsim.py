@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reference simulator backend implemented in pure NumPy. Simulates IF_cond_exp and
+EIF_cond_exp_isfa_ista (AdEx) neurons, spike source arrays and delayed
+conductance based synapses with a clock-driven, vectorized exponential Euler
+scheme. The state of all neurons is kept in flat arrays and each timestep is
+processed with a few array operations, making this backend considerably faster
+than NEST for small to medium networks, where NEST is dominated by its import
+and setup cost. Use it by passing "refsim" as simulator name to PyNNLess.
+
+As in NEST, negative weights on excitatory projections act on the inhibitory
+conductance.
+"""
+
+import numpy as np
+
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+import pynnless_native as native
+
+# Upper bound of the exponent in the AdEx exponential term, prevents overflows
+# once the membrane potential diverges during a spike
+MAX_EXPONENT = 20.0
+
+def _ranges(starts, stops):
+    """
+    Returns the concatenation of the ranges [starts[i], stops[i]).
+    """
+    counts = stops - starts
+    total = counts.sum()
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.cumsum(counts)
+    return (np.repeat(starts - ends + counts, counts) +
+            np.arange(total, dtype=np.int64))
+
+class ReferenceSimulator(native.Simulator):
+    """
+    Clock-driven simulator for conductance based integrate-and-fire neurons.
+    The dynamic state (membrane potentials, adaptation currents, conductances,
+    refractory counters and the ring buffer of delayed synaptic events) is
+    kept between calls to "run" and discarded by "reset".
+    """
+
+    def _clear(self):
+        native.Simulator._clear(self)
+        self.state = None
+
+    def _add_population(self, population):
+        native.Simulator._add_population(self, population)
+        self.state = None
+
+    def reset(self):
+        native.Simulator.reset(self)
+        self.state = None
+
+    def end(self):
+        native.Simulator.end(self)
+        self.state = None
+
+    def _parameters(self, neurons, n_neurons):
+        """
+        Concatenates the neuron parameters into flat arrays, IF_cond_exp
+        neurons are treated as AdEx neurons without exponential term and
+        adaptation.
+        """
+        def concat(key, default=None):
+            res = np.empty(n_neurons)
+            for population, offs in neurons:
+                values = population.parameters.get(key)
+                if values is None:
+                    values = population.parameters[default]
+                res[offs:offs + population.size] = values
+            return res
+
+        p = {}
+        for key in ["cm", "tau_m", "v_rest", "v_reset", "v_thresh",
+                    "tau_refrac", "tau_syn_E", "tau_syn_I", "e_rev_E",
+                    "e_rev_I", "i_offset"]:
+            p[key] = concat(key)
+        p["v_spike"] = concat("v_spike", "v_thresh")
+        is_adex = np.zeros(n_neurons, dtype=bool)
+        for population, offs in neurons:
+            is_adex[offs:offs + population.size] = (population.celltype is
+                native.EIF_cond_exp_isfa_ista)
+        p["is_adex"] = is_adex
+        for key in ["a", "b", "delta_T", "tau_w"]:
+            values = np.zeros(n_neurons)
+            if is_adex.any():
+                for population, offs in neurons:
+                    if key in population.parameters:
+                        values[offs:offs + population.size] = \
+                            population.parameters[key]
+            p[key] = values
+        p["tau_w"][~is_adex] = 1.0
+        p["g_leak"] = p["cm"] / p["tau_m"]
+        return p
+
+    def _synapses(self, n_neurons, offsets):
+        """
+        Concatenates all projections into flat arrays sorted by the global
+        index of the presynaptic neuron.
+        """
+        pre, tar, channel, weight, delay = [], [], [], [], []
+        for projection in self.projections:
+            if projection.post._population.celltype is native.SpikeSourceArray:
+                raise exceptions.PyNNLessException("Spike sources cannot be " +
+                                                   "the target of a projection")
+            inhibitory = projection.receptor_type == "inhibitory"
+            weights = np.asarray(projection.weights, dtype=np.float64)
+            pre.append(projection.sources + offsets[id(projection.pre._population)])
+            tar.append(projection.targets + offsets[id(projection.post._population)])
+            channel.append(((weights < 0) | inhibitory).astype(np.int64))
+            weight.append(np.abs(weights))
+            delay.append(np.maximum(1, np.round(np.asarray(projection.delays)
+                / self.timestep)).astype(np.int64))
+        if len(pre) == 0:
+            pre, tar, channel, delay = [np.zeros(0, dtype=np.int64)] * 4
+            weight = np.zeros(0)
+        else:
+            pre, tar, channel, weight, delay = map(np.concatenate,
+                [pre, tar, channel, weight, delay])
+        order = np.argsort(pre, kind="mergesort")
+        return {
+            "pre": pre[order],
+            "target": (channel * n_neurons + tar)[order],
+            "weight": weight[order],
+            "delay": delay[order],
+            "max_delay": int(delay.max()) if len(delay) > 0 else 1
+        }
+
+    def _initial_state(self, neurons, n_neurons, n_slots):
+        v = np.empty(n_neurons)
+        w = np.zeros(n_neurons)
+        for population, offs in neurons:
+            v[offs:offs + population.size] = population.initial_values["v"]
+            if "w" in population.initial_values:
+                w[offs:offs + population.size] = population.initial_values["w"]
+        return {
+            "v": v,
+            "w": w,
+            "ge": np.zeros(n_neurons),
+            "gi": np.zeros(n_neurons),
+            "refrac": np.zeros(n_neurons, dtype=np.int64),
+            "buffer": np.zeros((n_slots, 2 * n_neurons))
+        }
+
+    def _resize_buffer(self, buf, n_slots, k):
+        """
+        Resizes the ring buffer to the given number of slots, keeps the events
+        scheduled for the steps following step k.
+        """
+        old_slots = buf.shape[0]
+        if old_slots == n_slots:
+            return buf
+        res = np.zeros((n_slots, buf.shape[1]))
+        for j in xrange(k, k + old_slots):
+            res[j % n_slots] = buf[j % old_slots]
+        return res
+
+    def _source_events(self, sources, k0, k1):
+        """
+        Returns the steps at which the spike sources emit spikes within
+        [k0, k1) and the global indices of the corresponding sources, sorted by
+        step.
+        """
+        steps, ids = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for population, offs in sources:
+            for i, times in enumerate(population.parameters["spike_times"]):
+                s = np.round(np.asarray(times) / self.timestep).astype(np.int64)
+                s = s[(s >= k0) & (s < k1)]
+                steps.append(s)
+                ids.append(np.repeat(offs + i, len(s)))
+        steps, ids = np.concatenate(steps), np.concatenate(ids)
+        order = np.argsort(steps, kind="mergesort")
+        return steps[order], ids[order]
+
+    def simulate(self, t_start, t_stop):
+        dt = self.timestep
+        k0 = int(round(t_start / dt))
+        k1 = int(round(t_stop / dt))
+        n_steps = k1 - k0
+
+        neurons, sources, n_neurons, n_sources, offsets = self.layout()
+        p = self._parameters(neurons, n_neurons)
+        syn = self._synapses(n_neurons, offsets)
+        syn_offs = np.searchsorted(syn["pre"],
+                                   np.arange(n_neurons + n_sources + 1))
+        n_slots = syn["max_delay"] + 2
+        if self.state is None:
+            self.state = self._initial_state(neurons, n_neurons, n_slots)
+        state = self.state
+        state["buffer"] = self._resize_buffer(state["buffer"], n_slots, k0)
+        v, w, ge, gi = state["v"], state["w"], state["ge"], state["gi"]
+        refrac, buf = state["refrac"], state["buffer"]
+        buf_flat = buf.reshape(-1)
+        n_targets = buf.shape[1]
+
+        # Constants of the exponential Euler integration
+        decay_e = np.exp(-dt / p["tau_syn_E"])
+        decay_i = np.exp(-dt / p["tau_syn_I"])
+        decay_w = np.exp(-dt / p["tau_w"])
+        refrac_steps = np.round(p["tau_refrac"] / dt).astype(np.int64)
+        g_leak, cm, v_rest = p["g_leak"], p["cm"], p["v_rest"]
+        a = p["a"] * 1e-3 # nS to uS
+        adex = np.nonzero(p["is_adex"] & (p["delta_T"] > 0))[0]
+        has_adaptation = p["is_adex"].any()
+
+        # Indices of the neurons whose signals are recorded
+        recorded = {}
+        for signal in [const.SIG_V, const.SIG_GE, const.SIG_GI]:
+            idx = [offs + population._recorded(signal)
+                   for population, offs in neurons
+                   if signal in population.recording]
+            idx = np.concatenate(idx) if len(idx) > 0 else np.zeros(0)
+            if len(idx) > 0:
+                recorded[signal] = (idx.astype(np.int64),
+                                    np.empty((n_steps, len(idx))))
+        values = {const.SIG_V: v, const.SIG_GE: ge, const.SIG_GI: gi}
+
+        def deliver(ids, t):
+            idx = _ranges(syn_offs[ids], syn_offs[ids + 1])
+            if len(idx) > 0:
+                slots = (t + syn["delay"][idx]) % n_slots
+                np.add.at(buf_flat, slots * n_targets + syn["target"][idx],
+                          syn["weight"][idx])
+
+        src_steps, src_ids = self._source_events(sources, k0, k1)
+        src_bounds = np.searchsorted(src_steps, np.arange(k0, k1 + 1))
+        spike_steps, spike_ids = [], []
+        for k in xrange(k0, k1):
+            # Record the state at the beginning of the step
+            for signal, (idx, data) in recorded.items():
+                data[k - k0] = values[signal][idx]
+
+            # Schedule the spikes emitted by the sources in this step
+            i0, i1 = src_bounds[k - k0], src_bounds[k - k0 + 1]
+            if i1 > i0:
+                deliver(src_ids[i0:i1], k)
+
+            # Apply the synaptic events arriving in this step
+            slot = buf[k % n_slots]
+            ge += slot[:n_neurons]
+            gi += slot[n_neurons:]
+            slot.fill(0.0)
+
+            # Integrate the membrane potential, treating the exponential term,
+            # the adaptation current and the conductances as constant
+            g_tot = g_leak + ge + gi
+            i_inf = (g_leak * v_rest + ge * p["e_rev_E"] + gi * p["e_rev_I"]
+                     + p["i_offset"] - w)
+            if len(adex) > 0:
+                dT = p["delta_T"][adex]
+                i_inf[adex] += g_leak[adex] * dT * np.exp(np.minimum(
+                    (v[adex] - p["v_thresh"][adex]) / dT, MAX_EXPONENT))
+            v_inf = i_inf / g_tot
+            v_new = v_inf + (v - v_inf) * np.exp(-dt * g_tot / cm)
+            active = refrac == 0
+            v[active] = v_new[active]
+            refrac[~active] -= 1
+
+            # Update the adaptation current and the conductances
+            if has_adaptation:
+                w_inf = a * (v - v_rest)
+                w[:] = w_inf + (w - w_inf) * decay_w
+            ge *= decay_e
+            gi *= decay_i
+
+            # Detect and deliver the output spikes
+            spiking = np.nonzero(active & (v >= p["v_spike"]))[0]
+            if len(spiking) > 0:
+                v[spiking] = p["v_reset"][spiking]
+                w[spiking] += p["b"][spiking]
+                refrac[spiking] = refrac_steps[spiking]
+                deliver(spiking, k + 1)
+                spike_steps.append(np.repeat(k + 1, len(spiking)))
+                spike_ids.append(spiking)
+
+        self._store_results(neurons, sources, recorded, spike_steps, spike_ids,
+                            t_start, t_stop, k0)
+
+    def _store_results(self, neurons, sources, recorded, spike_steps,
+                       spike_ids, t_start, t_stop, k0):
+        """
+        Splits the recorded data into the individual populations.
+        """
+        dt = self.timestep
+        if len(spike_ids) > 0:
+            spike_steps = np.concatenate(spike_steps)
+            spike_ids = np.concatenate(spike_ids)
+        else:
+            spike_steps = np.zeros(0, dtype=np.int64)
+            spike_ids = np.zeros(0, dtype=np.int64)
+        order = np.lexsort((spike_steps, spike_ids))
+        spike_times = np.round(spike_steps[order] * dt, 9)
+        spike_ids = spike_ids[order]
+
+        for population, offs in sources:
+            index = population._recorded(const.SIG_SPIKES)
+            if len(index) > 0:
+                trains = self.source_spikes(population, t_start, t_stop)
+                population._append_spikes(index, [trains[i] for i in index])
+
+        for population, offs in neurons:
+            index = population._recorded(const.SIG_SPIKES)
+            if len(index) > 0:
+                bounds = np.searchsorted(spike_ids, offs + np.arange(
+                    population.size + 1))
+                population._append_spikes(index,
+                    [spike_times[bounds[i]:bounds[i + 1]] for i in index])
+            for signal, (idx, data) in recorded.items():
+                cols = np.nonzero((idx >= offs) &
+                                  (idx < offs + population.size))[0]
+                if len(cols) == 0:
+                    continue
+                times = self.sample_times(population, t_start, t_stop)
+                rows = np.round(times / dt).astype(np.int64) - k0
+                population._append_signal(signal, times, data[rows][:, cols])
+
+native.export(globals(), ReferenceSimulator())
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Contains the LazyResult class returned by PyNNLess.run in lazy mode. Recorded
+signals are only fetched from the simulator and converted once they are
+accessed. Additionally contains the functions computing the reductions which
+can be requested in the recording options and merging the results of a
+segmented run.
+"""
+
+import collections
+import numpy as np
+import warnings
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+
+STALE_ERROR = ("Lazy result is stale: the session it was created in has been "
+               + "closed or run again. Access the results before the next "
+               + "call to \"run\" or \"close\".")
+
+def result_keys(record):
+    """
+    Returns the keys of the result dictionary of a population with the given
+    "record" entry.
+    """
+    res = []
+    options = builder.Population.record_options(record)
+    for signal in sorted(options.keys()):
+        res.append(signal)
+        if (signal != const.SIG_SPIKES) and (not options[signal].get("reduce")):
+            res.append(signal + "_t")
+    return res
+
+def reduce_spikes(spikes, reductions, t_start, t_stop):
+    """
+    Computes the given reductions of a list of spike trains.
+
+    :param spikes: list containing the spike times of each neuron.
+    :param reductions: list of reductions in const.SPIKE_REDUCTIONS.
+    :param t_start: begin of the interval the spikes were recorded in.
+    :param t_stop: end of the interval the spikes were recorded in, used to
+    calculate the rate.
+    :return: a dictionary containing an array with a value per neuron for each
+    reduction. Rates are given in Hz, "first" and "last" are NaN for neurons
+    which did not spike.
+    """
+    counts = np.array([len(train) for train in spikes], dtype=np.int64)
+    res = {}
+    for reduction in reductions:
+        if reduction == "count":
+            res[reduction] = counts
+        elif reduction == "rate":
+            duration = t_stop - t_start
+            res[reduction] = (counts * 1000.0 / duration if duration > 0
+                              else np.zeros(len(counts)))
+        elif reduction in ["first", "last"]:
+            idx = 0 if reduction == "first" else -1
+            res[reduction] = np.array([train[idx] if len(train) > 0
+                                       else np.nan for train in spikes],
+                                      dtype=np.float64)
+    return res
+
+def reduce_signal(data, reductions):
+    """
+    Computes the given reductions of an analog signal over time. Samples which
+    are NaN (not recorded) are ignored.
+
+    :param data: data matrix containing one row per neuron.
+    :param reductions: list of reductions in const.SIGNAL_REDUCTIONS.
+    :return: a dictionary containing an array with a value per neuron for each
+    reduction.
+    """
+    functions = {"mean": np.nanmean, "var": np.nanvar, "std": np.nanstd,
+                 "min": np.nanmin, "max": np.nanmax}
+    data = np.asarray(data, dtype=np.float64)
+    res = {}
+    with warnings.catch_warnings():
+        # All-NaN rows and empty signals result in NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for reduction in reductions:
+            if data.shape[1] == 0:
+                res[reduction] = np.empty(data.shape[0])
+                res[reduction].fill(np.nan)
+            else:
+                res[reduction] = functions[reduction](data, axis=1)
+    return res
+
+def _merge_spike_reductions(values, durations):
+    res = {}
+    for reduction in values[0].keys():
+        arrays = [np.asarray(value[reduction]) for value in values]
+        if reduction == "count":
+            res[reduction] = np.sum(arrays, axis=0)
+        elif reduction == "rate":
+            res[reduction] = (np.sum([a * d for a, d in zip(arrays, durations)],
+                                     axis=0) / max(sum(durations), 1e-9))
+        elif reduction == "first":
+            res[reduction] = np.fmin.reduce(arrays)
+        elif reduction == "last":
+            res[reduction] = np.fmax.reduce(arrays)
+    return res
+
+def _merge_signal_reductions(values, weights):
+    """
+    Merges the reductions of an analog signal. The mean and the variance of
+    the segments are pooled, each segment is weighted by its number of samples
+    (given by "weights" up to a constant factor). Requires the "mean" of the
+    segments if "var" or "std" are given, see "add_mean_reductions".
+    """
+    res = {}
+    arrays = dict((reduction, np.array([value[reduction] for value in values],
+                                       dtype=np.float64))
+                  for reduction in values[0].keys())
+    if "min" in arrays:
+        res["min"] = np.fmin.reduce(arrays["min"])
+    if "max" in arrays:
+        res["max"] = np.fmax.reduce(arrays["max"])
+    if not "mean" in arrays:
+        if ("var" in arrays) or ("std" in arrays):
+            raise exceptions.PyNNLessException("Merging the variance of " +
+                "segments requires the \"mean\" reduction")
+        return res
+
+    # Segments without samples (NaN) do not contribute to the pooled values
+    means = arrays["mean"]
+    w = np.where(np.isnan(means), 0.0, np.asarray(weights, dtype=np.float64
+                                                  ).reshape(-1, 1))
+    means = np.where(w > 0, means, 0.0)
+    w_total = np.sum(w, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.sum(w * means, axis=0) / w_total
+        res["mean"] = mean
+        if ("var" in arrays) or ("std" in arrays):
+            var = arrays["var"] if "var" in arrays else arrays["std"] ** 2
+            var = np.where(w > 0, var, 0.0)
+            var = np.maximum(np.sum(w * (var + means ** 2), axis=0) / w_total
+                             - mean ** 2, 0.0)
+            if "var" in arrays:
+                res["var"] = var
+            if "std" in arrays:
+                res["std"] = np.sqrt(var)
+    return res
+
+def _window_weights(segments, options):
+    """
+    Returns the length of the part of each segment covered by the "window"
+    given in the recording options.
+    """
+    window = options.get("window", [-np.inf, np.inf])
+    return [max(0.0, min(t_stop, window[1]) - max(t_start, window[0]))
+            for t_start, t_stop, _ in segments]
+
+def _needs_mean(reductions):
+    return (not "mean" in reductions) and (("var" in reductions) or
+                                           ("std" in reductions))
+
+def add_mean_reductions(network):
+    """
+    Adds the "mean" reduction to all signals for which the "var" or "std"
+    reduction but not the "mean" is requested, as required by merge_segments.
+    Returns a copy of the network and the list of (population index, signal)
+    tuples for which the mean was added.
+    """
+    added = []
+    populations = []
+    for i, population in enumerate(network["populations"]):
+        options = builder.Population.record_options(population.get("record",
+                                                                   []))
+        signals = [signal for signal, signal_options in options.items()
+                   if (signal != const.SIG_SPIKES) and
+                      _needs_mean(signal_options.get("reduce") or [])]
+        if len(signals) > 0:
+            population = dict(population)
+            population["record"] = dict((signal, dict(signal_options))
+                for signal, signal_options in options.items())
+            for signal in sorted(signals):
+                population["record"][signal]["reduce"] = (
+                    list(options[signal]["reduce"]) + ["mean"])
+                added.append((i, signal))
+        populations.append(population)
+    network = dict(network)
+    network["populations"] = populations
+    return network, added
+
+def remove_mean_reductions(res, added):
+    """
+    Removes the "mean" reductions added by "add_mean_reductions" from the
+    given results.
+    """
+    for pid, signal in added:
+        del res[pid][signal]["mean"]
+    return res
+
+def merge_segments(segments, network=None):
+    """
+    Merges the results of consecutive segments into a single result structure
+    as returned by PyNNLess.run.
+
+    :param segments: list of (t_start, t_stop, res) tuples as yielded by
+    PyNNLess.run_segments.
+    :param network: network description the segments were recorded from. Used
+    to weight the reduced signals and spike rates of each segment by the part
+    of the segment covered by the recording window. If None, the segments are weighted by
+    their duration.
+    """
+    if len(segments) == 0:
+        return []
+    results = [res for _, _, res in segments]
+    merged = []
+    for i in xrange(len(results[0])):
+        pops = [res[i] for res in results]
+        options = {}
+        if network is not None:
+            options = builder.Population.record_options(
+                network["populations"][i].get("record", []))
+        merged.append({})
+        for key in pops[0].keys():
+            values = [pop[key] for pop in pops]
+            if isinstance(values[0], dict):
+                if key == const.SIG_SPIKES:
+                    merged[i][key] = _merge_spike_reductions(values,
+                        _window_weights(segments, options.get(key, {})))
+                else:
+                    merged[i][key] = _merge_signal_reductions(values,
+                        _window_weights(segments, options.get(key, {})))
+            elif key == const.SIG_SPIKES:
+                merged[i][key] = [sum([list(value[j]) for value in values], [])
+                                  for j in xrange(len(values[0]))]
+            elif key.endswith("_t"):
+                merged[i][key] = np.concatenate(values)
+            else:
+                merged[i][key] = np.concatenate(values, axis=1)
+    return merged
+
+class LazyResult(collections.Mapping):
+    """
+    Result dictionary of a single population. Has the same keys as the
+    dictionary returned by PyNNLess.run, the data of each signal is fetched on
+    first access of one of its keys and cached afterwards. Data that has not
+    been fetched yet can only be accessed as long as the session the result was
+    created in is still open and has not been run again.
+    """
+
+    def __init__(self, fetch, is_valid, record):
+        """
+        Constructor of the LazyResult class.
+
+        :param fetch: function taking a signal name and returning a dictionary
+        containing the result entries of that signal.
+        :param is_valid: function returning False once the data can no longer
+        be fetched.
+        :param record: list of recorded signals.
+        """
+        self._fetch = fetch
+        self._is_valid = is_valid
+        self._signals = {}
+        for signal in result_keys(record):
+            self._signals[signal] = signal[:-2] if signal.endswith("_t") \
+                else signal
+        self._cache = {}
+
+    def is_valid(self):
+        """
+        Returns True if data that has not been accessed yet can still be
+        fetched.
+        """
+        return self._is_valid()
+
+    def is_fetched(self, key):
+        """
+        Returns True if the data for the given key has already been fetched.
+        """
+        return key in self._cache
+
+    def __getitem__(self, key):
+        if not key in self._cache:
+            signal = self._signals[key]
+            if not self._is_valid():
+                raise exceptions.PyNNLessException(STALE_ERROR)
+            self._cache.update(self._fetch(signal))
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self._signals)
+
+    def __len__(self):
+        return len(self._signals)
+
+    def __repr__(self):
+        return ("LazyResult(" + repr(sorted(self._signals.keys())) +
+                ", fetched=" + repr(sorted(self._cache.keys())) + ")")
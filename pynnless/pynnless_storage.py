@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Binary storage format for networks. Networks are stored as uncompressed NPZ
+files containing the following arrays:
+
+    "format_version": single entry containing FORMAT_VERSION.
+    "population_count": number of neurons in each population.
+    "population_type": index of the neuron type of each population in
+        const.TYPES.
+    "population_record": boolean matrix indicating for each population which
+        of the signals in const.SIGNALS are recorded.
+    "population_record_options": optional JSON encoded list containing the
+        recording options (see builder.Population.record_options) of each
+        population.
+    "params_offset": offsets of the parameter rows of each population, a
+        population either has one (shared) row or one row per neuron.
+    "params_keys": names of the parameters stored in the "params" matrix.
+    "params": parameter matrix with one column per key, NaN marks parameters
+        not given for a row.
+    "spike_times": spike times of all parameter rows of spike source
+        populations, concatenated.
+    "spike_times_offset": offsets of the spike times of each parameter row.
+    "connections": matrix with one row per connection, containing the source
+        population and neuron index, the target population and neuron index,
+        the weight and the delay.
+
+Since the members are stored uncompressed, "load_network" memory-maps the
+large arrays instead of reading them, the spike times of each parameter row and
+the connection matrix are passed to PyNNLess as NumPy arrays without ever
+being converted into Python lists.
+
+Additionally contains the ResultWriter class used by PyNNLess.run to write the
+recorded data to an NPZ file instead of keeping it in memory.
+"""
+
+import json
+import numpy as np
+import os
+import tempfile
+import zipfile
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+
+# Version of the file format written by "save_network"
+FORMAT_VERSION = 1
+
+# Column indices of the connection matrix
+CONNECTION_COLUMNS = ["pid_src", "nid_src", "pid_tar", "nid_tar", "weight",
+                      "delay"]
+
+def connection_matrix(connections):
+    """
+    Converts a list of ((pid_src, nid_src), (pid_tar, nid_tar), weight, delay)
+    tuples into a connection matrix with the columns listed in
+    CONNECTION_COLUMNS. Matrices are returned unchanged.
+    """
+    if isinstance(connections, np.ndarray):
+        return connections
+    res = np.zeros((len(connections), len(CONNECTION_COLUMNS)))
+    for i, (src, tar, weight, delay) in enumerate(connections):
+        res[i] = (src[0], src[1], tar[0], tar[1], weight, delay)
+    return res
+
+def save_network(network, filename):
+    """
+    Writes the given network to an uncompressed NPZ file.
+
+    :param network: network descriptor, the connections may either be given as
+    list or as connection matrix.
+    :param filename: name of the target file.
+    """
+    populations = [builder.Population(p) for p in network["populations"]]
+    n = len(populations)
+
+    # Assemble the parameter table, one row per parameter set
+    rows = []
+    params_offset = np.zeros(n + 1, dtype=np.int64)
+    for i, population in enumerate(populations):
+        rows.extend(population["params"])
+        params_offset[i + 1] = len(rows)
+    keys = sorted(set(key for row in rows for key in row.keys()
+                      if key != "spike_times"))
+    params = np.empty((len(rows), len(keys)))
+    params.fill(np.nan)
+    spike_times = []
+    spike_times_offset = np.zeros(len(rows) + 1, dtype=np.int64)
+    for i, row in enumerate(rows):
+        for j, key in enumerate(keys):
+            if key in row:
+                params[i, j] = row[key]
+        times = np.asarray(row.get("spike_times", []), dtype=np.float64)
+        spike_times.append(times.flatten())
+        spike_times_offset[i + 1] = spike_times_offset[i] + times.size
+
+    # Recording options can be arbitrary dictionaries, store them as JSON
+    extra = {}
+    if any(isinstance(p["record"], dict) for p in populations):
+        extra["population_record_options"] = np.array(json.dumps(
+            [builder.Population.record_options(p["record"])
+             for p in populations]))
+
+    np.savez(filename,
+        format_version=np.array([FORMAT_VERSION]),
+        population_count=np.array([p["count"] for p in populations],
+                                  dtype=np.int64),
+        population_type=np.array([const.TYPES.index(p["type"])
+                                  for p in populations], dtype=np.int64),
+        population_record=np.array([[s in p["record"] for s in const.SIGNALS]
+                                    for p in populations],
+                                   dtype=bool).reshape(n, len(const.SIGNALS)),
+        params_offset=params_offset,
+        params_keys=np.array(keys, dtype=str),
+        params=params,
+        spike_times=np.concatenate([np.zeros(0)] + spike_times),
+        spike_times_offset=spike_times_offset,
+        connections=connection_matrix(network["connections"]),
+        **extra)
+
+def _load_member(filename, archive, f, info, mmap=True):
+    """
+    Reads the array stored in the given member of an NPZ file, the member is
+    memory-mapped if it is uncompressed and "mmap" is True.
+
+    :param archive: ZipFile instance of the NPZ file.
+    :param f: file object of the NPZ file opened in binary mode.
+    :param info: ZipInfo instance of the member.
+    """
+    if (not mmap) or info.compress_type != zipfile.ZIP_STORED:
+        return np.load(archive.open(info))
+
+    # Skip the local file header, its size is stored in the header itself and
+    # may differ from the one in the central directory
+    f.seek(info.header_offset + 26)
+    name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+    f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.hasobject or np.prod(shape) == 0:
+        return np.load(archive.open(info))
+    return np.memmap(filename, dtype=dtype, mode="r", offset=f.tell(),
+                     shape=shape, order="F" if fortran else "C")
+
+def _load_members(filename, mmap=True, names=None):
+    """
+    Returns a dictionary containing the arrays stored in the given NPZ file.
+    Uncompressed members are memory-mapped if "mmap" is True.
+
+    :param names: list of member names (without ".npy") to load, if None, all
+    members are loaded.
+    """
+    res = {}
+    with zipfile.ZipFile(filename, "r") as archive, open(filename, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") \
+                else info.filename
+            if (names is None) or (name in names):
+                res[name] = _load_member(filename, archive, f, info, mmap)
+    return res
+
+def load_network(filename, mmap=True):
+    """
+    Loads a network from the given file. Files with the extension ".npz" are
+    read as binary network files, all other files as JSON.
+
+    :param filename: name of the file to load.
+    :param mmap: if True, the connection matrix and the spike times are
+    memory-mapped instead of being read into memory.
+    :return: a Network instance, the connections are given as connection matrix
+    for binary files.
+    """
+    if not filename.endswith(".npz"):
+        with open(filename, "r") as f:
+            return builder.Network(json.load(f))
+
+    data = _load_members(filename, mmap)
+    if int(data["format_version"][0]) != FORMAT_VERSION:
+        raise exceptions.PyNNLessException("Unsupported network file " +
+            "version " + str(data["format_version"][0]))
+    keys = [str(key) for key in data["params_keys"]]
+    params = np.asarray(data["params"])
+    spike_times = data["spike_times"]
+    spike_times_offset = np.asarray(data["spike_times_offset"])
+    params_offset = np.asarray(data["params_offset"])
+    record_options = None
+    if "population_record_options" in data:
+        record_options = json.loads(str(data["population_record_options"]))
+
+    populations = []
+    for i in xrange(len(data["population_count"])):
+        _type = const.TYPES[int(data["population_type"][i])]
+        rows = []
+        for j in xrange(params_offset[i], params_offset[i + 1]):
+            row = dict((key, float(params[j, k]))
+                       for k, key in enumerate(keys)
+                       if not np.isnan(params[j, k]))
+            if _type == const.TYPE_SOURCE:
+                row["spike_times"] = spike_times[
+                    spike_times_offset[j]:spike_times_offset[j + 1]]
+            rows.append(row)
+        population = builder.Population(
+            count=int(data["population_count"][i]), _type=_type,
+            record=[s for j, s in enumerate(const.SIGNALS)
+                    if data["population_record"][i, j]]
+                if record_options is None else record_options[i])
+        population["params"] = rows
+        populations.append(population)
+
+    # Avoid the Network constructor, which copies its arguments
+    res = builder.Network()
+    res["populations"] = populations
+    res["connections"] = data["connections"]
+    return res
+
+def json_to_binary(json_filename, npz_filename):
+    """
+    Converts the network stored in the given JSON file into a binary network
+    file.
+    """
+    save_network(load_network(json_filename), npz_filename)
+
+#
+# Result storage
+#
+
+class StoredArray(object):
+    """
+    Handle of an array stored in a result file written by ResultWriter. The
+    array is memory-mapped on first access. Handles can be pickled, e.g. to send
+    them from PyNNLessIsolated worker processes, the mapped data is not part of
+    the pickled state.
+    """
+
+    def __init__(self, filename, member):
+        self.filename = filename
+        self.member = member
+        self._data = None
+
+    def __getstate__(self):
+        return {"filename": self.filename, "member": self.member}
+
+    def __setstate__(self, state):
+        self.__init__(state["filename"], state["member"])
+
+    def load(self):
+        """
+        Returns the (memory-mapped) array.
+        """
+        if self._data is None:
+            self._data = _load_members(self.filename,
+                                       names=[self.member])[self.member]
+        return self._data
+
+    @property
+    def shape(self):
+        return self.load().shape
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.load(), dtype=dtype)
+
+    def __len__(self):
+        return len(self.load())
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+class StoredSpikeTrains(object):
+    """
+    Handle of the spike trains of a population stored in a result file written
+    by ResultWriter. Behaves like the list of spike time lists returned by
+    PyNNLess.run, each spike train is returned as array.
+    """
+
+    def __init__(self, filename, member):
+        self.times = StoredArray(filename, member)
+        self.offsets = StoredArray(filename, member + "_offsets")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if (i < 0) or (i >= len(self)):
+            raise IndexError("Spike train index out of range")
+        return self.times[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def tolist(self):
+        """
+        Returns the spike trains as list of lists.
+        """
+        return [train.tolist() for train in self]
+
+class ResultWriter(object):
+    """
+    Writes the data recorded from each population to an uncompressed NPZ file
+    and replaces it with StoredArray and StoredSpikeTrains handles. Each array
+    is written as soon as it is stored, so only the data of a single population
+    has to be held in memory. The handles can only be used once the writer has
+    been closed.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        self.archive = zipfile.ZipFile(self.filename, "w", zipfile.ZIP_STORED,
+                                       allowZip64=True)
+
+    def _write(self, member, array):
+        # Arrays are written to a temporary file first, the zipfile module of
+        # Python 2 cannot stream members
+        fd, tmp = tempfile.mkstemp(suffix="-pynnless.npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.lib.format.write_array(f, np.asanyarray(array))
+            self.archive.write(tmp, arcname=member + ".npy")
+        finally:
+            os.remove(tmp)
+
+    def store(self, index, data):
+        """
+        Writes the signals recorded for the population with the given index and
+        returns a dictionary of the same layout containing the handles.
+        """
+        res = {}
+        for key, value in data.items():
+            member = "population_" + str(index) + "/" + key
+            if (key == const.SIG_SPIKES) and not isinstance(value, dict):
+                lens = np.array([len(train) for train in value],
+                                dtype=np.int64)
+                self._write(member, np.concatenate([np.zeros(0)] + [
+                    np.asarray(train, dtype=np.float64) for train in value]))
+                self._write(member + "_offsets",
+                            np.concatenate(([0], np.cumsum(lens))))
+                res[key] = StoredSpikeTrains(self.filename, member)
+            elif isinstance(value, dict):
+                # Reductions, one array per reduction
+                res[key] = {}
+                for name, array in value.items():
+                    self._write(member + "_" + name, array)
+                    res[key][name] = StoredArray(self.filename,
+                                                 member + "_" + name)
+            else:
+                self._write(member, value)
+                res[key] = StoredArray(self.filename, member)
+        return res
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
@@ -16,7 +16,18 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import copy
+import errno
+import fcntl
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pynnless_profiling as profiling
 
 def is_function(f):
     """
@@ -38,17 +49,61 @@ def init_key(tar, src, key, default, _type=lambda x: x):
         else:
             tar[key] = _type(copy.deepcopy(default))
 
+def local_data_file(name):
+    """
+    Returns the path of a file with the given name in the per-user PyNNLess
+    cache directory ("$XDG_CACHE_HOME/pynnless" or "~/.cache/pynnless"). The
+    directory is not created by this function.
+    """
+    root = os.environ.get("XDG_CACHE_HOME", "")
+    if root == "":
+        root = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "pynnless", name)
+
+def read_json_file(filename, default=None):
+    """
+    Reads the JSON file with the given name, returns the given default value if
+    the file does not exist or cannot be read.
+    """
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except:
+        return default
+
+def write_json_file(filename, data):
+    """
+    Atomically replaces the JSON file with the given name, creates the parent
+    directory if necessary. Returns False if the file could not be written.
+    """
+    try:
+        directory = os.path.dirname(filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp = filename + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=4)
+        os.rename(tmp, filename)
+        return True
+    except:
+        return False
+
+def physical_memory():
+    """
+    Returns the size of the physical memory in bytes or None if it cannot be
+    determined.
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
 
 #
 # Simple FileLock implementation -- adapted from
 # https://raw.githubusercontent.com/derpston/python-simpleflock/master/src/simpleflock.py
 #
 
-import time
-import os
-import fcntl
-import errno
-
 class FileLock:
     """
     Provides the simplest possible interface to flock-based file locking.
@@ -68,6 +123,29 @@ class FileLock:
             return
 
         self._fd = os.open(self._path, os.O_CREAT)
+        with profiling.span("lock_wait", "lock", {"path": self._path}):
+            self._acquire()
+
+    @staticmethod
+    def is_locked(path):
+        """
+        Returns True if the lock file with the given path exists and is
+        currently held.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return False
+        except IOError, ex:
+            return ex.errno == errno.EAGAIN
+        finally:
+            os.close(fd)
+
+    def _acquire(self):
         start_lock_search = time.time()
         while True:
             try:
@@ -109,3 +187,193 @@ class FileLock:
         except:
             pass
 
+
+
+#
+# Pipe based capture of the output written to a Unix file descriptor
+#
+
+class FdCapture:
+    """
+    Redirects a Unix file descriptor (e.g. 1 for stdout or 2 for stderr) into
+    a pipe. A reader thread drains the pipe into a ring buffer holding the last
+    "max_lines" lines of output, the complete output may optionally be spilled
+    into a file (preferably on a tmpfs). The capture can be started and stopped
+    multiple times, the spill file is reused until "close" is called, which
+    removes it unless it should be kept.
+    """
+
+    # Directory in which spill files are created if no directory is given
+    SPILL_DIR = "/dev/shm"
+
+    # Maximum length of a line kept in the ring buffer
+    MAX_LINE_LENGTH = 4096
+
+    # Maximum time in seconds to wait for the reader thread to finish. The pipe
+    # may still be kept open by a forked child process.
+    JOIN_TIMEOUT = 1.0
+
+    def __init__(self, fd, max_lines=100, spill=False, keep_spill=False):
+        """
+        Constructor of the FdCapture class.
+
+        :param fd: Unix file descriptor that should be captured.
+        :param max_lines: number of lines kept in the ring buffer.
+        :param spill: if True, the complete output is written to a temporary
+        file in SPILL_DIR, if a string is given, the file is created in the
+        directory with that name.
+        :param keep_spill: if True, the spill file is not removed by "close".
+        """
+        self._fd = fd
+        self._spill = spill
+        self._keep_spill = keep_spill
+        self._saved_fd = None
+        self._thread = None
+        self._line_count = [0]
+        self.lines = collections.deque(maxlen=max_lines)
+        self.spill_file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # Do not leave spill files behind if "close" was never called
+        try:
+            self._remove_spill_file()
+        except:
+            pass
+
+    def is_active(self):
+        """
+        Returns True if the file descriptor is currently redirected.
+        """
+        return self._saved_fd is not None
+
+    @property
+    def line_count(self):
+        """
+        Number of lines written since the capture was last started.
+        """
+        return self._line_count[0]
+
+    def _remove_spill_file(self):
+        """
+        Removes the spill file unless it should be kept.
+        """
+        if (self.spill_file is not None) and (not self._keep_spill):
+            try:
+                os.unlink(self.spill_file)
+            except OSError:
+                pass
+            self.spill_file = None
+
+    def _open_spill_file(self):
+        """
+        Creates the spill file on first use and opens it for appending.
+        """
+        if self.spill_file is None:
+            directory = None
+            if isinstance(self._spill, str):
+                directory = self._spill
+            elif os.path.isdir(self.SPILL_DIR):
+                directory = self.SPILL_DIR
+            fd, self.spill_file = tempfile.mkstemp(prefix="pynnless.",
+                    suffix=".fd" + str(self._fd) + ".log", dir=directory)
+            return fd
+        return os.open(self.spill_file, os.O_WRONLY | os.O_APPEND)
+
+    def _drain(self, rfd, spill_fd, lines_buf, line_count):
+        """
+        Reader thread, copies the data from the pipe into the given ring buffer
+        and line counter (a list with a single entry) and the spill file.
+        """
+        partial = ""
+        try:
+            while True:
+                data = os.read(rfd, 65536)
+                if not data:
+                    break
+                if spill_fd is not None:
+                    view = data
+                    while len(view) > 0:
+                        view = view[os.write(spill_fd, view):]
+                lines = (partial + data).split("\n")
+                partial = lines.pop()[-self.MAX_LINE_LENGTH:]
+                line_count[0] += len(lines)
+                lines_buf.extend([l[-self.MAX_LINE_LENGTH:] for l in lines])
+            if len(partial) > 0:
+                line_count[0] += 1
+                lines_buf.append(partial)
+        finally:
+            os.close(rfd)
+            if spill_fd is not None:
+                os.close(spill_fd)
+
+    def start(self):
+        """
+        Starts capturing the output, clears the ring buffer. Does nothing if
+        the capture is already active.
+        """
+        if self._saved_fd is not None:
+            return
+
+        # Make sure data buffered by Python ends up in the original file
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        # The reader thread of the previous capture may still be running if a
+        # forked child process keeps the pipe open. Give the new capture its
+        # own ring buffer, line counter and spill file, so the old thread
+        # cannot write into them.
+        if (self._thread is not None) and self._thread.is_alive():
+            if self._keep_spill:
+                self.spill_file = None
+            else:
+                self._remove_spill_file()
+        self._thread = None
+        self.lines = collections.deque(maxlen=self.lines.maxlen)
+        self._line_count = [0]
+        spill_fd = self._open_spill_file() if self._spill else None
+        rfd, wfd = os.pipe()
+        self._saved_fd = os.dup(self._fd)
+        os.dup2(wfd, self._fd)
+        os.close(wfd)
+        self._thread = threading.Thread(target=self._drain,
+                args=(rfd, spill_fd, self.lines, self._line_count))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Restores the original file descriptor and waits for the reader thread
+        to process the remaining output. Does nothing if the capture is not
+        active.
+        """
+        if self._saved_fd is None:
+            return
+
+        # Replacing the redirected descriptor closes the last write end of the
+        # pipe, the reader thread receives an EOF
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except:
+            pass
+        os.dup2(self._saved_fd, self._fd)
+        os.close(self._saved_fd)
+        self._saved_fd = None
+
+        # The thread is kept if it did not finish, see "start"
+        self._thread.join(self.JOIN_TIMEOUT)
+
+    def close(self):
+        """
+        Stops the capture and removes the spill file unless "keep_spill" was
+        set. A subsequent call to "start" creates a new spill file.
+        """
+        self.stop()
+        self._remove_spill_file()
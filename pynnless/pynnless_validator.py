@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Validates network descriptions before they are passed to a simulator. All
+connections are checked at once on the connection matrix (see
+storage.connection_matrix) instead of one tuple at a time, and all violations
+are collected so they can be reported together.
+"""
+
+import numpy as np
+
+import pynnless_builder as builder
+import pynnless_constants as const
+import pynnless_exceptions as exceptions
+import pynnless_native as native
+import pynnless_storage as storage
+
+# Maximum number of violations reported for each individual check
+MAX_REPORTED = 10
+
+# Names of the parameters known for each neuron type
+KNOWN_PARAMETERS = dict((celltype.__name__,
+                         set(celltype.default_parameters.keys()))
+                        for celltype in native.CELL_TYPES)
+
+def _report(messages, mask, describe):
+    """
+    Appends a message for each of the first MAX_REPORTED entries selected by
+    the given boolean mask to the list of messages.
+
+    :param describe: function returning the message for an index.
+    """
+    indices = np.nonzero(mask)[0]
+    for i in indices[:MAX_REPORTED]:
+        messages.append(describe(i))
+    if len(indices) > MAX_REPORTED:
+        messages.append("... and " + str(len(indices) - MAX_REPORTED) +
+                        " more")
+
+def _validate_populations(network, errors, warnings):
+    """
+    Checks the population descriptors, returns the list of canonicalized
+    populations or None if a population is invalid.
+    """
+    populations = []
+    for i, population in enumerate(network["populations"]):
+        try:
+            population = builder.Population(population)
+        except exceptions.PyNNLessException as e:
+            errors.append("Population " + str(i) + ": " + str(e))
+            populations.append(None)
+            continue
+        populations.append(population)
+
+        # Check the parameter names and the spike times
+        known = KNOWN_PARAMETERS.get(population["type"], set())
+        unknown = set()
+        for j, params in enumerate(population["params"]):
+            unknown.update(key for key in params.keys() if not key in known)
+            if "spike_times" in params:
+                times = np.asarray(params["spike_times"], dtype=np.float64)
+                if not np.all(np.isfinite(times)):
+                    errors.append("Population " + str(i) + ", parameter set " +
+                                  str(j) + ": spike times must be finite")
+                elif np.any(np.diff(times.flatten()) < 0):
+                    warnings.append("Population " + str(i) + ", parameter set "
+                                    + str(j) + ": spike times are not sorted")
+        for key in sorted(unknown):
+            warnings.append("Population " + str(i) + ": unknown parameter \""
+                            + key + "\" for neuron type " + population["type"])
+    return populations
+
+def _connection_matrix(network, errors):
+    """
+    Converts the connections of the network into a connection matrix, returns
+    None if the connections are malformed.
+    """
+    try:
+        matrix = np.asarray(storage.connection_matrix(network["connections"]),
+                            dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        errors.append("Malformed connection list: " + str(e))
+        return None
+    if len(matrix) == 0:
+        return np.zeros((0, len(storage.CONNECTION_COLUMNS)))
+    if (matrix.ndim != 2) or (matrix.shape[1] != len(
+            storage.CONNECTION_COLUMNS)):
+        errors.append("Connection matrix must have " +
+                      str(len(storage.CONNECTION_COLUMNS)) + " columns")
+        return None
+    return matrix
+
+def _describe_connection(matrix, what):
+    return lambda k: ("Connection " + str(k) + " " + str(
+        tuple(matrix[k].tolist())) + ": " + what)
+
+def _validate_connections(matrix, populations, errors):
+    """
+    Checks the connection matrix against the population sizes.
+    """
+    n = len(populations)
+    counts = np.array([p["count"] if p is not None else np.inf
+                       for p in populations] + [0])
+    is_source = np.array([(p is not None) and (p["type"] == const.TYPE_SOURCE)
+                          for p in populations] + [False])
+
+    def describe(what):
+        return _describe_connection(matrix, what)
+
+    for col, name in [(0, "source"), (2, "target")]:
+        pid, nid = matrix[:, col], matrix[:, col + 1]
+        invalid_pid = ((pid < 0) | (pid >= n) | (pid != np.floor(pid)) |
+                       ~np.isfinite(pid))
+        _report(errors, invalid_pid, describe(name +
+            " population index out of range"))
+
+        # Use the dummy entry at the end of "counts" for invalid pids
+        pid_idx = np.where(invalid_pid, n, pid).astype(np.int64)
+        invalid_nid = (~invalid_pid) & ((nid < 0) | (nid >= counts[pid_idx]) |
+                                        (nid != np.floor(nid)))
+        _report(errors, invalid_nid, describe(name +
+            " neuron index out of range"))
+        if col == 2:
+            _report(errors, is_source[pid_idx], describe(
+                "target population is a spike source"))
+
+def _validate_weights_and_delays(matrix, errors):
+    """
+    Checks the weights and delays in the connection matrix.
+    """
+    _report(errors, ~np.isfinite(matrix[:, 4]), _describe_connection(matrix,
+        "weight must be finite"))
+    delays = matrix[:, 5]
+    _report(errors, ~np.isfinite(delays) | (delays < 0), _describe_connection(
+        matrix, "delay must be finite and non-negative"))
+
+def _same_structure(a, b):
+    return ((a is not None) and (b is not None) and (a[0] == b[0]) and
+            np.array_equal(a[1], b[1]))
+
+def _validate(network, structure=None):
+    """
+    Checks the given network description, see "validate_network". The
+    population and neuron indices of the connections are only checked if the
+    structure of the network differs from the given structure.
+
+    :return: a tuple containing the list of errors, the list of warnings and
+    the structure of the network, which is None if it could not be determined.
+    """
+    errors = []
+    warnings = []
+    for key in ["populations", "connections"]:
+        if not key in network:
+            errors.append("\"" + key + "\" key must be present in network " +
+                          "description")
+    if len(errors) > 0:
+        return errors, warnings, None
+    populations = _validate_populations(network, errors, warnings)
+    matrix = _connection_matrix(network, errors)
+    if matrix is None:
+        return errors, warnings, None
+    new_structure = ([(p["type"], p["count"]) if p is not None else None
+                      for p in populations], matrix[:, 0:4].copy())
+    if not _same_structure(structure, new_structure):
+        _validate_connections(matrix, populations, errors)
+    _validate_weights_and_delays(matrix, errors)
+    return errors, warnings, new_structure
+
+def validate_network(network):
+    """
+    Checks the given network description for errors.
+
+    :return: a tuple containing the list of errors and the list of warnings.
+    Errors are population descriptors which cannot be parsed, population and
+    neuron indices which are out of range, connections targeting spike sources,
+    non-finite weights, negative or non-finite delays and non-finite spike
+    times. Warnings are unsorted spike times and unknown parameter names.
+    """
+    errors, warnings, _ = _validate(network)
+    return errors, warnings
+
+def check_network(network, logger=None, structure=None):
+    """
+    Validates the given network, logs the warnings using the given logger and
+    raises a PyNNLessValidationException containing all errors.
+
+    :param structure: structure of a previously validated network as returned
+    by this function. If the type and size of the populations and the connected
+    neuron pairs did not change, only the parameters, weights and delays are
+    checked. Used for the repeated runs of an open session.
+    :return: the structure of the network.
+    """
+    errors, warnings, structure = _validate(network, structure)
+    if logger is not None:
+        for warning in warnings:
+            logger.warning(warning)
+    if len(errors) > 0:
+        raise exceptions.PyNNLessValidationException(errors)
+    return structure
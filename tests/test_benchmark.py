@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the network generators and the result comparison in the
+pynnless_benchmark submodule.
+"""
+
+import unittest
+
+from pynnless import *
+import pynnless.pynnless_benchmark as benchmark
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_synfire_chain(self):
+        net = benchmark.synfire_chain(length=5, width=3)
+        self.assertEqual(15, net["populations"][1]["count"])
+        self.assertEqual(3 + 5 * 9, len(net["connections"]))
+        self.assertIn(((1, 12), (1, 0), 0.024, 1.0), net["connections"])
+
+    def test_random_balanced(self):
+        net = benchmark.random_balanced(n_exc=80, n_inh=20, n_input=10,
+            p_connect=0.5)
+        self.assertEqual(3, len(net["populations"]))
+        for src, tar, weight, delay in net["connections"]:
+            self.assertIn(tar[0], [1, 2])
+            self.assertEqual(src[0] == 2, weight < 0)
+        self.assertTrue(4000 < len(net["connections"]) < 7000)
+        self.assertEqual(net, benchmark.random_balanced(n_exc=80, n_inh=20,
+            n_input=10, p_connect=0.5))
+
+    def test_heterogeneous_populations(self):
+        net = benchmark.heterogeneous_populations(population_count=4, count=5)
+        self.assertEqual(5, len(net["populations"]))
+        self.assertEqual(TYPE_AD_EX, net["populations"][2]["type"])
+        self.assertEqual(5, len(net["populations"][1]["params"]))
+        self.assertEqual(4 * 5 * 10, len(net["connections"]))
+
+    def test_compare(self):
+        res = benchmark.run_benchmarks(networks=["synfire_chain"])
+        self.assertIn("synfire_chain/group_connections",
+            benchmark.flatten(res))
+        self.assertEqual([], benchmark.compare(res, res))
+
+        slow = {"networks": {"synfire_chain": {"benchmarks": {"generate": {
+            "throughput": res["networks"]["synfire_chain"]["benchmarks"]
+                ["generate"]["throughput"] * 2}}}}}
+        regressions = benchmark.compare(res, slow)
+        self.assertEqual(1, len(regressions))
+        self.assertEqual("synfire_chain/generate", regressions[0][0])
+
+    def test_benchmark_network_build(self):
+        res = benchmark.benchmark_network("synfire_chain", {"length": 10},
+                                          simulator="mock", duration=100.0)
+        entries = res["benchmarks"]
+        self.assertNotIn("build", benchmark.benchmark_network(
+            "synfire_chain", {"length": 10})["benchmarks"])
+        self.assertAlmostEqual(entries["run_build_populations"]["time"] +
+                               entries["run_build_projections"]["time"],
+                               entries["build"]["time"])
+        self.assertEqual(res["neurons"] + res["synapses"],
+                         entries["build"]["items"])
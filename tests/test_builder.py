@@ -43,3 +43,19 @@ class TestBuilder(unittest.TestCase):
         pop = Population(count=5, _type=TYPE_IF_COND_EXP)
         pop2 = Population(pop)
         self.assertEqual(pop, pop2)
+
+    def test_record_options(self):
+        pop = Population(count=10, record={SIG_V: {"neurons": slice(2, 8, 3)},
+                                           SIG_SPIKES: None})
+        pop.record(SIG_GE)
+        self.assertEqual({SIG_V: {"neurons": {"start": 2, "stop": 8,
+                                              "step": 3}},
+                          SIG_SPIKES: {}, SIG_GE: {}}, pop["record"])
+        self.assertEqual([2, 5], Population.record_neurons(
+            pop["record"][SIG_V], 10))
+        self.assertEqual(None, Population.record_neurons({}, 10))
+        self.assertEqual([1, 3], Population.record_neurons(
+            {"neurons": [3, 1, 3]}, 10))
+        self.assertEqual({SIG_V: {}}, Population.record_options([SIG_V]))
+        self.assertRaises(PyNNLessException, lambda: Population(count=2,
+            record={SIG_V: {"neurons": [2]}}))
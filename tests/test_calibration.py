@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the backend throughput measurement in the pynnless_calibration submodule.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pynnless import *
+import pynnless.pynnless_calibration as calibration
+import pynnless.pynnless_estimator as estimator
+
+class TestCalibration(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.old_environ = dict(os.environ)
+        os.environ["XDG_CACHE_HOME"] = self.directory
+        PyNNLess._calibration_cache = None
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.old_environ)
+        PyNNLess._calibration_cache = None
+        shutil.rmtree(self.directory)
+
+    def test_measure(self):
+        res = calibration.measure("refsim", isolated=False, neurons=10,
+                                  sources=2, spikes=10, duration=100.0)
+        for key in ["ms_setup", "ms_per_neuron", "ms_per_synapse",
+                    "ms_per_second", "ms_per_neuron_second", "ms_per_event",
+                    "ms_per_sample"]:
+            self.assertIn(key, res)
+            self.assertGreaterEqual(res[key], 0.0)
+
+        # The memory is only measured in fresh processes
+        self.assertNotIn("bytes_per_neuron", res)
+
+    def test_calibrate(self):
+        self.assertIsNone(PyNNLess.get_simulator_info_static(
+            "refsim")["calibration"])
+        res = calibration.calibrate(["refsim", "foo"], isolated=False,
+                                    neurons=10, sources=2, spikes=10,
+                                    duration=100.0)
+        self.assertIn("error", res["foo"])
+        self.assertTrue(os.path.isfile(os.path.join(self.directory,
+                "pynnless", PyNNLess.CALIBRATION_FILE)))
+
+        # The stored profile is reported by get_simulator_info and used by
+        # the estimator
+        PyNNLess._calibration_cache = None
+        info = PyNNLess.get_simulator_info_static("refsim")
+        self.assertEqual(res["refsim"]["ms_per_sample"],
+                         info["calibration"]["ms_per_sample"])
+        self.assertIsNone(PyNNLess.get_simulator_info_static(
+            "eventsim")["calibration"])
+        self.assertEqual(res["refsim"]["ms_setup"],
+                         estimator.calibration_for("refsim")["ms_setup"])
+
+    def test_calibrate_limits(self):
+        res = calibration.calibrate(["refsim"], neurons=10, sources=2,
+                                    spikes=10, duration=100.0)["refsim"]
+        self.assertGreaterEqual(res["max_neuron_count"], 1)
+        self.assertGreaterEqual(res["concurrency"], 1)
+
+        # The derived limits replace the nominal ones
+        PyNNLess._calibration_cache = None
+        info = PyNNLess.get_simulator_info_static("refsim")
+        self.assertEqual(res["max_neuron_count"], info["max_neuron_count"])
+        self.assertEqual(res["concurrency"], info["concurrency"])
+
+    def test_calibrate_crash(self):
+        run = calibration._run
+        calibration._run = lambda *args: os._exit(3)
+        try:
+            res = calibration.calibrate(["refsim"], store=False, neurons=10,
+                                        sources=2, spikes=10, duration=100.0)
+        finally:
+            calibration._run = run
+        self.assertIn("exited with code 3", res["refsim"]["error"])
@@ -22,6 +22,10 @@ Tests common functionality independent of the backend.
 
 import unittest
 import numpy as np
+import os
+import shutil
+import sys
+import tempfile
 
 from pynnless import *
 
@@ -117,6 +121,41 @@ class TestCommon(unittest.TestCase):
         self.assertEqual(("nmpm1", ["pyNN.pyhmf", "pyNN.nmpm1", "pyhmf"]),
                 PyNNLess._lookup_simulator("pyNN.pyhmf"))
 
+    def test_probe_simulators(self):
+        """
+        Tests the simulator probe cache and its invalidation.
+        """
+        directory = tempfile.mkdtemp()
+        old_environ = dict(os.environ)
+        try:
+            os.environ["XDG_CACHE_HOME"] = directory
+            PyNNLess._probe_cache = None
+            fingerprint = PyNNLess._probe_fingerprint()
+            res = PyNNLess.probe_simulators()
+            self.assertEqual(sorted(res.keys()), PyNNLess.simulators())
+            self.assertTrue(os.path.isfile(os.path.join(directory, "pynnless",
+                    PyNNLess.PROBE_CACHE_FILE)))
+
+            # The cache file is used if the in-memory cache is empty
+            PyNNLess._probe_cache = None
+            self.assertEqual(res, PyNNLess.probe_simulators())
+            self.assertEqual(fingerprint, PyNNLess._probe_cache[0])
+
+            # Changes to sys.path and the environment invalidate the cache
+            sys.path.append(directory)
+            try:
+                self.assertNotEqual(fingerprint,
+                        PyNNLess._probe_fingerprint())
+            finally:
+                sys.path.remove(directory)
+            os.environ["PYTHONUSERBASE"] = directory
+            self.assertNotEqual(fingerprint, PyNNLess._probe_fingerprint())
+        finally:
+            os.environ.clear()
+            os.environ.update(old_environ)
+            PyNNLess._probe_cache = None
+            shutil.rmtree(directory)
+
     def test_eval_setup(self):
         """
         Tests the static "_eval_setup" method.
@@ -168,6 +207,27 @@ class TestCommon(unittest.TestCase):
         },
 		{}), connections)
 
+    def test_connection_matrices(self):
+        """
+        Tests whether the internal "_connection_matrices" method used to update
+        the weights of an open session behaves as expected.
+        """
+        weights, delays = PyNNLess._connection_matrices([
+            (0, 1, 0.1, 1.0),
+            (1, 0, 0.2, 2.0),
+        ], 2, 3)
+        np.testing.assert_equal(np.asarray([
+            [np.nan, 0.1, np.nan],
+            [0.2, np.nan, np.nan]]), weights)
+        np.testing.assert_equal(np.asarray([
+            [np.nan, 1.0, np.nan],
+            [2.0, np.nan, np.nan]]), delays)
+        self.assertRaises(PyNNLessException,
+                lambda: PyNNLess._connection_matrices([
+                    (0, 1, 0.1, 1.0),
+                    (0, 1, 0.2, 2.0),
+                ], 2, 2))
+
     def test_convert_pyNN7_spikes(self):
         """
         Tests whether the internal "_convert_pyNN7_spikes" method behaves as
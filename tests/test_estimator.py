@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the resource and runtime estimation in the pynnless_estimator submodule.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_estimator as estimator
+from pynnless.pynnless_exceptions import PyNNLessSimulatorException
+from pynnless.pynnless_utils import FileLock
+
+class TestEstimator(unittest.TestCase):
+
+    def network(self, count=3):
+        return Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0, 5.0], [1.0]]),
+                IfCondExpPopulation(count=count, record={
+                    SIG_SPIKES: {},
+                    SIG_V: {"neurons": [0], "window": [0.0, 500.0],
+                            "sampling_interval": 1.0},
+                    SIG_GE: {"reduce": ["mean", "max"]}})],
+            connections=[((0, 0), (1, i), 0.1, 1.0) for i in xrange(count)] +
+                        [((1, 0), (1, 1), 0.1, 1.0)])
+
+    def test_counts(self):
+        res = estimator.estimate(self.network(), "refsim", 1000.0)
+        self.assertEqual("refsim", res["simulator"])
+        self.assertEqual(3, res["neuron_count"])
+        self.assertEqual(2, res["source_count"])
+        self.assertEqual(4, res["synapse_count"])
+        self.assertEqual(512, res["max_neuron_count"])
+        self.assertTrue(res["fits"])
+        self.assertEqual([], res["violations"])
+
+        # Two source spikes to three targets, one neuron firing at the
+        # estimated rate for one second
+        self.assertAlmostEqual(3 * 2 + estimator.ESTIMATED_RATE,
+                               res["event_count"])
+
+    def test_recording(self):
+        res = estimator.estimate(self.network(), "refsim", 1000.0)
+        b = estimator.BYTES_PER_VALUE
+        self.assertEqual(int(3 * estimator.ESTIMATED_RATE * b),
+                         res["recording"][SIG_SPIKES])
+        self.assertEqual(2 * 500 * b, res["recording"][SIG_V])
+        self.assertEqual(3 * 2 * b, res["recording"][SIG_GE])
+        self.assertEqual(sum(res["recording"].values()),
+                         res["recording_bytes"])
+
+    def test_time_and_memory(self):
+        res = estimator.estimate(self.network(), "nest", 1000.0)
+        time = res["time"]
+        self.assertAlmostEqual(time["total"], time["setup"] + time["build"] +
+                               time["sim"] + time["fetch"])
+        self.assertGreater(res["memory"], res["recording_bytes"])
+
+        # The calibration table entries can be overridden
+        res = estimator.estimate(self.network(), "nest", 1000.0,
+                                 calibration={"ms_setup": 0.0,
+                                              "ms_per_neuron_second": 1000.0})
+        self.assertEqual(0.0, res["time"]["setup"])
+        self.assertAlmostEqual(3.0, res["time"]["sim"], places=2)
+
+    def test_limits(self):
+        res = estimator.estimate(self.network(200), "spikey", 1000.0)
+        self.assertFalse(res["fits"])
+        self.assertEqual(1, len(res["violations"]))
+        self.assertEqual(192, res["max_neuron_count"])
+
+        # The nominal neuron count of software simulators is not enforced,
+        # only the available memory
+        res = estimator.estimate(self.network(5000), "refsim", 1000.0)
+        self.assertTrue(res["fits"])
+        res = estimator.estimate(self.network(5000), "refsim", 1000.0,
+                                 calibration={"bytes_base": 1e18})
+        self.assertFalse(res["fits"])
+        self.assertIn("memory", res["violations"][0])
+
+        # Spike sources count as neurons on SpiNNaker
+        res = estimator.estimate(self.network(1499), "spiNNaker", 1000.0)
+        self.assertEqual("nmmc1", res["simulator"])
+        self.assertFalse(res["fits"])
+
+    def test_auto_duration(self):
+        res = estimator.estimate(self.network(), "refsim")
+        self.assertEqual(10.0 + PyNNLess.AUTO_DURATION_EXTENSION,
+                         res["duration"])
+
+class TestSelectSimulator(unittest.TestCase):
+
+    SIMULATORS = ["mock", "refsim", "eventsim"]
+
+    def setUp(self):
+        # Use the default calibration table and a fresh probe cache
+        self.directory = tempfile.mkdtemp()
+        self.old_environ = dict(os.environ)
+        os.environ["XDG_CACHE_HOME"] = self.directory
+        PyNNLess._calibration_cache = None
+        PyNNLess._probe_cache = None
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.old_environ)
+        PyNNLess._calibration_cache = None
+        PyNNLess._probe_cache = None
+        shutil.rmtree(self.directory)
+
+    def network(self, record=[SIG_SPIKES]):
+        return Network(
+            populations=[
+                SourcePopulation(count=1, spike_times=[10.0]),
+                IfCondExpPopulation(count=10, record=record)],
+            connections=[((0, 0), (1, i), 0.1, 1.0) for i in xrange(10)])
+
+    def test_rank_simulators(self):
+        ranking, rejected = estimator.rank_simulators(self.network(), 100.0,
+            simulators=self.SIMULATORS, exclude=["mock"])
+        self.assertEqual(["eventsim", "refsim"], [s for _, s in ranking])
+        self.assertLessEqual(ranking[0][0], ranking[1][0])
+        self.assertEqual({}, rejected)
+
+        # The event-driven simulator cannot record the membrane potential
+        ranking, rejected = estimator.rank_simulators(self.network([SIG_V]),
+            100.0, simulators=self.SIMULATORS, exclude=["mock"])
+        self.assertEqual(["refsim"], [s for _, s in ranking])
+        self.assertIn("eventsim", rejected)
+
+        with self.assertRaises(PyNNLessSimulatorException):
+            estimator.select_simulator(self.network([SIG_V]), 100.0,
+                                       simulators=["eventsim"])
+
+    def test_lock_wait(self):
+        # Pretend the Spikey system is installed and locked by another process
+        probe = PyNNLess.__dict__["probe_simulators"]
+        caps = PyNNLess.probe_simulators(capabilities=True)["refsim"]
+        PyNNLess.probe_simulators = staticmethod(
+            lambda capabilities=False, refresh=False: {"spikey": caps})
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            t_free = estimator.rank_simulators(self.network(), 100.0)[0][0][0]
+            with FileLock(".~spikey"):
+                ranking, _ = estimator.rank_simulators(self.network(), 100.0)
+                self.assertAlmostEqual(t_free + estimator.LOCK_WAIT,
+                                       ranking[0][0])
+                ranking, _ = estimator.rank_simulators(self.network(), 100.0,
+                                                       {"lock_wait": 10.0})
+                self.assertAlmostEqual(t_free + 10.0, ranking[0][0])
+        finally:
+            os.chdir(cwd)
+            PyNNLess.probe_simulators = probe
+
+    def test_auto(self):
+        sim = PyNNLess(PyNNLess.AUTO_SIMULATOR)
+        self.assertIsNone(sim.sim)
+        res = sim.run(self.network([SIG_V]), 100.0)
+        self.assertEqual("refsim", sim.simulator)
+        self.assertEqual(10, len(res[1][SIG_V]))
+
+        # The choice is kept for subsequent runs
+        sim.run(self.network(), 100.0)
+        self.assertEqual("refsim", sim.simulator)
+
+    def test_auto_large_network(self):
+        network = Network(populations=[IfCondExpPopulation(count=5000,
+                                                           record=[SIG_V])])
+        sim = PyNNLess(PyNNLess.AUTO_SIMULATOR)
+        res = sim.run(network, 10.0)
+        self.assertEqual("refsim", sim.simulator)
+        self.assertEqual(5000, len(res[0][SIG_V]))
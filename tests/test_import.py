@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Import-time benchmark, makes sure importing PyNNLess stays cheap and does not
+pull in PyNN or any simulator backend.
+"""
+
+import unittest
+import os
+import subprocess
+import sys
+
+# Script measuring the import time of the "pynnless" package in a fresh
+# interpreter
+IMPORT_SCRIPT = """
+import sys, time
+t = time.time()
+import pynnless
+t = time.time() - t
+pynnless.Network().add_source(spike_times=[10.0]).add_neuron()
+print(repr((t, sorted(m for m in sys.modules if m.split(".")[0] == "pyNN"))))
+"""
+
+class TestImport(unittest.TestCase):
+
+    # Upper bound for the import time of the package in seconds
+    MAX_IMPORT_TIME = 0.25
+
+    def test_import_time(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT],
+                cwd=root)
+        t, modules = eval(output.strip().split("\n")[-1])
+        self.assertEqual([], modules)
+        self.assertLess(t, self.MAX_IMPORT_TIME)
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the built-in simulator backends and the PyNN interface they share.
+"""
+
+import os
+import time
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_mock as mock
+import pynnless.pynnless_native as native
+import pynnless.pynnless_refsim as refsim
+
+class TestNative(unittest.TestCase):
+
+    def network(self):
+        return Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0, 20.0], [5.0]],
+                                 record=[SIG_SPIKES]),
+                IfCondExpPopulation(count=3, record=[SIG_SPIKES, SIG_V])],
+            connections=[((0, 0), (1, 1), 0.1, 1.0),
+                         ((0, 1), (1, 2), -0.1, 1.0)])
+
+    def test_simulator_abstract(self):
+        class Incomplete(native.Simulator):
+            pass
+        self.assertRaises(TypeError, Incomplete)
+
+    def test_population(self):
+        mock.setup(timestep=0.5)
+        pop = mock.Population(4, mock.IF_cond_exp, {"cm": 0.5})
+        self.assertEqual(4, pop.size)
+        np.testing.assert_equal([0.5] * 4, pop.get("cm"))
+        mock.PopulationView(pop, [1, 3]).set(cm=[0.1, 0.2])
+        np.testing.assert_equal([0.5, 0.1, 0.5, 0.2], pop.get("cm"))
+        pop.set({"tau_m": 10.0})
+        pop.tset("v_rest", [-60.0, -61.0, -62.0, -63.0])
+        np.testing.assert_equal([-62.0, -63.0],
+            mock.PopulationView(pop, slice(2, 4)).get("v_rest"))
+        self.assertRaises(PyNNLessException, lambda: pop.set(foo=1.0))
+
+    def test_projection(self):
+        mock.setup(timestep=0.5)
+        pre = mock.Population(2, mock.SpikeSourceArray)
+        post = mock.Population(3, mock.IF_cond_exp)
+        prj = mock.Projection(pre, post, mock.FromListConnector(
+            [(0, 1, 0.1, 1.0), (1, 2, 0.2, 0.1)]))
+        self.assertEqual(2, prj.size())
+        np.testing.assert_equal([1.0, 0.5], prj.getDelays())
+        weights = np.empty((2, 3))
+        weights.fill(np.nan)
+        weights[1, 2] = 0.3
+        prj.set(weight=weights)
+        np.testing.assert_equal([0.1, 0.3], prj.getWeights())
+        prj.setDelays(2.0)
+        np.testing.assert_equal([2.0, 2.0], prj.getDelays())
+
+    def test_recording(self):
+        mock.setup(timestep=1.0, rate=100.0, seed=1)
+        src = mock.Population(2, mock.SpikeSourceArray,
+                              {"spike_times": [1.0, 5.0]})
+        pop = mock.Population(3, mock.IF_cond_exp)
+        src.record()
+        mock.PopulationView(pop, [0, 2]).record([SIG_SPIKES, SIG_V])
+        mock.run(100.0)
+
+        self.assertEqual([[0.0, 1.0], [1.0, 1.0], [0.0, 5.0], [1.0, 5.0]],
+                         src.getSpikes().tolist())
+        segment = pop.get_data().segments[-1]
+        self.assertEqual([0, 2], [st.annotations["source_index"]
+                                  for st in segment.spiketrains])
+        self.assertEqual(1, len(segment.analogsignalarrays))
+        v = segment.analogsignalarrays[0]
+        self.assertEqual(SIG_V, v.name)
+        self.assertEqual((100, 2), v.shape)
+        self.assertEqual(200, len(pop.get_v()))
+
+        mock.reset()
+        mock.run(50.0)
+        block = pop.get_data(SIG_V, clear=True)
+        self.assertEqual(2, len(block.segments))
+        self.assertEqual((50, 2), block.segments[-1].analogsignalarrays[0].shape)
+        self.assertEqual(1, len(pop.get_data().segments))
+
+    def test_run(self):
+        sim = PyNNLess("mock", {"seed": 1, "rate": 50.0})
+        self.assertEqual(8, sim.version)
+        res = sim.run(self.network(), 100.0)
+        self.assertEqual([[10.0, 20.0], [5.0]], res[0][SIG_SPIKES])
+        self.assertEqual(3, len(res[1][SIG_SPIKES]))
+        self.assertEqual((3, 1000), res[1][SIG_V].shape)
+        self.assertEqual(1000, len(res[1][SIG_V + "_t"]))
+
+    def test_run_pyNN7(self):
+        sim = PyNNLess("mock", {"seed": 1})
+        sim.version = 7
+        res = sim.run(self.network(), 100.0)
+        self.assertEqual([[10.0, 20.0], [5.0]], res[0][SIG_SPIKES])
+        self.assertEqual((3, 1000), res[1][SIG_V].shape)
+
+    def test_keep_open(self):
+        sim = PyNNLess("mock", {"seed": 1})
+        network = self.network()
+        sim.run(network, 100.0, keep_open=True)
+        network["populations"][0]["params"][0]["spike_times"] = [30.0]
+        network["connections"][0] = ((0, 0), (1, 1), 0.2, 1.0)
+        res = sim.run(network, 100.0, keep_open=True)
+        self.assertEqual([[30.0], [5.0]], res[0][SIG_SPIKES])
+        phases = [p["name"] for p in
+                  sim.get_time_info()["phases"]["children"]]
+        self.assertIn("update_projections", phases)
+        self.assertIn("reset", phases)
+        prj = sim.session["projections"][("exc", (0, 1))][0]
+        self.assertEqual([0.2, -0.1], prj.getWeights().tolist())
+        sim.close()
+        self.assertIsNone(sim.session)
+
+    def test_refsim_membrane(self):
+        # With constant input current the exponential Euler scheme is exact
+        params = {"cm": 0.2, "tau_m": 10.0, "v_rest": -60.0,
+                  "v_thresh": 0.0, "i_offset": 0.1}
+        sim = PyNNLess("refsim", {"timestep": 0.1})
+        res = sim.run(Network(populations=[IfCondExpPopulation(
+            params=params, record=[SIG_V])], connections=[]), 50.0)
+        ts = res[0][SIG_V + "_t"]
+        expected = -55.0 - 5.0 * np.exp(-ts / 10.0)
+        np.testing.assert_allclose(expected, res[0][SIG_V][0], atol=1e-3)
+
+    def test_refsim_synapses(self):
+        params = {"cm": 0.2, "e_rev_E": -40.0, "e_rev_I": -60.0,
+                  "v_rest": -50.0, "v_reset": -70.0, "v_thresh": -47.0,
+                  "tau_m": 10.0, "tau_refrac": 1.0}
+        sim = PyNNLess("refsim")
+        res = sim.run(Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0], [50.0]]),
+                IfCondExpPopulation(count=3, params=params,
+                                    record=[SIG_SPIKES, SIG_GI]),
+                AdExPopulation(params=params, record=[SIG_SPIKES])],
+            connections=[
+                ((0, 0), (1, 0), 0.05, 1.0),
+                ((0, 1), (1, 0), 0.05, 5.0),
+                ((0, 0), (1, 1), 0.01, 1.0),
+                ((0, 0), (1, 2), -0.05, 1.0),
+                ((1, 0), (2, 0), 0.05, 1.0)]), 100.0)
+        spikes = res[1][SIG_SPIKES]
+        self.assertEqual(2, len(spikes[0]))
+        self.assertTrue(11.0 < spikes[0][0] < 15.0)
+        self.assertTrue(55.0 < spikes[0][1] < 59.0)
+        self.assertEqual([], spikes[1])
+        self.assertEqual([], spikes[2])
+        self.assertAlmostEqual(0.05, np.nanmax(res[1][SIG_GI][2]), 2)
+        self.assertTrue(len(res[2][SIG_SPIKES][0]) > 0)
+
+    def test_eventsim(self):
+        # Compare with the clock-driven reference simulator, which rounds the
+        # spike times to the timestep
+        import pynnless.pynnless_benchmark as benchmark
+        network = benchmark.synfire_chain(length=10, w_syn=0.05)
+        res_ref = PyNNLess("refsim").run(network, 100.0)
+        res = PyNNLess("eventsim").run(network, 100.0)
+        for spikes_ref, spikes in zip(res_ref[1][SIG_SPIKES],
+                                      res[1][SIG_SPIKES]):
+            self.assertEqual(len(spikes_ref), len(spikes))
+            np.testing.assert_allclose(spikes_ref, spikes, atol=1.0)
+
+        # Tonic spiking caused by the offset current, refractory period
+        sim = PyNNLess("eventsim")
+        res = sim.run(Network(populations=[IfCondExpPopulation(params={
+            "v_rest": -60.0, "v_reset": -60.0, "v_thresh": -55.0,
+            "tau_m": 10.0, "cm": 0.2, "i_offset": 0.2, "tau_refrac": 2.0},
+            record=[SIG_SPIKES])], connections=[]), 100.0)
+        isi = 2.0 + 10.0 * np.log(10.0 / 5.0)
+        np.testing.assert_allclose(np.arange(1, 1 + len(res[0][SIG_SPIKES][0]))
+            * isi - 2.0, res[0][SIG_SPIKES][0])
+        self.assertRaises(PyNNLessException, lambda: sim.run(Network(
+            populations=[IfCondExpPopulation(record=[SIG_V])],
+            connections=[]), 10.0))
+
+    def test_eventsim_sparse(self):
+        # Only a single neuron of the long synfire chain is active at a time,
+        # the event-driven simulator must beat the clock-driven one
+        import pynnless.pynnless_benchmark as benchmark
+        network = benchmark.synfire_chain(length=1000, w_syn=0.05)
+        times = {}
+        for simulator in ["refsim", "eventsim"]:
+            sim = PyNNLess(simulator)
+            sim.run(network, 200.0)
+            times[simulator] = sum(phase["time"] for phase in
+                sim.get_time_info()["phases"]["children"]
+                if phase["name"] == "sim")
+        self.assertLess(times["eventsim"], times["refsim"])
+
+    def test_record_neurons(self):
+        network = self.network()
+        expected = PyNNLess("refsim").run(network, 100.0)
+        network["populations"][1]["record"] = {
+            SIG_SPIKES: {"neurons": slice(1, None)},
+            SIG_V: {"neurons": [2]}}
+        sim = PyNNLess("refsim")
+        res = sim.run(network, 100.0, keep_open=True)
+        self.assertEqual(expected[1][SIG_SPIKES][1:], res[1][SIG_SPIKES])
+        self.assertEqual((1, len(expected[1][SIG_V + "_t"])),
+                         res[1][SIG_V].shape)
+        np.testing.assert_equal(expected[1][SIG_V][2:3], res[1][SIG_V])
+
+        # Only the selected neurons are recorded by the backend
+        pop = sim.session["populations"][1]
+        self.assertEqual([2], pop._recorded(SIG_V).tolist())
+        self.assertEqual([(1000, 1)], [c.shape for _, c in
+            pop.recording_data.signals[SIG_V]])
+        sim.close()
+
+    def test_record_sampling(self):
+        network = self.network()
+        expected = PyNNLess("refsim").run(network, 100.0)
+        network["populations"][1]["record"] = {
+            SIG_SPIKES: {"window": [0.0, 5.0]},
+            SIG_V: {"sampling_interval": 1.0, "window": [20.0, 50.0]}}
+        res = PyNNLess("refsim").run(network, 100.0)
+        self.assertEqual([[], [], []], res[1][SIG_SPIKES])
+        np.testing.assert_allclose(np.arange(20.0, 50.0, 1.0),
+                                   res[1][SIG_V + "_t"], atol=1e-4)
+        np.testing.assert_equal(expected[1][SIG_V][:, 200:500:10],
+                                res[1][SIG_V])
+
+        # Decimation after fetching if the intervals differ
+        data, times = PyNNLess._crop_signal(expected[1][SIG_V],
+            expected[1][SIG_V + "_t"], {"sampling_interval": 0.5})
+        np.testing.assert_equal(expected[1][SIG_V][:, ::5], data)
+
+    def test_run_segments(self):
+        network = self.network()
+        network["populations"][1]["params"] = {"v_thresh": -60.0}
+        expected = PyNNLess("refsim").run(network, 100.0)
+        for sim in [PyNNLess("refsim"), PyNNLessIsolated("refsim")]:
+            segments = list(sim.run_segments(network, 30.0, 100.0))
+            self.assertEqual([(0.0, 30.0), (30.0, 60.0), (60.0, 90.0)],
+                [(round(t0, 6), round(t1, 6)) for t0, t1, _ in segments[:3]])
+            for j in xrange(3):
+                self.assertEqual(expected[1][SIG_SPIKES][j], sum(
+                    [list(res[1][SIG_SPIKES][j]) for _, _, res in segments],
+                    []))
+            np.testing.assert_equal(expected[1][SIG_V], np.concatenate(
+                [res[1][SIG_V] for _, _, res in segments], axis=1))
+
+    def test_isolated_crash(self):
+        def crash(path, node):
+            # Give the queue time to send the phase report before exiting
+            if node["name"] == "build_projections":
+                time.sleep(0.2)
+                os._exit(3)
+        sim = PyNNLessIsolated("refsim", {"timing_callback": crash})
+        with self.assertRaises(PyNNLessException) as cm:
+            sim.run(self.network(), 100.0)
+        msg = str(cm.exception)
+        self.assertIn("exited with code 3", msg)
+        self.assertIn("build_projections", msg)
+        with self.assertRaises(PyNNLessException):
+            list(sim.run_segments(self.network(), 30.0, 100.0))
+
+    def test_run_adaptive(self):
+        network = self.network()
+        network["populations"][1]["params"] = {"v_thresh": -64.5}
+        sim = PyNNLess("refsim")
+        res, t_stop = sim.run_adaptive(network, quiet_window=50.0,
+                                       segment_duration=10.0)
+        expected = PyNNLess("refsim").run(network, t_stop)
+        self.assertLess(t_stop, PyNNLess._auto_duration(network))
+        self.assertEqual(expected[1][SIG_SPIKES], res[1][SIG_SPIKES])
+        t_last = max(s[-1] for s in res[1][SIG_SPIKES] if len(s) > 0)
+        self.assertGreaterEqual(t_stop - t_last, 50.0)
+        self.assertLess(t_stop - t_last, 60.0)
+
+        # Stop once the predicate is fulfilled
+        res, t_stop = sim.run_adaptive(network, quiet_window=None,
+            segment_duration=10.0,
+            predicate=lambda t0, t1, res: len(res[1][SIG_SPIKES][1]) > 0)
+        self.assertEqual(20.0, round(t_stop, 6))
+        self.assertEqual((3, 200), res[1][SIG_V].shape)
+
+    def test_run_adaptive_signal_reductions(self):
+        network = self.network()
+        network["populations"][1]["params"] = {"v_thresh": -64.5}
+        network["populations"][1]["record"] = {
+            SIG_SPIKES: {}, SIG_V: {"reduce": ["std", "min"]},
+            SIG_GE: {"reduce": ["mean", "var"], "window": [5.0, 25.0]}}
+        res, t_stop = PyNNLess("refsim").run_adaptive(network,
+            quiet_window=None, segment_duration=10.0,
+            predicate=lambda t0, t1, res: t1 >= 40.0)
+        self.assertEqual(40.0, round(t_stop, 6))
+
+        # The pooled values match the reductions of the unsegmented run
+        network["populations"][1]["record"] = [SIG_V, SIG_GE]
+        expected = PyNNLess("refsim").run(network, t_stop)[1]
+        t = expected[SIG_V + "_t"]
+        v = np.asarray(expected[SIG_V], dtype=np.float64)[:, t < 40.0]
+        ge = np.asarray(expected[SIG_GE], dtype=np.float64)[
+            :, (t >= 5.0) & (t < 25.0)]
+        self.assertEqual(["min", "std"], sorted(res[1][SIG_V].keys()))
+        np.testing.assert_allclose(np.std(v, axis=1), res[1][SIG_V]["std"])
+        np.testing.assert_allclose(np.min(v, axis=1), res[1][SIG_V]["min"])
+        np.testing.assert_allclose(np.mean(ge, axis=1), res[1][SIG_GE]["mean"])
+        np.testing.assert_allclose(np.var(ge, axis=1), res[1][SIG_GE]["var"],
+                                   atol=1e-12)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the network transformations in the pynnless_optimizer submodule.
+"""
+
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_optimizer as optimizer
+import pynnless.pynnless_storage as storage
+
+class TestOptimizer(unittest.TestCase):
+
+    def network(self):
+        network = Network()
+        for i in xrange(3):
+            network.add_source(spike_times=[10.0 * (i + 1), 50.0])
+        for i in xrange(4):
+            network.add_neuron(params={"v_thresh": -60.0 - i},
+                               record=[SIG_SPIKES, SIG_V])
+        network.add_population(count=3, params={"tau_m": 15.0},
+            record={SIG_SPIKES: {}, SIG_V: {"neurons": [0, 2]}})
+        network.add_population(count=2, _type=TYPE_AD_EX,
+                               record=[SIG_SPIKES])
+        for i in xrange(3):
+            for j in xrange(3, 8):
+                network.add_connection((i, 0), (j, i % 3 if j == 7 else 0),
+                                       0.05, 1.0)
+        network.add_connection((7, 2), (8, 1), 0.1, 2.0)
+        return network
+
+    def test_merge_populations(self):
+        network, info = optimizer.merge_populations(self.network())
+        pops = network["populations"]
+        self.assertEqual([3, 7, 2], [p["count"] for p in pops])
+        self.assertEqual([{"spike_times": [10.0, 50.0]},
+                          {"spike_times": [20.0, 50.0]},
+                          {"spike_times": [30.0, 50.0]}], pops[0]["params"])
+        self.assertEqual([{"v_thresh": -63.0}, {"tau_m": 15.0}],
+                         pops[1]["params"][3:5])
+        self.assertEqual({SIG_SPIKES: {}, SIG_V: {"neurons": [0, 1, 2, 3, 4, 6]}},
+                         pops[1]["record"])
+        self.assertEqual(((0, 2), (1, 2), 0.05, 1.0),
+                         network["connections"][12])
+        self.assertEqual(((1, 6), (2, 1), 0.1, 2.0),
+                         network["connections"][-1])
+
+        # Connection matrices are translated as well
+        matrix, _ = optimizer.merge_populations(Network(
+            populations=self.network()["populations"],
+            connections=storage.connection_matrix(
+                self.network()["connections"])))
+        self.assertEqual(storage.connection_matrix(
+            network["connections"]).tolist(), matrix["connections"].tolist())
+
+    def test_run(self):
+        expected = PyNNLess("refsim").run(self.network(), 100.0)
+        sim = PyNNLess("refsim", {"merge_populations": True})
+        res = sim.run(self.network(), 100.0)
+        self.assertEqual(len(expected), len(res))
+        for e, r in zip(expected, res):
+            self.assertEqual(sorted(e.keys()), sorted(r.keys()))
+            self.assertEqual(e.get(SIG_SPIKES), r.get(SIG_SPIKES))
+            if SIG_V in e:
+                np.testing.assert_equal(e[SIG_V], r[SIG_V])
+        self.assertTrue(any(len(s) > 0 for r in res[3:7]
+                            for s in r[SIG_SPIKES]))
+
+    def test_prune_network(self):
+        network = Network(
+            populations=[
+                SourcePopulation(spike_times=[10.0]),
+                SourcePopulation(spike_times=[20.0]),
+                IfCondExpPopulation(count=2),
+                IfCondExpPopulation(count=2, record=[SIG_SPIKES]),
+                IfCondExpPopulation(count=2)],
+            connections=[((0, 0), (2, 0), 0.1, 1.0),
+                         ((2, 1), (3, 0), 0.1, 1.0),
+                         ((1, 0), (3, 1), 0.0, 1.0),
+                         ((3, 0), (4, 0), 0.1, 1.0),
+                         ((0, 0), (3, 1), 0.001, 1.0)])
+        pruned, info = optimizer.prune_network(network)
+        self.assertEqual([True, False, True, True, False], info["alive"])
+        self.assertEqual([((0, 0), (1, 0), 0.1, 1.0),
+                          ((1, 1), (2, 0), 0.1, 1.0),
+                          ((0, 0), (2, 1), 0.001, 1.0)],
+                         pruned["connections"])
+        pruned, _ = optimizer.prune_network(Network(
+            populations=network["populations"],
+            connections=storage.connection_matrix(network["connections"])),
+            threshold=0.01)
+        self.assertEqual([[0, 0, 1, 0, 0.1, 1.0], [1, 1, 2, 0, 0.1, 1.0]],
+                         pruned["connections"].tolist())
+
+        res = PyNNLess("refsim", {"prune": True}).run(network)
+        self.assertEqual(5, len(res))
+        self.assertEqual([{}, {}, {}, {}], res[:3] + res[4:])
+        self.assertEqual(2, len(res[3][SIG_SPIKES]))
+
+        # Weights updated to zero keep the structure of an open session
+        sim = PyNNLess("refsim", {"prune": True})
+        sim.run(network, keep_open=True)
+        network["connections"][0] = ((0, 0), (2, 0), 0.0, 1.0)
+        res = sim.run(network, keep_open=True)
+        self.assertEqual(2, len(res[3][SIG_SPIKES]))
+        sim.close()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the Profiler class in the pynnless_profiling submodule.
+"""
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+
+from pynnless.pynnless_profiling import *
+
+class TestProfiling(unittest.TestCase):
+
+    def test_phase_tree(self):
+        paths = []
+        profiler = Profiler("run", lambda path, node: paths.append(path))
+        with profiler.phase("build"):
+            with profiler.phase("population[0]"):
+                pass
+            with profiler.phase("population[1]"):
+                pass
+        with profiler.phase("sim"):
+            pass
+        root = profiler.finish()
+
+        self.assertEqual("run", root["name"])
+        self.assertEqual(["build", "sim"],
+                [child["name"] for child in root["children"]])
+        self.assertEqual(2, len(find_phase(root, "build")["children"]))
+        self.assertEqual(None, find_phase(root, "build", "population[2]"))
+        self.assertTrue(root["time"] >= find_phase(root, "build")["time"])
+        self.assertEqual([
+            ("run", "build", "population[0]"),
+            ("run", "build", "population[1]"),
+            ("run", "build"),
+            ("run", "sim"),
+            ("run",)], paths)
+
+    def test_memory(self):
+        profiler = Profiler(memory_depth=1)
+        with profiler.phase("alloc"):
+            with profiler.phase("inner"):
+                data = "x" * (64 * 1024 * 1024)
+            del data
+        with profiler.phase("idle"):
+            pass
+        root = profiler.finish()
+
+        alloc = find_phase(root, "alloc")
+        idle = find_phase(root, "idle")
+        self.assertFalse("rss_peak" in find_phase(root, "alloc", "inner"))
+        self.assertTrue(alloc["rss_peak"] >= 64 * 1024 * 1024)
+        self.assertTrue(root["rss_peak"] >= alloc["rss_peak"])
+        if reset_rss_peak():
+            self.assertTrue(idle["rss_peak"] < alloc["rss_peak"])
+
+    def test_phase_exception(self):
+        profiler = Profiler()
+        try:
+            with profiler.phase("fail"):
+                raise ValueError()
+        except ValueError:
+            pass
+        with profiler.phase("next"):
+            pass
+        root = profiler.finish()
+        self.assertEqual(["fail", "next"],
+                [child["name"] for child in root["children"]])
+
+    def test_tracing(self):
+        directory = tempfile.mkdtemp()
+        try:
+            enable_tracing(directory)
+            with span("outer", args={"a": 1}):
+                profiler = Profiler("run")
+                with profiler.phase("sim"):
+                    pass
+                profiler.finish()
+            disable_tracing()
+            self.assertEqual(None, get_tracer())
+
+            filename = os.path.join(directory, "merged.json")
+            self.assertEqual(4, merge_traces(directory, filename))
+            with open(filename) as f:
+                events = json.load(f)["traceEvents"]
+            self.assertEqual(["process_name", "sim", "run", "outer"],
+                    [event["name"] for event in events])
+            self.assertEqual(set([os.getpid()]),
+                    set(event["pid"] for event in events))
+            outer, run = events[3], events[2]
+            self.assertTrue(outer["ts"] <= run["ts"])
+            self.assertTrue(outer["ts"] + outer["dur"] >= run["ts"] + run["dur"])
+        finally:
+            disable_tracing()
+            shutil.rmtree(directory)
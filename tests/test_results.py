@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the lazy result mode implemented in the pynnless_results submodule.
+"""
+
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_results as results
+
+class TestResults(unittest.TestCase):
+
+    def network(self):
+        return Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0, 20.0], [5.0]]),
+                IfCondExpPopulation(count=3, record=[SIG_SPIKES, SIG_V])],
+            connections=[((0, 0), (1, 1), 0.1, 1.0),
+                         ((0, 1), (1, 2), -0.1, 1.0)])
+
+    def test_lazy(self):
+        sim = PyNNLess("refsim")
+        expected = sim.run(self.network(), 100.0)
+        res = sim.run(self.network(), 100.0, keep_open=True, lazy=True)
+        self.assertIsInstance(res[1], results.LazyResult)
+        self.assertEqual(sorted([SIG_SPIKES, SIG_V, SIG_V + "_t"]),
+                         sorted(res[1].keys()))
+        self.assertEqual({}, res[0])
+        self.assertFalse(res[1].is_fetched(SIG_V))
+        np.testing.assert_equal(expected[1][SIG_V], res[1][SIG_V])
+        self.assertTrue(res[1].is_fetched(SIG_V + "_t"))
+        self.assertFalse(res[1].is_fetched(SIG_SPIKES))
+
+        # Fetched data stays available, everything else becomes stale
+        res2 = sim.run(self.network(), 100.0, keep_open=True, lazy=True)
+        self.assertFalse(res[1].is_valid())
+        np.testing.assert_equal(expected[1][SIG_V], res[1][SIG_V])
+        self.assertRaises(PyNNLessException, lambda: res[1][SIG_SPIKES])
+        self.assertEqual(expected[1][SIG_SPIKES], res2[1][SIG_SPIKES])
+        sim.close()
+        self.assertRaises(PyNNLessException, lambda: res2[1][SIG_V])
+
+    def test_lazy_requires_keep_open(self):
+        sim = PyNNLess("mock")
+        self.assertRaises(PyNNLessException,
+                          lambda: sim.run(self.network(), 100.0, lazy=True))
+
+    def test_reduce(self):
+        network = self.network()
+        expected = PyNNLess("refsim").run(network, 100.0)
+        network["populations"][1]["record"] = {
+            SIG_SPIKES: {"reduce": ["count", "rate", "first"]},
+            SIG_V: {"reduce": ["mean", "max"], "window": [10.0, 60.0]}}
+        res = PyNNLess("refsim").run(network, 100.0)
+        self.assertEqual([SIG_SPIKES, SIG_V], sorted(res[1].keys()))
+
+        spikes = expected[1][SIG_SPIKES]
+        self.assertEqual([len(s) for s in spikes],
+                         res[1][SIG_SPIKES]["count"].tolist())
+        np.testing.assert_allclose([len(s) * 10.0 for s in spikes],
+                                   res[1][SIG_SPIKES]["rate"])
+        np.testing.assert_equal([s[0] if len(s) > 0 else np.nan
+                                 for s in spikes],
+                                res[1][SIG_SPIKES]["first"])
+        v = expected[1][SIG_V][:, 100:600]
+        np.testing.assert_allclose(np.mean(v, axis=1),
+                                   res[1][SIG_V]["mean"], rtol=1e-5)
+        np.testing.assert_allclose(np.max(v, axis=1), res[1][SIG_V]["max"])
+
+    def test_reduce_signal(self):
+        res = results.reduce_signal([[1.0, np.nan, 3.0], [np.nan] * 3],
+                                    ["mean", "min"])
+        np.testing.assert_equal([2.0, np.nan], res["mean"])
+        np.testing.assert_equal([1.0, np.nan], res["min"])
+        self.assertRaises(PyNNLessException, lambda: IfCondExpPopulation(
+            record={SIG_V: {"reduce": "count"}}))
+
+    def test_merge_segments(self):
+        segments = [
+            (0.0, 10.0, [{SIG_SPIKES: {"count": [1, 0], "first": [5.0, np.nan],
+                                       "rate": [100.0, 0.0]}}]),
+            (10.0, 30.0, [{SIG_SPIKES: {"count": [1, 2], "first": [15.0, 12.0],
+                                        "rate": [50.0, 100.0]}}])]
+        res = results.merge_segments(segments)[0][SIG_SPIKES]
+        self.assertEqual([2, 2], res["count"].tolist())
+        self.assertEqual([5.0, 12.0], res["first"].tolist())
+        np.testing.assert_allclose([200.0 / 3.0, 200.0 / 3.0], res["rate"])
+
+        # Rates are weighted by the part of each segment inside the window,
+        # segments outside the window do not contribute
+        network = Network(populations=[IfCondExpPopulation(count=2, record={
+            SIG_SPIKES: {"reduce": ["rate"], "window": [0.0, 15.0]}})])
+        segments = [
+            (0.0, 10.0, [{SIG_SPIKES: {"rate": [100.0, 0.0]}}]),
+            (10.0, 20.0, [{SIG_SPIKES: {"rate": [200.0, 200.0]}}]),
+            (20.0, 30.0, [{SIG_SPIKES: {"rate": [0.0, 0.0]}}])]
+        res = results.merge_segments(segments, network)[0][SIG_SPIKES]
+        np.testing.assert_allclose([400.0 / 3.0, 200.0 / 3.0], res["rate"])
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the binary network format in the pynnless_storage submodule.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_storage as storage
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "network.npz")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def network(self):
+        return Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0, 20.0], [5.0]]),
+                IfCondExpPopulation(count=2, params=[{"cm": 0.2},
+                    {"cm": 0.3, "tau_m": 10.0}], record=[SIG_SPIKES, SIG_V]),
+                AdExPopulation(params={"a": 2.0})],
+            connections=[((0, 0), (1, 1), 0.1, 1.0),
+                         ((1, 1), (2, 0), -0.2, 2.0),
+                         ((0, 1), (1, 0), 0.3, 0.5)])
+
+    def test_round_trip(self):
+        storage.save_network(self.network(), self.filename)
+        network = storage.load_network(self.filename)
+        self.assertIsInstance(network["connections"], np.memmap)
+        self.assertEqual([[0, 0, 1, 1, 0.1, 1.0], [1, 1, 2, 0, -0.2, 2.0],
+                          [0, 1, 1, 0, 0.3, 0.5]],
+                         network["connections"].tolist())
+
+        pops = network["populations"]
+        self.assertEqual([2, 2, 1], [p["count"] for p in pops])
+        self.assertEqual([TYPE_SOURCE, TYPE_IF_COND_EXP, TYPE_AD_EX],
+                         [p["type"] for p in pops])
+        self.assertEqual([[10.0, 20.0], [5.0]],
+                         [p["spike_times"].tolist() for p in pops[0]["params"]])
+        self.assertEqual([{"cm": 0.2}, {"cm": 0.3, "tau_m": 10.0}],
+                         pops[1]["params"])
+        self.assertEqual([{"a": 2.0}], pops[2]["params"])
+        self.assertEqual(sorted([SIG_SPIKES, SIG_V]), sorted(pops[1]["record"]))
+        self.assertEqual([], pops[2]["record"])
+
+    def test_build_connections(self):
+        connections = self.network()["connections"]
+        matrix = storage.connection_matrix(connections)
+        for separate in [False, True]:
+            self.assertEqual(
+                PyNNLess._build_connections(connections, 1.0, separate),
+                PyNNLess._build_connections(matrix, 1.0, separate))
+
+    def test_run(self):
+        storage.save_network(self.network(), self.filename)
+        network = storage.load_network(self.filename)
+        self.assertEqual(1020.0, PyNNLess._auto_duration(network))
+        res = PyNNLess("mock").run(network, 100.0)
+        self.assertEqual(2, len(res[1][SIG_SPIKES]))
+
+    def test_run_output(self):
+        output = os.path.join(self.tmpdir, "result.npz")
+        sim = PyNNLess("refsim")
+        expected = sim.run(self.network(), 100.0)
+        res = sim.run(self.network(), 100.0, output=output)
+        self.assertTrue(os.path.isfile(output))
+
+        spikes = res[1][SIG_SPIKES]
+        self.assertIsInstance(spikes, storage.StoredSpikeTrains)
+        self.assertEqual(2, len(spikes))
+        self.assertEqual(list(expected[1][SIG_SPIKES]), spikes.tolist())
+        self.assertIsInstance(res[1][SIG_V], storage.StoredArray)
+        np.testing.assert_allclose(expected[1][SIG_V], np.array(res[1][SIG_V]))
+        np.testing.assert_allclose(expected[1][SIG_V + "_t"],
+                                   np.array(res[1][SIG_V + "_t"]))
+        self.assertEqual({}, res[2])
+
+    def test_stored_pickle(self):
+        import pickle
+        writer = storage.ResultWriter(os.path.join(self.tmpdir, "result.npz"))
+        res = writer.store(0, {SIG_SPIKES: [[1.0, 2.0], [], [3.0]]})
+        writer.close()
+        res = pickle.loads(pickle.dumps(res))
+        self.assertEqual([[1.0, 2.0], [], [3.0]], res[SIG_SPIKES].tolist())
+        self.assertEqual([3.0], res[SIG_SPIKES][-1].tolist())
+
+    def test_record_options(self):
+        network = self.network()
+        network["populations"][1]["record"] = {SIG_V: {"neurons": [1]}}
+        storage.save_network(network, self.filename)
+        pops = storage.load_network(self.filename)["populations"]
+        self.assertEqual({SIG_V: {"neurons": [1]}}, pops[1]["record"])
+        self.assertEqual({}, pops[2]["record"])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the helper classes in the pynnless_utils submodule.
+"""
+
+import unittest
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from pynnless.pynnless_utils import FdCapture, FileLock
+
+class TestUtils(unittest.TestCase):
+
+    def test_fd_capture(self):
+        capture = FdCapture(1, max_lines=2)
+        capture.start()
+        try:
+            os.write(1, "line 1\nline 2\nline 3\nline 4")
+        finally:
+            capture.stop()
+        self.assertFalse(capture.is_active())
+        self.assertEqual(4, capture.line_count)
+        self.assertEqual(["line 3", "line 4"], list(capture.lines))
+
+    def test_fd_capture_leftover_thread(self):
+        # A child process keeps the pipe of the first capture open, its late
+        # output must not end up in the buffer of the second capture
+        capture = FdCapture(1)
+        capture.JOIN_TIMEOUT = 0.05
+        capture.start()
+        try:
+            child = subprocess.Popen(["sh", "-c", "sleep 0.3; echo late"])
+        finally:
+            capture.stop()
+        capture.start()
+        try:
+            os.write(1, "new\n")
+            child.wait()
+            time.sleep(0.1)
+        finally:
+            capture.stop()
+        self.assertEqual(["new"], list(capture.lines))
+        self.assertEqual(1, capture.line_count)
+
+    def test_fd_capture_spill(self):
+        directory = tempfile.mkdtemp()
+        try:
+            capture = FdCapture(1, max_lines=1, spill=directory)
+            for i in xrange(2):
+                capture.start()
+                try:
+                    os.write(1, "run " + str(i) + "\n")
+                finally:
+                    capture.stop()
+                self.assertEqual(["run " + str(i)], list(capture.lines))
+            self.assertEqual(directory, os.path.dirname(capture.spill_file))
+            with open(capture.spill_file) as f:
+                self.assertEqual("run 0\nrun 1\n", f.read())
+
+            # Closing the capture removes the spill file unless it is kept
+            spill_file = capture.spill_file
+            capture.close()
+            self.assertFalse(os.path.exists(spill_file))
+            with FdCapture(1, spill=directory, keep_spill=True) as capture:
+                os.write(1, "kept\n")
+            self.assertTrue(os.path.isfile(capture.spill_file))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_file_lock_is_locked(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "lock")
+            self.assertFalse(FileLock.is_locked(path))
+            with FileLock(path):
+                self.assertTrue(FileLock.is_locked(path))
+            self.assertFalse(FileLock.is_locked(path))
+        finally:
+            shutil.rmtree(directory)
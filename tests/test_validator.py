@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+#   PyNNLess -- Yet Another PyNN Abstraction Layer
+#   Copyright (C) 2015 Andreas Stöckel
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests the network validation in the pynnless_validator submodule.
+"""
+
+import unittest
+import numpy as np
+
+from pynnless import *
+import pynnless.pynnless_storage as storage
+import pynnless.pynnless_validator as validator
+
+class TestValidator(unittest.TestCase):
+
+    def network(self):
+        return Network(
+            populations=[
+                SourcePopulation(count=2, spike_times=[[10.0, 5.0], [1.0]]),
+                IfCondExpPopulation(count=3, params={"cm": 0.2, "foo": 1.0},
+                                    record=[SIG_SPIKES])],
+            connections=[((0, 0), (1, 2), 0.1, 1.0),
+                         ((0, 2), (1, 0), 0.1, 1.0),
+                         ((2, 0), (1, 0), 0.1, 1.0),
+                         ((1, 0), (0, 0), 0.1, 1.0),
+                         ((0, 1), (1, 3), float("nan"), -1.0)])
+
+    def test_validate_network(self):
+        errors, warnings = validator.validate_network(self.network())
+        self.assertEqual(6, len(errors))
+        self.assertTrue(errors[0].startswith("Connection 2 "))
+        self.assertIn("source population index", errors[0])
+        self.assertIn("Connection 1 ", errors[1])
+        self.assertIn("Connection 4 ", errors[2])
+        self.assertIn("target population is a spike source", errors[3])
+        self.assertIn("weight", errors[4])
+        self.assertIn("delay", errors[5])
+        self.assertEqual(2, len(warnings))
+        self.assertIn("not sorted", warnings[0])
+        self.assertIn("\"foo\"", warnings[1])
+
+        # Connection matrices are checked in the same way
+        network = self.network()
+        network["connections"] = storage.connection_matrix(
+            network["connections"])
+        self.assertEqual(errors, validator.validate_network(network)[0])
+
+    def test_run(self):
+        for sim in [PyNNLess("mock"), PyNNLessIsolated("mock")]:
+            try:
+                sim.run(self.network())
+                self.fail("Expected PyNNLessValidationException")
+            except PyNNLessValidationException as e:
+                self.assertEqual(6, len(e.errors))
+        network = self.network()
+        network["connections"] = network["connections"][:1]
+        PyNNLess("mock").run(network, 10.0)
+
+    def test_keep_open(self):
+        network = self.network()
+        network["connections"] = network["connections"][:1]
+        calls = []
+        validate_connections = validator._validate_connections
+        validator._validate_connections = lambda *args: calls.append(
+            validate_connections(*args))
+        try:
+            sim = PyNNLess("mock")
+            sim.run(network, 10.0, keep_open=True)
+            self.assertEqual(1, len(calls))
+
+            # Updated weights do not require the indices to be checked again,
+            # but the weights themselves are still validated
+            network["connections"][0] = ((0, 0), (1, 2), 0.2, 1.0)
+            sim.run(network, 10.0, keep_open=True)
+            self.assertEqual(1, len(calls))
+            network["connections"][0] = ((0, 0), (1, 2), float("nan"), 1.0)
+            with self.assertRaises(PyNNLessValidationException):
+                sim.run(network, 10.0, keep_open=True)
+
+            # Changed neuron pairs are checked again
+            network["connections"][0] = ((0, 0), (1, 5), 0.2, 1.0)
+            with self.assertRaises(PyNNLessValidationException):
+                sim.run(network, 10.0, keep_open=True)
+            self.assertEqual(2, len(calls))
+            sim.close()
+        finally:
+            validator._validate_connections = validate_connections